@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Attitude
+- Parser de las sentencias de actitud reales del K922/K222 (y compatibles):
+    $GPHPR / $GNHPR  hhmmss.ss,heading,pitch,roll,QF,sats,age,stn
+    $GPTRA / $GNTRA  mismo orden de campos (salida "TRA" de ComNav/Unicore)
+    $PTNL,AVR        hhmmss.ss,yaw,Yaw,tilt,Tilt,roll,Roll,range,QF,pdop,sats
+- Anillo de tamaño fijo con las últimas muestras (sin asignaciones por muestra)
+- Filtro paso bajo de primer orden por eje, con el rumbo filtrado sobre el
+  círculo (sin saltos 359° -> 0°)
+- Decimación a la tasa del dashboard: a 50 Hz de IMU el JSON y el FIFO no
+  trabajan 50 veces más
+"""
+
+import math
+import time
+from array import array
+
+ATTITUDE_TYPES = ("HPR", "TRA")
+
+# Calidad (QF) -> estado mostrado en el dashboard
+QF_STATUS = {
+    0: "NONE",
+    1: "OK",
+    2: "OK",
+    4: "OK",
+    5: "OK",
+    6: "CALIBRATING",   # solución INS en alineamiento / dead reckoning
+}
+
+
+def is_attitude_sentence(line: str) -> bool:
+    """Filtro barato por prefijo (se llama para cada sentencia)."""
+    return line[3:6] in ATTITUDE_TYPES or line.startswith("$PTNL,AVR")
+
+
+def _float(field, default=0.0):
+    try:
+        return float(field) if field else default
+    except ValueError:
+        return default
+
+
+def _int(field, default=0):
+    try:
+        return int(field) if field else default
+    except ValueError:
+        return default
+
+
+def parse_attitude(line: str):
+    """
+    Sentencia de actitud -> dict (heading, pitch, roll, quality, sats, age,
+    station, utc) o None si no es una sentencia reconocida o está vacía.
+    """
+    body = line.split("*", 1)[0]
+    parts = body.split(",")
+
+    if parts[0].startswith("$PTNL"):
+        # $PTNL,AVR,hhmmss.ss,yaw,Yaw,tilt,Tilt,roll,Roll,range,QF,pdop,sats
+        if len(parts) < 11 or parts[1] != "AVR" or not parts[3]:
+            return None
+        return {
+            "utc": parts[2],
+            "heading": _float(parts[3]) % 360.0,
+            "pitch": _float(parts[5]),
+            "roll": _float(parts[7]),
+            "baseline": _float(parts[9]),
+            "quality": _int(parts[10]),
+            "sats": _int(parts[12]) if len(parts) > 12 else 0,
+            "age": 0.0,
+            "station": "",
+        }
+
+    if len(parts) < 6 or parts[0][3:6] not in ATTITUDE_TYPES or not parts[2]:
+        return None
+    # $xxHPR,hhmmss.ss,heading,pitch,roll,QF,sats,age,stn
+    return {
+        "utc": parts[1],
+        "heading": _float(parts[2]) % 360.0,
+        "pitch": _float(parts[3]),
+        "roll": _float(parts[4]),
+        "quality": _int(parts[5]),
+        "sats": _int(parts[6]) if len(parts) > 6 else 0,
+        "age": _float(parts[7]) if len(parts) > 7 else 0.0,
+        "station": parts[8] if len(parts) > 8 else "",
+    }
+
+
+class AttitudeRing:
+    """Últimas N muestras (t, heading, pitch, roll) en arrays preasignados."""
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.t = array("d", bytes(8 * capacity))
+        self.heading = array("d", bytes(8 * capacity))
+        self.pitch = array("d", bytes(8 * capacity))
+        self.roll = array("d", bytes(8 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def append(self, t, heading, pitch, roll):
+        i = self.head
+        self.t[i] = t
+        self.heading[i] = heading
+        self.pitch[i] = pitch
+        self.roll[i] = roll
+        self.head = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def rate_hz(self):
+        """Tasa real de entrada estimada con el anillo completo."""
+        if self.count < 2:
+            return 0.0
+        newest = self.t[(self.head - 1) % self.capacity]
+        oldest = self.t[(self.head - self.count) % self.capacity]
+        span = newest - oldest
+        return (self.count - 1) / span if span > 0 else 0.0
+
+
+class AttitudeFilter:
+    """
+    Paso bajo de primer orden (constante de tiempo tau) sobre pitch/roll y
+    sobre el rumbo como diferencia angular envuelta. alpha se calcula con el
+    dt real de cada muestra, así el filtro es el mismo a 1 Hz que a 50 Hz.
+    """
+
+    def __init__(self, tau=0.2, publish_hz=2.0, capacity=256):
+        self.tau = tau
+        self.publish_interval = 1.0 / publish_hz if publish_hz > 0 else 0.0
+        self.ring = AttitudeRing(capacity)
+        self.heading = self.pitch = self.roll = 0.0
+        self.quality = 0
+        self.last = None
+        self._t_last = None
+        self._t_published = 0.0
+        self.samples = 0
+        self.published = 0
+
+    def update(self, att, t=None):
+        """Añade una muestra parseada. Devuelve True si toca publicar."""
+        if t is None:
+            t = time.monotonic()
+        heading, pitch, roll = att["heading"], att["pitch"], att["roll"]
+        self.ring.append(t, heading, pitch, roll)
+        self.samples += 1
+        self.quality = att["quality"]
+        self.last = att
+
+        if self._t_last is None or self.quality == 0:
+            # Primera muestra (o sin solución): se arranca sin transitorio
+            self.heading, self.pitch, self.roll = heading, pitch, roll
+        else:
+            dt = t - self._t_last
+            alpha = dt / (self.tau + dt) if dt > 0 else 1.0
+            self.pitch += alpha * (pitch - self.pitch)
+            self.roll += alpha * (roll - self.roll)
+            delta = (heading - self.heading + 180.0) % 360.0 - 180.0
+            self.heading = (self.heading + alpha * delta) % 360.0
+        self._t_last = t
+
+        if t - self._t_published >= self.publish_interval:
+            self._t_published = t
+            self.published += 1
+            return True
+        return False
+
+    def is_valid(self, now=None, max_age=1.0):
+        """Hay solución de actitud reciente (para compensar el bastón)."""
+        if self._t_last is None or self.quality == 0:
+            return False
+        if now is None:
+            now = time.monotonic()
+        return now - self._t_last <= max_age
+
+    @property
+    def angle(self):
+        """Inclinación total del bastón respecto a la vertical (grados)."""
+        # Mismo modelo que geodesy.pole_vector_enu: pitch y después roll
+        c = math.cos(math.radians(self.pitch)) * math.cos(math.radians(self.roll))
+        return math.degrees(math.acos(max(-1.0, min(1.0, c))))
+
+    def snapshot(self):
+        return {
+            "pitch": round(self.pitch, 3),
+            "roll": round(self.roll, 3),
+            "heading": round(self.heading, 3),
+            "angle": round(self.angle, 3),
+            "status": QF_STATUS.get(self.quality, "OK"),
+            "quality": self.quality,
+            "rate_hz": round(self.ring.rate_hz(), 1),
+            "samples": self.samples,
+        }
@@ -2,6 +2,7 @@
 """
 Bluetooth SPP Server para GNSS.AI
 Lee de /tmp/gnssai_smart y transmite por Bluetooth SPP
+Log por eventos no bloqueante (gnssai_log.py)
 """
 
 import bluetooth
@@ -11,9 +12,13 @@ import time
 import threading
 import select
 
+from gnssai_log import get_logger
+
 FIFO_PATH = '/tmp/gnssai_smart'
 SERVER_UUID = "00001101-0000-1000-8000-00805F9B34FB"  # SPP UUID
 
+log = get_logger("bluetooth")
+
 class BluetoothSPPServer:
     def __init__(self):
         self.server_sock = None
@@ -38,36 +43,36 @@ class BluetoothSPPServer:
                 profiles=[bluetooth.SERIAL_PORT_PROFILE]
             )
             
-            print(f"✅ Bluetooth SPP Server listening on RFCOMM channel {port}")
-            print(f"📱 Waiting for connection...")
+            log.info("listening", f"✅ Bluetooth SPP Server listening on RFCOMM channel {port}", channel=port)
+            log.info("waiting", "📱 Waiting for connection...")
             
             while self.running:
                 try:
                     self.client_sock, client_info = self.server_sock.accept()
-                    print(f"✅ Connected from {client_info}")
+                    log.info("client_connected", f"✅ Connected from {client_info}")
                     
                     # Iniciar transmisión de datos
                     self.handle_client()
                     
                 except bluetooth.BluetoothError as e:
-                    print(f"⚠️  Bluetooth error: {e}")
+                    log.warning("bluetooth_error", f"⚠️  Bluetooth error: {e}")
                     time.sleep(2)
                     
         except Exception as e:
-            print(f"❌ Error starting server: {e}")
+            log.error("server_error", f"❌ Error starting server: {e}")
         finally:
             self.cleanup()
     
     def handle_client(self):
         """Manejar cliente conectado"""
-        print("📡 Starting data transmission...")
+        log.info("transmission_start", "📡 Starting data transmission...")
         
         # Abrir FIFO para lectura
         try:
             fifo = open(FIFO_PATH, 'rb', buffering=0)
-            print(f"✅ Connected to FIFO: {FIFO_PATH}")
+            log.info("fifo_open", f"✅ Connected to FIFO: {FIFO_PATH}")
         except Exception as e:
-            print(f"❌ Error opening FIFO: {e}")
+            log.error("fifo_open_error", f"❌ Error opening FIFO: {e}")
             return
         
         try:
@@ -82,17 +87,17 @@ class BluetoothSPPServer:
                         try:
                             self.client_sock.send(data)
                         except bluetooth.BluetoothError:
-                            print("❌ Client disconnected")
+                            log.info("client_disconnected", "❌ Client disconnected")
                             break
                             
         except KeyboardInterrupt:
-            print("\n🛑 Stopping...")
+            log.warning("interrupt", "🛑 Stopping...")
         finally:
             fifo.close()
             if self.client_sock:
                 self.client_sock.close()
                 self.client_sock = None
-            print("📱 Waiting for new connection...")
+            log.info("waiting", "📱 Waiting for new connection...")
     
     def cleanup(self):
         """Limpiar recursos"""
@@ -101,18 +106,15 @@ class BluetoothSPPServer:
             self.client_sock.close()
         if self.server_sock:
             self.server_sock.close()
-        print("👋 Bluetooth SPP Server stopped")
+        log.info("stopped", "👋 Bluetooth SPP Server stopped")
 
 if __name__ == '__main__':
     # Esperar a que FIFO exista
     while not os.path.exists(FIFO_PATH):
-        print(f"⏳ Waiting for FIFO: {FIFO_PATH}")
+        log.info("fifo_wait", f"⏳ Waiting for FIFO: {FIFO_PATH}")
         time.sleep(2)
     
-    print("="*60)
-    print("🛰️  GNSS.AI Bluetooth SPP Server")
-    print("="*60)
-    print()
+    log.info("startup", "🛰️  GNSS.AI Bluetooth SPP Server")
     
     server = BluetoothSPPServer()
     server.start_server()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Control Channel
+- Canal de órdenes dashboard -> SmartProcessor sobre un socket UNIX de
+  datagramas (/tmp/gnssai_control.sock, GNSSAI_CONTROL_SOCK)
+- Petición y respuesta son un JSON por datagrama: {"cmd": ..., ...}
+- El servidor (SmartProcessor) se sondea sin bloquear desde su bucle
+  principal: las órdenes se ejecutan en el mismo hilo que el parseo, sin locks
+- El cliente (dashboard) enlaza un socket temporal para recibir la respuesta
+"""
+
+import os
+import json
+import socket
+import tempfile
+
+CONTROL_SOCK = os.environ.get("GNSSAI_CONTROL_SOCK", "/tmp/gnssai_control.sock")
+MAX_DATAGRAM = 65536
+
+
+class ControlServer:
+    """Extremo del procesador: registro de órdenes + poll no bloqueante."""
+
+    def __init__(self, path=CONTROL_SOCK):
+        self.path = path
+        self.handlers = {}
+        self.sock = None
+        self.requests = 0
+        self.errors = 0
+
+    def register(self, cmd, handler):
+        """handler(msg: dict) -> dict (se envía como respuesta)."""
+        self.handlers[cmd] = handler
+
+    def start(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.setblocking(False)
+        os.chmod(self.path, 0o660)
+
+    def poll(self, max_messages=16):
+        """Atiende las órdenes pendientes (como mucho max_messages)."""
+        if self.sock is None:
+            return 0
+        handled = 0
+        while handled < max_messages:
+            try:
+                data, addr = self.sock.recvfrom(MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break
+            handled += 1
+            self.requests += 1
+            reply = self._dispatch(data)
+            if addr:
+                try:
+                    self.sock.sendto(json.dumps(reply).encode("utf-8"), addr)
+                except OSError:
+                    self.errors += 1
+        return handled
+
+    def _dispatch(self, data):
+        try:
+            msg = json.loads(data)
+            cmd = msg.get("cmd")
+        except (ValueError, AttributeError):
+            self.errors += 1
+            return {"ok": False, "error": "petición inválida"}
+        handler = self.handlers.get(cmd)
+        if handler is None:
+            self.errors += 1
+            return {"ok": False, "error": f"orden desconocida: {cmd}"}
+        try:
+            reply = handler(msg) or {}
+        except Exception as e:
+            self.errors += 1
+            return {"ok": False, "error": str(e)}
+        reply.setdefault("ok", True)
+        return reply
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def send_command(cmd, path=CONTROL_SOCK, timeout=2.0, **fields):
+    """
+    Envía una orden al procesador y espera la respuesta.
+    Devuelve el dict de respuesta o {"ok": False, "error": ...}.
+    """
+    msg = dict(fields, cmd=cmd)
+    reply_path = os.path.join(tempfile.gettempdir(), f"gnssai_ctl_{os.getpid()}_{id(msg)}.sock")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.bind(reply_path)
+        sock.settimeout(timeout)
+        sock.sendto(json.dumps(msg).encode("utf-8"), path)
+        data = sock.recv(MAX_DATAGRAM)
+        return json.loads(data)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return {"ok": False, "error": "SmartProcessor no está escuchando"}
+    except socket.timeout:
+        return {"ok": False, "error": "sin respuesta del SmartProcessor"}
+    except (OSError, ValueError) as e:
+        return {"ok": False, "error": str(e)}
+    finally:
+        sock.close()
+        try:
+            os.unlink(reply_path)
+        except OSError:
+            pass
@@ -5,16 +5,104 @@ GNSS.AI Dashboard Server v3.1
 - Lee /tmp/gnssai_dashboard_data.json
 - Sirve un dashboard HTML responsivo (index.html)
 - API REST /api/stats
+- Métricas Prometheus /metrics (latencia por etapa de SmartProcessor)
+- Histórico /api/history (rangos sobre los anillos memory-mapped)
+- /api/stats pre-serializado una vez por snapshot (ETag + gzip)
+- Modo servidor asíncrono (gevent/eventlet) para muchos clientes simultáneos
+- Formato de cable negociado por cliente en /gnss (json | compact | msgpack),
+  ver wire_format.py; bytes/s por cliente en /api/wire_stats
+- Skyplot e histogramas SNR agregados en servidor (/api/sky), actualizados
+  de forma incremental en cada época (sky_aggregates.py)
+- Promediado de puntos: /api/points/* -> SmartProcessor por el canal de
+  control (socket UNIX de datagramas)
+- Consumidor "dashboard" registrado en SmartProcessor mientras hay clientes:
+  la salida del receptor se poda cuando nadie mira (output_demand.py)
+- Panel K922 COM1 (app.js): WebSocket en /ws/k922 (ws://host:5000/ws/k922);
+  applyK922Config -> comandos al receptor en vivo (receiver_config.py),
+  progreso de las confirmaciones y tasas de salida resultantes
+
+Modos (GNSSAI_ASYNC_MODE o --async-mode=...):
+    auto       gevent si está instalado, si no eventlet, si no threading
+    gevent     pywsgi + greenlets (recomendado en producción)
+    eventlet   eventlet.wsgi + greenlets
+    threading  servidor de desarrollo Werkzeug (comportamiento anterior)
+
+Modelo de workers: UN proceso con bucle de eventos. Socket.IO necesita
+sesiones "sticky", así que no se usan varios workers; la concurrencia viene
+de los greenlets (miles de conexiones keep-alive por proceso). Con gunicorn:
+    gunicorn -k gevent -w 1 -b 0.0.0.0:5000 dashboard_server:app
+El modo se detecta del monkey patching del worker y las tareas de fondo
+(lectura del JSON, concesión "dashboard") arrancan al importar bajo
+gunicorn, o con la primera petición si otro servidor WSGI importa la app.
+
+Benchmark clientes/latencia (comparar modos sobre el mismo JSON):
+    GNSSAI_ASYNC_MODE=threading python3 dashboard_server.py
+    python3 gnssai_benchmark.py --load http://127.0.0.1:5000 --clients 1 5 20 50
+    GNSSAI_ASYNC_MODE=gevent python3 dashboard_server.py
+    python3 gnssai_benchmark.py --load http://127.0.0.1:5000 --clients 1 5 20 50
 """
 
 import os
+import sys
+
+# --------------------------------------------------------------------
+# Modo asíncrono: el monkey patching debe ir antes de cualquier otro import
+# --------------------------------------------------------------------
+ASYNC_MODE = os.environ.get("GNSSAI_ASYNC_MODE", "auto").lower()
+if __name__ == "__main__":
+    for _arg in sys.argv[1:]:
+        if _arg.startswith("--async-mode="):
+            ASYNC_MODE = _arg.split("=", 1)[1].lower()
+
+    if ASYNC_MODE in ("auto", "gevent"):
+        try:
+            from gevent import monkey
+            monkey.patch_all()
+            ASYNC_MODE = "gevent"
+        except ImportError:
+            if ASYNC_MODE == "gevent":
+                print("⚠️  gevent no instalado, probando otros modos...")
+            ASYNC_MODE = "auto"
+
+    if ASYNC_MODE in ("auto", "eventlet"):
+        try:
+            import eventlet
+            eventlet.monkey_patch()
+            ASYNC_MODE = "eventlet"
+        except ImportError:
+            if ASYNC_MODE == "eventlet":
+                print("⚠️  eventlet no instalado, usando threading.")
+            ASYNC_MODE = "threading"
+elif ASYNC_MODE == "auto":
+    # Importado como módulo: el worker (gunicorn -k gevent/eventlet) ya
+    # parcheó antes de importar la app; sin parches, threading
+    ASYNC_MODE = "threading"
+    if "gevent.monkey" in sys.modules and sys.modules["gevent.monkey"].is_module_patched("socket"):
+        ASYNC_MODE = "gevent"
+    elif "eventlet.patcher" in sys.modules and sys.modules["eventlet.patcher"].is_monkey_patched("socket"):
+        ASYNC_MODE = "eventlet"
+
+import gzip
 import json
 import time
+import hashlib
 import threading
 from datetime import datetime
 
-from flask import Flask, jsonify, render_template, send_from_directory
-from flask_socketio import SocketIO
+from flask import Flask, Response, jsonify, render_template, request, send_from_directory
+from flask_socketio import SocketIO, emit, join_room, leave_room
+
+from latency_metrics import render_prometheus
+from history_store import HistoryReader
+import wire_format
+from sky_aggregates import SkyAggregator
+from control_channel import send_command
+
+try:
+    from simple_websocket import Server as WebSocketServer, ConnectionClosed
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    WEBSOCKET_AVAILABLE = False
 
 # --------------------------------------------------------------------
 # Rutas base
@@ -558,7 +646,7 @@ function updateUI(data) {
         }
     }
 
-    const uptime = data.uptime_sec ?? null;
+    const uptime = data.uptime_sec ?? null;   // cabecera X-Dashboard-Uptime
     document.getElementById("uptime-span").textContent =
         "Uptime: " + formatUptime(uptime);
 
@@ -623,6 +711,9 @@ async function pollStats() {
         const resp = await fetch("/api/stats");
         if (!resp.ok) throw new Error("HTTP " + resp.status);
         const data = await resp.json();
+        // El uptime va en cabecera: el cuerpo (y su ETag) solo cambia por snapshot
+        const uptime = resp.headers.get("X-Dashboard-Uptime");
+        if (uptime !== null) data.uptime_sec = Number(uptime);
         updateUI(data);
     } catch (err) {
         console.warn("Error obteniendo /api/stats:", err);
@@ -644,82 +735,500 @@ document.addEventListener("DOMContentLoaded", () => {
 # Estado global
 # --------------------------------------------------------------------
 latest_stats = {}
-uptime_sec = 0
+STARTED = time.monotonic()
+history = HistoryReader()
+
+# Respuesta /api/stats ya serializada: (etag, json_bytes, gzip_bytes)
+stats_cache = None
+
+# Agregados del cielo (una actualización por snapshot nuevo) y su caché /api/sky
+sky = SkyAggregator()
+sky_cache = None
+
+DEFAULT_TILT = {
+    "pitch": 0.0,
+    "roll": 0.0,
+    "heading": 0.0,
+    "angle": 0.0,
+    "status": "NONE",
+}
+
+# Por debajo de este tamaño gzip no compensa
+GZIP_MIN_SIZE = 512
+
+# Formato de cable por cliente Socket.IO (sid -> formato); una sala por formato
+client_formats = {}
+WIRE_ROOM = "wire_{}"
+
+# Bytes emitidos por formato + referencia "legacy" (JSON con la lista duplicada)
+wire_stats = {
+    "since": time.time(),
+    "snapshots": 0,
+    "legacy_bytes": 0,
+    "bytes": {fmt: 0 for fmt in wire_format.FORMATS},
+    "client_snapshots": {fmt: 0 for fmt in wire_format.FORMATS},
+}
 
 # --------------------------------------------------------------------
 # Flask + SocketIO
 # --------------------------------------------------------------------
 app = Flask(__name__, template_folder=TEMPLATE_DIR, static_folder=STATIC_DIR)
-socketio = SocketIO(app, cors_allowed_origins="*")
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    async_mode=ASYNC_MODE,
+    http_compression=True,
+    compression_threshold=1024,
+)
 
 # --------------------------------------------------------------------
 # Utilidades
 # --------------------------------------------------------------------
 def ensure_template():
-    """Crea templates/index.html si no existe."""
+    """Escribe templates/index.html si falta o no coincide con DASHBOARD_HTML."""
     os.makedirs(TEMPLATE_DIR, exist_ok=True)
     path = os.path.join(TEMPLATE_DIR, "index.html")
-    if not os.path.exists(path):
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(DASHBOARD_HTML)
-
-def safe_read_json(path):
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+        with open(path, encoding="utf-8") as f:
+            if f.read() == DASHBOARD_HTML:
+                return
+    except OSError:
+        pass
+    # Copia generada: se rehace en cuanto cambia el HTML del código
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(DASHBOARD_HTML)
+
+def read_raw(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return b""
+
+def serialize_cached(payload):
+    """JSON compacto + gzip + ETag, calculados una sola vez."""
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+    gz = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+    return etag, body, gz
+
+def uptime_seconds():
+    """Uptime del dashboard; fuera del cuerpo cacheado para no invalidar el ETag cada segundo."""
+    return int(time.monotonic() - STARTED)
+
+def build_stats_cache(data):
+    """Serializa el snapshot UNA vez: JSON compacto + gzip + ETag."""
+    payload = dict(data) if data else {}
+
+    # Asegurar bloque tilt
+    if not isinstance(payload.get("tilt"), dict):
+        payload["tilt"] = dict(DEFAULT_TILT)
+
+    return serialize_cached(payload)
+
+def header_tokens(value):
+    """Lista de una cabecera HTTP: "a, b;q=0.5" -> {"a": 1.0, "b": 0.5}."""
+    tokens = {}
+    for item in (value or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, val = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        tokens[name] = q
+    return tokens
+
+def etag_matches(etag, if_none_match):
+    """If-None-Match: lista de ETags (débiles W/ incluidos) o "*"."""
+    for item in (if_none_match or "").split(","):
+        item = item.strip()
+        if item == "*":
+            return True
+        if item.startswith("W/"):
+            item = item[2:]
+        if item == etag:
+            return True
+    return False
+
+def accepts_gzip(accept_encoding):
+    tokens = header_tokens(accept_encoding)
+    q = tokens.get("gzip", tokens.get("*", 0.0))
+    return q > 0
+
+def cached_response(cache, extra_headers=None):
+    """Respuesta HTTP desde (etag, body, gz): 304 si el cliente ya la tiene."""
+    etag, body, gz = cache
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if extra_headers:
+        headers.update(extra_headers)
+    if etag_matches(etag, request.headers.get("If-None-Match")):
+        return Response(status=304, headers=headers)
+
+    if gz is not None and accepts_gzip(request.headers.get("Accept-Encoding")):
+        headers["Content-Encoding"] = "gzip"
+        body = gz
+    return Response(body, mimetype="application/json", headers=headers)
+
+def legacy_size(data):
+    """Tamaño del snapshot en el formato anterior (satélites duplicados)."""
+    legacy = dict(data)
+    legacy["satellites_view"] = data.get("satellites_detail", [])
+    return len(json.dumps(legacy, separators=(",", ":")))
+
+def emit_stats(data):
+    """Un encode por formato en uso y un emit por sala."""
+    active = {}
+    for fmt in list(client_formats.values()):
+        active[fmt] = active.get(fmt, 0) + 1
+
+    wire_stats["snapshots"] += 1
+    wire_stats["legacy_bytes"] += legacy_size(data)
+    for fmt, n_clients in active.items():
+        payload = wire_format.encode_for(fmt, data)
+        wire_stats["bytes"][fmt] += wire_format.payload_size(payload)
+        wire_stats["client_snapshots"][fmt] += n_clients
+        socketio.emit("stats", payload, namespace="/gnss", to=WIRE_ROOM.format(fmt))
+
+def wire_report():
+    """Bytes por snapshot y bytes/s por cliente, antes (legacy) y después."""
+    elapsed = max(time.time() - wire_stats["since"], 1e-6)
+    snapshots = wire_stats["snapshots"]
+    rate = snapshots / elapsed
+
+    def per_snapshot(total):
+        return round(total / snapshots, 1) if snapshots else 0.0
+
+    legacy = per_snapshot(wire_stats["legacy_bytes"])
+    formats = {}
+    for fmt in wire_format.FORMATS:
+        size = per_snapshot(wire_stats["bytes"][fmt])
+        if not wire_stats["client_snapshots"][fmt] and latest_stats:
+            size = wire_format.payload_size(wire_format.encode_for(fmt, latest_stats))
+        formats[fmt] = {
+            "bytes_per_snapshot": size,
+            "bytes_per_sec_per_client": round(size * rate, 1),
+            "saving_vs_legacy_pct": round(100.0 * (1 - size / legacy), 1) if legacy else 0.0,
+            "clients": sum(1 for f in list(client_formats.values()) if f == fmt),
+        }
+    return {
+        "elapsed_s": round(elapsed, 1),
+        "snapshots": snapshots,
+        "snapshots_per_sec": round(rate, 3),
+        "legacy": {
+            "bytes_per_snapshot": legacy,
+            "bytes_per_sec_per_client": round(legacy * rate, 1),
+        },
+        "formats": formats,
+        "msgpack_available": wire_format.MSGPACK_AVAILABLE,
+    }
 
 # --------------------------------------------------------------------
 # Threads de backend
 # --------------------------------------------------------------------
 def read_json_data():
     """Lee periódicamente /tmp/gnssai_dashboard_data.json y actualiza latest_stats."""
-    global latest_stats
+    global latest_stats, stats_cache, sky_cache
+    last_raw = b""
     while True:
-        data = safe_read_json(JSON_DATA_FILE)
-        if data:
-            latest_stats = data
+        raw = read_raw(JSON_DATA_FILE)
+        changed = False
+        # Solo se parsea/emite si el archivo cambió
+        if raw and raw != last_raw:
             try:
-                socketio.emit("stats", data, namespace="/gnss")
-            except Exception:
-                pass
-        time.sleep(1.0)
+                data = json.loads(raw)
+            except ValueError:
+                data = None  # escritura a medias: se reintenta en el próximo ciclo
+            if data:
+                last_raw = raw
+                latest_stats = data
+                changed = True
+                # Agregados del cielo: O(satélites) por época
+                sky.update(data.get("satellites_detail"), data.get("last_update"))
+                sky_cache = serialize_cached(sky.view())
+                try:
+                    emit_stats(data)
+                except Exception:
+                    pass
+
+        # Una serialización por snapshot, la compartan 1 o 20 clientes
+        if changed:
+            stats_cache = build_stats_cache(latest_stats)
+        socketio.sleep(1.0)
+
+# --------------------------------------------------------------------
+# Demanda de salida: el dashboard es consumidor mientras alguien lo mira
+# --------------------------------------------------------------------
+DEMAND_RENEW = 10.0
+DEMAND_IDLE = 60.0
+last_client_activity = 0.0
+
+def mark_client_activity():
+    global last_client_activity
+    last_client_activity = time.monotonic()
 
-def update_uptime():
-    """Contador de uptime en segundos (solo a nivel dashboard)."""
-    global uptime_sec
+def renew_consumer_lease():
+    """Renueva (o suelta) la concesión "dashboard" en SmartProcessor."""
+    registered = False
     while True:
-        uptime_sec += 1
-        time.sleep(1.0)
+        active = bool(client_formats) or time.monotonic() - last_client_activity < DEMAND_IDLE
+        if active:
+            registered = send_command("consumer_register", name="dashboard", ttl=3 * DEMAND_RENEW).get("ok", False)
+        elif registered:
+            send_command("consumer_release", name="dashboard")
+            registered = False
+        socketio.sleep(DEMAND_RENEW)
+
+# False: la primera petición no arranca tareas (benchmark con test_client)
+AUTOSTART_TASKS = True
+_tasks_started = False
+_tasks_lock = threading.Lock()
+
+def start_background_tasks():
+    """
+    Plantilla + tareas de fondo (hilos o greenlets según el modo), una sola
+    vez por proceso: desde main(), al importar bajo gunicorn o con la
+    primera petición.
+    """
+    global _tasks_started
+    if _tasks_started:
+        return False
+    with _tasks_lock:
+        if _tasks_started:
+            return False
+        _tasks_started = True
+    ensure_template()
+    socketio.start_background_task(read_json_data)
+    socketio.start_background_task(renew_consumer_lease)
+    return True
+
+@app.before_request
+def ensure_background_tasks():
+    if AUTOSTART_TASKS:
+        start_background_tasks()
 
 # --------------------------------------------------------------------
 # Rutas HTTP
 # --------------------------------------------------------------------
 @app.route("/")
 def index():
-    ensure_template()
     return render_template("index.html")
 
 @app.route("/api/stats")
 def api_stats():
-    ensure_template()
-    data = dict(latest_stats) if latest_stats else {}
+    mark_client_activity()
+    return cached_response(stats_cache or build_stats_cache(latest_stats),
+                           {"X-Dashboard-Uptime": str(uptime_seconds())})
+
+@app.route("/api/sky")
+def api_sky():
+    """
+    Skyplot precomputado: rejilla az × el (ocupación, SNR medio), satélites
+    de la última época por celda, histogramas SNR por constelación y
+    máscara de obstrucción aprendida.
+    """
+    return cached_response(sky_cache or serialize_cached(sky.view()))
+
+@app.route("/api/history")
+def api_history():
+    """
+    Histórico por rango:
+      /api/history                          -> métricas disponibles
+      /api/history?metric=hdop&start=-3600  -> última hora (resolución auto)
+    Parámetros: metric, start, end (epoch o negativo relativo a ahora),
+    resolution (auto|raw|1s|1m|1h), max_points.
+    """
+    metric = request.args.get("metric")
+    if not metric:
+        return jsonify({"metrics": history.metrics()})
+
+    now = time.time()
+    try:
+        end = float(request.args.get("end", now))
+        start = float(request.args.get("start", -3600))
+        max_points = max(1, min(int(request.args.get("max_points", 1000)), 10000))
+    except ValueError:
+        return jsonify({"error": "parámetros inválidos"}), 400
+    if end <= 0:
+        end = now + end
+    if start <= 0:
+        start = end + start
+
+    resolution = request.args.get("resolution", "auto")
+    if resolution not in ("auto", "raw", "1s", "1m", "1h"):
+        return jsonify({"error": f"resolución desconocida: {resolution}"}), 400
 
-    # inyectar uptime
-    data["uptime_sec"] = uptime_sec
+    try:
+        return jsonify(history.query(metric, start, end, resolution, max_points))
+    except (OSError, ValueError) as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/metrics")
+def metrics():
+    """Exposición Prometheus: latencias por etapa + contadores básicos."""
+    data = latest_stats or {}
+    gauges = {
+        "satellites": data.get("satellites", 0),
+        "fix_quality": data.get("quality", 0),
+        "hdop": data.get("hdop", 0.0),
+        "data_age_seconds": round(time.time() - data["last_update"], 3) if data.get("last_update") else -1,
+        "dashboard_uptime_seconds": uptime_seconds(),
+    }
+    counters = {
+        "nmea_sent": data.get("nmea_sent", 0),
+        "rtcm_sent": data.get("rtcm_sent", 0),
+    }
+    text = render_prometheus(data.get("latency"), gauges, counters=counters)
+    return Response(text, mimetype="text/plain; version=0.0.4")
+
+def control_response(reply):
+    """Respuesta del canal de control -> HTTP (503 si el procesador no responde)."""
+    return jsonify(reply), (200 if reply.get("ok") else 503)
+
+@app.route("/api/points/start", methods=["POST"])
+def api_points_start():
+    """
+    Inicia una sesión de promediado. JSON opcional:
+      name, accept_quality ([4] = solo RTK fijo), outlier_sigma, target_epochs
+    """
+    body = request.get_json(silent=True) or {}
+    fields = {k: body[k] for k in ("name", "accept_quality", "outlier_sigma", "target_epochs") if k in body}
+    return control_response(send_command("point_start", **fields))
+
+@app.route("/api/points/stop", methods=["POST"])
+def api_points_stop():
+    body = request.get_json(silent=True) or {}
+    return control_response(send_command("point_stop", save=bool(body.get("save", True))))
+
+@app.route("/api/points/status")
+def api_points_status():
+    return control_response(send_command("point_status"))
+
+@app.route("/api/points")
+def api_points():
+    """Puntos terminados (los últimos `limit`)."""
+    try:
+        limit = max(1, min(int(request.args.get("limit", 100)), 10000))
+    except ValueError:
+        return jsonify({"error": "parámetros inválidos"}), 400
+    # point_averaging arrastra NumPy (geodesy): solo se importa si se usa
+    from point_averaging import POINTS_FILE, load_points
+    return jsonify({"file": POINTS_FILE, "points": load_points(POINTS_FILE, limit)})
 
-    # Asegurar bloque tilt
-    if "tilt" not in data or not isinstance(data["tilt"], dict):
-        data["tilt"] = {
-            "pitch": 0.0,
-            "roll": 0.0,
-            "heading": 0.0,
-            "angle": 0.0,
-            "status": "NONE",
-        }
+@app.route("/api/wire_stats")
+def api_wire_stats():
+    return jsonify(wire_report())
 
-    return jsonify(data)
+# --------------------------------------------------------------------
+# Panel K922 COM1 (WebSocket plano, protocolo de app.js)
+# --------------------------------------------------------------------
+K922_APPLY_TIMEOUT = 30.0
+K922_PROGRESS_INTERVAL = 0.5
+K922_RATE_SETTLE = 2.5   # una ventana del medidor de tasas tras el último comando
+
+def k922_status():
+    reply = send_command("receiver_status")
+    if not reply.get("ok"):
+        return {"type": "error", "payload": {"error": reply.get("error")}}
+    status = reply["status"]
+    if reply.get("receiver"):
+        status["config"] = reply["receiver"]
+    return {"type": "k922Status", "payload": status}
+
+def k922_apply(config):
+    """Aplica la configuración y va generando los mensajes de progreso."""
+    reply = send_command("receiver_apply", config=config)
+    if not reply.get("ok"):
+        yield {"type": "k922ConfigResult", "payload": {"ok": False, "error": reply.get("error")}}
+        return
+    job = reply["job"]
+    yield {"type": "k922ConfigAck", "payload": job}
+
+    deadline = time.time() + K922_APPLY_TIMEOUT
+    while not job.get("done") and time.time() < deadline:
+        time.sleep(K922_PROGRESS_INTERVAL)
+        status = send_command("receiver_status")
+        current = ((status.get("receiver") or {}).get("job")) or {}
+        if current.get("id") != job["id"]:
+            break   # otra configuración la ha sustituido
+        if current.get("counts") != job.get("counts"):
+            yield {"type": "k922ConfigProgress", "payload": {"id": job["id"], "counts": current["counts"]}}
+        job = current
+
+    counts = job.get("counts", {})
+    yield {"type": "k922ConfigResult", "payload": {
+        "ok": job.get("done", False) and set(counts) <= {"ok"},
+        "job": job,
+    }}
+    time.sleep(K922_RATE_SETTLE)
+    yield k922_status()
+
+def handle_panel_message(raw):
+    try:
+        msg = json.loads(raw)
+        kind = msg.get("type")
+    except (ValueError, AttributeError):
+        yield {"type": "error", "payload": {"error": "mensaje inválido"}}
+        return
+    if kind == "hello":
+        print(f"🔗 Panel K922 conectado ({msg.get('source', '?')})")
+        yield {"type": "hello", "payload": {"server": "gnssai-dashboard", "version": 1}}
+    elif kind == "getK922Status":
+        yield k922_status()
+    elif kind == "applyK922Config":
+        yield from k922_apply(msg.get("payload"))
+    else:
+        yield {"type": "error", "payload": {"error": f"tipo desconocido: {kind}"}}
+
+class WebSocketResponse(Response):
+    """El socket ya lo gestionó simple-websocket: que el servidor no escriba nada."""
+
+    def __init__(self, ws):
+        super().__init__()
+        self.ws = ws
+
+    def __call__(self, *args, **kwargs):
+        if self.ws.mode == "eventlet":
+            try:
+                from eventlet.wsgi import WSGI_LOCAL
+                WSGI_LOCAL.already_handled = True
+            except ImportError:
+                pass
+            return []
+        if self.ws.mode == "gunicorn":
+            raise StopIteration()
+        if self.ws.mode == "werkzeug":
+            raise ConnectionError()
+        return []
+
+@app.route("/ws/k922", websocket=True)
+def ws_k922():
+    if not WEBSOCKET_AVAILABLE:
+        return jsonify({"error": "simple-websocket no instalado"}), 501
+    try:
+        ws = WebSocketServer(request.environ)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        while True:
+            raw = ws.receive()
+            if raw is None:
+                continue
+            for reply in handle_panel_message(raw):
+                ws.send(json.dumps(reply, separators=(",", ":")))
+    except ConnectionClosed:
+        print("🔌 Panel K922 desconectado")
+    return WebSocketResponse(ws)
 
 @app.route("/static/<path:filename>")
 def static_files(filename):
@@ -728,39 +1237,86 @@ def static_files(filename):
 # --------------------------------------------------------------------
 # Socket.IO
 # --------------------------------------------------------------------
+def set_client_format(fmt):
+    sid = request.sid
+    old = client_formats.get(sid)
+    if old:
+        leave_room(WIRE_ROOM.format(old))
+    client_formats[sid] = fmt
+    join_room(WIRE_ROOM.format(fmt))
+
 @socketio.on("connect", namespace="/gnss")
 def handle_connect():
+    start_background_tasks()
     print("🔗 Cliente conectado a /gnss")
+    # JSON completo por defecto: los clientes antiguos siguen funcionando
+    set_client_format("json")
     if latest_stats:
-        socketio.emit("stats", latest_stats, namespace="/gnss")
+        emit("stats", latest_stats)
+
+@socketio.on("subscribe", namespace="/gnss")
+def handle_subscribe(message=None):
+    """
+    Negociación del formato: {"format": "json" | "compact" | "msgpack"}.
+    Devuelve (ack) el formato aceptado y el diccionario de la tabla.
+    """
+    wanted = (message or {}).get("format", "json")
+    fmt = wanted if wanted in wire_format.FORMATS else "json"
+    if fmt == "msgpack" and not wire_format.MSGPACK_AVAILABLE:
+        fmt = "compact"
+    set_client_format(fmt)
+    if latest_stats:
+        emit("stats", wire_format.encode_for(fmt, latest_stats))
+    return {
+        "format": fmt,
+        "version": wire_format.WIRE_VERSION,
+        "sat_dict": {"constellation": wire_format.CONSTELLATIONS, "status": wire_format.STATUSES},
+    }
 
 @socketio.on("disconnect", namespace="/gnss")
 def handle_disconnect():
+    client_formats.pop(request.sid, None)
     print("🔌 Cliente desconectado de /gnss")
 
 # --------------------------------------------------------------------
 # Main
 # --------------------------------------------------------------------
-def main():
-    ensure_template()
-
-    # Lanzar threads
-    t_json = threading.Thread(target=read_json_data, daemon=True)
-    t_json.start()
+def run_server(host="0.0.0.0", port=5000):
+    """Arranca el servidor según ASYNC_MODE (keep-alive en todos los modos)."""
+    if ASYNC_MODE == "eventlet":
+        socketio.run(app, host=host, port=port, debug=False,
+                     log_output=False, keepalive=True, max_size=4096)
+    elif ASYNC_MODE == "gevent":
+        socketio.run(app, host=host, port=port, debug=False, log_output=False)
+    else:
+        # HTTP/1.1 para que Werkzeug mantenga la conexión (keep-alive)
+        from werkzeug.serving import WSGIRequestHandler
+        WSGIRequestHandler.protocol_version = "HTTP/1.1"
+        socketio.run(app, host=host, port=port, debug=False, allow_unsafe_werkzeug=True)
 
-    t_up = threading.Thread(target=update_uptime, daemon=True)
-    t_up.start()
+def main():
+    start_background_tasks()
 
     print("=" * 60)
     print("🛰️  GNSS.AI Dashboard Server v3.1")
     print("=" * 60)
+    print(f"⚙️  Modo:      {ASYNC_MODE}")
     print(f"📊 Dashboard: http://0.0.0.0:5000")
     print(f"📡 API REST:  http://0.0.0.0:5000/api/stats")
+    print(f"📈 Métricas:  http://0.0.0.0:5000/metrics")
+    print(f"🕒 Histórico: http://0.0.0.0:5000/api/history")
+    print(f"📦 Cable:     http://0.0.0.0:5000/api/wire_stats")
+    print(f"🌌 Skyplot:   http://0.0.0.0:5000/api/sky")
+    print(f"📍 Puntos:    http://0.0.0.0:5000/api/points")
+    print(f"🛠️  Panel K922: ws://0.0.0.0:5000/ws/k922")
     print(f"💾 Data File: {JSON_DATA_FILE}")
     print("=" * 60)
     print("✅ Servidor iniciado. Ctrl+C para detener.")
     print("")
-    socketio.run(app, host="0.0.0.0", port=5000, debug=False, allow_unsafe_werkzeug=True)
+    run_server()
 
 if __name__ == "__main__":
     main()
+elif "gunicorn" in sys.modules:
+    # gunicorn importa la app y nunca llama a main()
+    start_background_tasks()
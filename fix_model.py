@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Fix Model
+- Modelo completo de la solución a partir de GGA + RMC + GST + GSA
+- Un split por sentencia y actualización in situ de atributos (__slots__):
+  no se crea ningún dict por sentencia
+- Coordenadas DDMM.MMMM exactas: los minutos se leen como entero escalado
+  y se convierten con una sola división (un solo redondeo)
+- Precisión real a partir de las sigmas de GST; si no hay GST reciente se
+  cae a la estimación por calidad/HDOP
+"""
+
+import math
+import time
+
+KNOTS_TO_MS = 0.514444
+
+QUALITY_LABELS = {
+    0: "NO_FIX",
+    1: "GPS",
+    2: "DGPS",
+    3: "PPS",
+    4: "RTK_FIXED",
+    5: "RTK_FLOAT",
+    6: "DEAD_RECKONING",
+    7: "MANUAL",
+    8: "SIMULATION",
+}
+
+# Identificador de sistema del campo 18 de GSA (NMEA 4.10+)
+GSA_SYSTEMS = {"1": "GPS", "2": "GLONASS", "3": "Galileo", "4": "BeiDou", "5": "QZSS", "6": "NavIC"}
+
+GST_MAX_AGE = 5.0
+
+
+def parse_coordinate(coord: str, hemisphere: str) -> float:
+    """DDMM.MMMM / DDDMM.MMMM -> grados decimales con un único redondeo."""
+    if not coord:
+        return 0.0
+    dot = coord.find(".")
+    if dot < 0:
+        dot = len(coord)
+    degrees = int(coord[: dot - 2] or 0)
+    frac = coord[dot + 1 :]
+    minutes_scaled = int(coord[dot - 2 : dot] + frac)
+    value = degrees + minutes_scaled / (60 * 10 ** len(frac))
+    return -value if hemisphere in ("S", "W") else value
+
+
+def _f(field):
+    return float(field) if field else None
+
+
+def _i(field):
+    return int(field) if field else None
+
+
+class FixModel:
+    """Estado de la solución; cada parse_* actualiza sus campos in situ."""
+
+    __slots__ = (
+        "utc", "date", "lat", "lon", "alt", "geoid_sep", "quality", "sats_used",
+        "hdop", "diff_age", "station_id",
+        "rmc_status", "mode", "speed_ms", "course",
+        "gst_rms", "sigma_major", "sigma_minor", "sigma_orient",
+        "sigma_lat", "sigma_lon", "sigma_alt", "t_gst",
+        "fix_type", "pdop", "vdop", "gsa_hdop", "gsa_used",
+        "t_gga", "sentences",
+    )
+
+    def __init__(self):
+        self.utc = ""
+        self.date = ""
+        self.lat = self.lon = 0.0
+        self.alt = 0.0
+        self.geoid_sep = 0.0
+        self.quality = 0
+        self.sats_used = 0
+        self.hdop = 0.0
+        self.diff_age = None
+        self.station_id = ""
+        self.rmc_status = ""
+        self.mode = ""
+        self.speed_ms = 0.0
+        self.course = None
+        self.gst_rms = None
+        self.sigma_major = self.sigma_minor = self.sigma_orient = None
+        self.sigma_lat = self.sigma_lon = self.sigma_alt = None
+        self.t_gst = 0.0
+        self.fix_type = 1
+        self.pdop = self.vdop = self.gsa_hdop = None
+        self.gsa_used = {}
+        self.t_gga = 0.0
+        self.sentences = 0
+
+    # ------------------------------------------------------------------
+    # Parsers (reciben la sentencia ya partida, sin checksum en el último campo)
+    # ------------------------------------------------------------------
+    def parse_gga(self, p):
+        # $xxGGA,utc,lat,N,lon,E,q,sats,hdop,alt,M,sep,M,age,stn
+        if len(p) < 15:
+            return False
+        try:
+            self.utc = p[1]
+            if p[2] and p[4]:
+                self.lat = parse_coordinate(p[2], p[3])
+                self.lon = parse_coordinate(p[4], p[5])
+            self.quality = int(p[6]) if p[6] else 0
+            self.sats_used = int(p[7]) if p[7] else 0
+            if p[8]:
+                self.hdop = float(p[8])
+            if p[9]:
+                self.alt = float(p[9])
+            if p[11]:
+                self.geoid_sep = float(p[11])
+            self.diff_age = _f(p[13])
+            self.station_id = p[14]
+        except ValueError:
+            return False
+        self.t_gga = time.time()
+        self.sentences += 1
+        return True
+
+    def parse_rmc(self, p):
+        # $xxRMC,utc,A,lat,N,lon,E,sog,cog,date,magvar,E,mode[,navstatus]
+        if len(p) < 10:
+            return False
+        try:
+            self.rmc_status = p[2]
+            self.speed_ms = float(p[7]) * KNOTS_TO_MS if p[7] else 0.0
+            self.course = _f(p[8])
+            self.date = p[9]
+            if len(p) > 12:
+                self.mode = p[12]
+        except ValueError:
+            return False
+        self.sentences += 1
+        return True
+
+    def parse_gst(self, p):
+        # $xxGST,utc,rms,major,minor,orient,sd_lat,sd_lon,sd_alt
+        if len(p) < 9:
+            return False
+        try:
+            self.gst_rms = _f(p[2])
+            self.sigma_major = _f(p[3])
+            self.sigma_minor = _f(p[4])
+            self.sigma_orient = _f(p[5])
+            self.sigma_lat = _f(p[6])
+            self.sigma_lon = _f(p[7])
+            self.sigma_alt = _f(p[8])
+        except ValueError:
+            return False
+        self.t_gst = time.time()
+        self.sentences += 1
+        return True
+
+    def parse_gsa(self, p):
+        # $xxGSA,A,3,sv1..sv12,pdop,hdop,vdop[,system]
+        if len(p) < 18:
+            return False
+        try:
+            self.fix_type = int(p[2]) if p[2] else 1
+            self.pdop = _f(p[15])
+            self.gsa_hdop = _f(p[16])
+            self.vdop = _f(p[17])
+        except ValueError:
+            return False
+        used = 0
+        for i in range(3, 15):
+            if p[i]:
+                used += 1
+        system = GSA_SYSTEMS.get(p[18], p[18]) if len(p) > 18 else p[0][1:3]
+        self.gsa_used[system] = used
+        self.sentences += 1
+        return True
+
+    # ------------------------------------------------------------------
+    @property
+    def ellipsoidal_height(self):
+        return self.alt + self.geoid_sep
+
+    def gst_fresh(self, now=None):
+        return self.sigma_lat is not None and (now or time.time()) - self.t_gst <= GST_MAX_AGE
+
+    def accuracy(self, now=None):
+        """
+        (horizontal_m, vertical_m, fuente). Con GST: sigma 2D 1σ
+        (sqrt(σlat² + σlon²)); sin GST: estimación por calidad/HDOP.
+        """
+        if self.gst_fresh(now):
+            h = math.hypot(self.sigma_lat, self.sigma_lon or 0.0)
+            return h, self.sigma_alt, "GST"
+        return estimate_accuracy_m(self.quality, self.hdop), None, "HDOP"
+
+    def snapshot(self, now=None):
+        h_acc, v_acc, source = self.accuracy(now)
+        return {
+            "utc": self.utc,
+            "date": self.date,
+            "quality": self.quality,
+            "quality_label": QUALITY_LABELS.get(self.quality, str(self.quality)),
+            "sats_used": self.sats_used,
+            "geoid_sep": self.geoid_sep,
+            "ellipsoidal_height": round(self.ellipsoidal_height, 4),
+            "diff_age": self.diff_age,
+            "station_id": self.station_id,
+            "speed_ms": round(self.speed_ms, 3),
+            "course": self.course,
+            "mode": self.mode,
+            "fix_type": self.fix_type,
+            "dop": {"pdop": self.pdop, "hdop": self.gsa_hdop or self.hdop, "vdop": self.vdop},
+            "gsa_used": dict(self.gsa_used),
+            "sigma": {
+                "rms": self.gst_rms,
+                "major": self.sigma_major,
+                "minor": self.sigma_minor,
+                "orient": self.sigma_orient,
+                "lat": self.sigma_lat,
+                "lon": self.sigma_lon,
+                "alt": self.sigma_alt,
+            } if self.sigma_lat is not None else None,
+            "accuracy": {
+                "horizontal_m": round(h_acc, 4) if h_acc is not None else None,
+                "vertical_m": round(v_acc, 4) if v_acc is not None else None,
+                "source": source,
+            },
+        }
+
+
+def estimate_accuracy_m(quality, hdop):
+    """Estimación burda (m) cuando no hay GST."""
+    if quality == 4:
+        return 0.02
+    if quality == 5:
+        return 0.20
+    if quality == 2:
+        return 0.50
+    if quality == 1:
+        return min(hdop, 10.0) if hdop < 10 else 10.0
+    return None
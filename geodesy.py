@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Geodesy
+- Conversiones WGS84 vectorizadas (NumPy): geodésicas <-> ECEF <-> ENU
+  Todas aceptan escalares o arrays (una época o un lote de épocas)
+- Compensación de inclinación del bastón: posición de la punta a partir
+  del centro de fase de la antena, longitud del bastón y actitud
+- Formato NMEA de coordenadas (DDMM.MMMMMMM) para reescribir GGA
+
+Convenio de actitud (el del dashboard):
+    heading  rumbo del eje "adelante" del receptor, desde el norte, horario
+    pitch    + la antena se inclina hacia adelante
+    roll     + la antena se inclina hacia la derecha
+"""
+
+import numpy as np
+
+# Elipsoide WGS84
+WGS84_A = 6378137.0
+WGS84_F = 1.0 / 298.257223563
+WGS84_B = WGS84_A * (1.0 - WGS84_F)
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)
+WGS84_EP2 = WGS84_E2 / (1.0 - WGS84_E2)
+
+
+def geodetic_to_ecef(lat, lon, h):
+    """Lat/lon en grados, altura elipsoidal en m -> (x, y, z) ECEF en m."""
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    h = np.asarray(h, dtype=float)
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    n = WGS84_A / np.sqrt(1.0 - WGS84_E2 * sin_lat * sin_lat)
+    x = (n + h) * cos_lat * np.cos(lon)
+    y = (n + h) * cos_lat * np.sin(lon)
+    z = (n * (1.0 - WGS84_E2) + h) * sin_lat
+    return x, y, z
+
+
+def ecef_to_geodetic(x, y, z):
+    """ECEF -> (lat, lon, h). Bowring con una iteración (error < 1 mm en tierra)."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    z = np.asarray(z, dtype=float)
+    p = np.hypot(x, y)
+    lon = np.arctan2(y, x)
+
+    theta = np.arctan2(z * WGS84_A, p * WGS84_B)
+    lat = np.arctan2(
+        z + WGS84_EP2 * WGS84_B * np.sin(theta) ** 3,
+        p - WGS84_E2 * WGS84_A * np.cos(theta) ** 3,
+    )
+    # Un refinamiento más: precisión submilimétrica para cualquier altura razonable
+    theta = np.arctan((WGS84_B / WGS84_A) * np.tan(lat))
+    lat = np.arctan2(
+        z + WGS84_EP2 * WGS84_B * np.sin(theta) ** 3,
+        p - WGS84_E2 * WGS84_A * np.cos(theta) ** 3,
+    )
+
+    sin_lat = np.sin(lat)
+    n = WGS84_A / np.sqrt(1.0 - WGS84_E2 * sin_lat * sin_lat)
+    cos_lat = np.cos(lat)
+    # Cerca de los polos p/cos(lat) pierde precisión: se usa z/sin(lat)
+    h = np.where(
+        np.abs(cos_lat) > 1e-6,
+        p / np.where(np.abs(cos_lat) > 1e-6, cos_lat, 1.0) - n,
+        np.abs(z) / np.where(np.abs(sin_lat) > 0, np.abs(sin_lat), 1.0) - n * (1.0 - WGS84_E2),
+    )
+    return np.degrees(lat), np.degrees(lon), h
+
+
+def _enu_rotation(lat0, lon0):
+    lat0 = np.radians(lat0)
+    lon0 = np.radians(lon0)
+    return np.sin(lat0), np.cos(lat0), np.sin(lon0), np.cos(lon0)
+
+
+def ecef_to_enu(x, y, z, lat0, lon0, h0):
+    """ECEF -> ENU local respecto al origen geodésico (lat0, lon0, h0)."""
+    x0, y0, z0 = geodetic_to_ecef(lat0, lon0, h0)
+    dx = np.asarray(x, dtype=float) - x0
+    dy = np.asarray(y, dtype=float) - y0
+    dz = np.asarray(z, dtype=float) - z0
+    sl, cl, so, co = _enu_rotation(lat0, lon0)
+    e = -so * dx + co * dy
+    n = -sl * co * dx - sl * so * dy + cl * dz
+    u = cl * co * dx + cl * so * dy + sl * dz
+    return e, n, u
+
+
+def enu_to_ecef(e, n, u, lat0, lon0, h0):
+    """ENU local -> ECEF."""
+    x0, y0, z0 = geodetic_to_ecef(lat0, lon0, h0)
+    sl, cl, so, co = _enu_rotation(lat0, lon0)
+    e = np.asarray(e, dtype=float)
+    n = np.asarray(n, dtype=float)
+    u = np.asarray(u, dtype=float)
+    x = x0 - so * e - sl * co * n + cl * co * u
+    y = y0 + co * e - sl * so * n + cl * so * u
+    z = z0 + cl * n + sl * u
+    return x, y, z
+
+
+def geodetic_to_enu(lat, lon, h, lat0, lon0, h0):
+    return ecef_to_enu(*geodetic_to_ecef(lat, lon, h), lat0, lon0, h0)
+
+
+def enu_to_geodetic(e, n, u, lat0, lon0, h0):
+    return ecef_to_geodetic(*enu_to_ecef(e, n, u, lat0, lon0, h0))
+
+
+# =============================================================================
+# COMPENSACIÓN DE INCLINACIÓN
+# =============================================================================
+
+def pole_vector_enu(heading, pitch, roll, length):
+    """
+    Vector punta -> antena en ENU (m) para un bastón de `length` metros.
+    Se inclina primero en pitch (hacia adelante) y luego en roll (derecha).
+    """
+    psi = np.radians(heading)
+    theta = np.radians(pitch)
+    phi = np.radians(roll)
+    forward = np.sin(theta)
+    right = np.cos(theta) * np.sin(phi)
+    up = np.cos(theta) * np.cos(phi)
+    length = np.asarray(length, dtype=float)
+    e = length * (forward * np.sin(psi) + right * np.cos(psi))
+    n = length * (forward * np.cos(psi) - right * np.sin(psi))
+    u = length * up
+    return e, n, u
+
+
+def pole_tip(lat, lon, h, heading, pitch, roll, length):
+    """
+    Posición de la punta del bastón (lat, lon, h) y desplazamiento ENU
+    antena -> punta. Vectorizado: cada argumento puede ser un array de épocas.
+    """
+    e, n, u = pole_vector_enu(heading, pitch, roll, length)
+    tip_lat, tip_lon, tip_h = enu_to_geodetic(-e, -n, -u, lat, lon, h)
+    return tip_lat, tip_lon, tip_h, (-e, -n, -u)
+
+
+# =============================================================================
+# NMEA
+# =============================================================================
+
+def nmea_coordinate(value, is_lat):
+    """Grados decimales -> (DDMM.MMMMMMM | DDDMM.MMMMMMM, hemisferio)."""
+    hemi = ("N" if value >= 0 else "S") if is_lat else ("E" if value >= 0 else "W")
+    value = abs(float(value))
+    degrees = int(value)
+    minutes = (value - degrees) * 60.0
+    if round(minutes, 7) >= 60.0:
+        degrees += 1
+        minutes = 0.0
+    width = 2 if is_lat else 3
+    return f"{degrees:0{width}d}{minutes:010.7f}", hemi
+
+
+def nmea_sentence(body):
+    """Añade '$', checksum y CRLF a un cuerpo sin delimitadores."""
+    calc = 0
+    for ch in body:
+        calc ^= ord(ch)
+    return f"${body}*{calc:02X}\r\n"
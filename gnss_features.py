@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Features
+- Definición única de las características temporales por satélite que usan
+  SignalClassifier (tiempo real, incremental) y GNSSMLTrainer (CSV de
+  sesiones, vectorizado): el modelo se entrena con lo mismo que ve en vivo
+- Ventana de WINDOW observaciones del mismo satélite (sistema + PRN),
+  incluida la actual; pendientes por segundo (no por muestra), así que la
+  tasa de GSV o de guardado del recolector no cambia el valor
+
+Características (TEMPORAL_FEATURES):
+    snr_slope          pendiente de C/N0 en la ventana (dB-Hz/s, mínimos cuadrados)
+    snr_var            varianza de C/N0 en la ventana (poblacional)
+    elev_rate          pendiente de la elevación (°/s)
+    cn0_elev_residual  C/N0 - modelo nominal C/N0(elevación)
+
+Incremental: RollingTrend mantiene medias y co-momentos (Welford con
+altas y bajas) y se recalcula desde la ventana cada WINDOW bajas para que
+no derive. Vectorizado: add_temporal_features() con groupby + rolling de
+pandas sobre millones de filas.
+"""
+
+import math
+from collections import deque
+
+WINDOW = 50
+
+# Subir al cambiar cualquier definición: invalida la caché del entrenador
+FEATURES_VERSION = 1
+
+TEMPORAL_FEATURES = ['snr_slope', 'snr_var', 'elev_rate', 'cn0_elev_residual']
+
+# Modelo nominal C/N0(elevación) de una antena despejada: horizonte -> cenit
+CN0_HORIZON = 34.0
+CN0_ZENITH = 48.0
+
+# Por debajo, la ventana no abarca tiempo suficiente para una pendiente (s²)
+MIN_TIME_VAR = 1e-6
+
+
+def expected_cn0(elevation):
+    """C/N0 nominal (dB-Hz) a una elevación en grados."""
+    return CN0_HORIZON + (CN0_ZENITH - CN0_HORIZON) * math.sin(math.radians(max(elevation, 0.0)))
+
+
+class RollingTrend:
+    """Características temporales de un satélite, actualizadas en O(1) por muestra."""
+
+    __slots__ = ('window', 't0', 'n', 'mean_t', 'mean_s', 'mean_e', 'm2_t', 'm2_s', 'c_ts', 'c_te', '_removed')
+
+    def __init__(self, size=WINDOW):
+        self.window = deque(maxlen=size)
+        self._reset()
+
+    def _reset(self, t0=None):
+        self.t0 = t0      # origen de tiempos: momentos pequeños con timestamps epoch
+        self.n = 0
+        self.mean_t = self.mean_s = self.mean_e = 0.0
+        self.m2_t = self.m2_s = self.c_ts = self.c_te = 0.0
+        self._removed = 0
+
+    def _add(self, t, s, e):
+        if self.t0 is None:
+            self.t0 = t
+        t -= self.t0
+        self.n += 1
+        dt = t - self.mean_t
+        ds = s - self.mean_s
+        self.mean_t += dt / self.n
+        self.mean_s += ds / self.n
+        self.mean_e += (e - self.mean_e) / self.n
+        # Co-momentos con la media vieja de un lado y la nueva del otro
+        self.m2_t += dt * (t - self.mean_t)
+        self.m2_s += ds * (s - self.mean_s)
+        self.c_ts += dt * (s - self.mean_s)
+        self.c_te += dt * (e - self.mean_e)
+
+    def _remove(self, t, s, e):
+        if self.n <= 1:
+            self._reset()
+            return
+        t -= self.t0
+        self.n -= 1
+        dt = t - self.mean_t
+        ds = s - self.mean_s
+        self.mean_t -= dt / self.n
+        self.mean_s -= ds / self.n
+        self.mean_e -= (e - self.mean_e) / self.n
+        self.m2_t -= dt * (t - self.mean_t)
+        self.m2_s -= ds * (s - self.mean_s)
+        self.c_ts -= dt * (s - self.mean_s)
+        self.c_te -= dt * (e - self.mean_e)
+
+    def push(self, t, snr, elevation):
+        """Añade una observación (timestamp en s) y saca la más vieja si la ventana está llena."""
+        window = self.window
+        if len(window) == window.maxlen:
+            self._remove(*window[0])
+            self._removed += 1
+        window.append((t, snr, elevation))
+        if self._removed >= window.maxlen:
+            # Recalcular desde cero: las bajas acumulan error de redondeo
+            self._reset(window[0][0])
+            for row in window:
+                self._add(*row)
+        else:
+            self._add(t, snr, elevation)
+
+    def features(self):
+        """[snr_slope, snr_var, elev_rate, cn0_elev_residual] de la ventana actual."""
+        if self.n == 0:
+            return [0.0, 0.0, 0.0, 0.0]
+        t, snr, elevation = self.window[-1]
+        if self.m2_t > MIN_TIME_VAR * self.n:
+            snr_slope = self.c_ts / self.m2_t
+            elev_rate = self.c_te / self.m2_t
+        else:
+            snr_slope = elev_rate = 0.0
+        snr_var = max(self.m2_s / self.n, 0.0)
+        return [snr_slope, snr_var, elev_rate, snr - expected_cn0(elevation)]
+
+
+def add_temporal_features(df, keys, time_col='t', window=WINDOW):
+    """
+    Añade TEMPORAL_FEATURES a un DataFrame con columnas snr, elevation,
+    time_col (s) y las de `keys` (p. ej. ['session', 'sat_id']).
+    Misma definición que RollingTrend, vectorizada por grupos.
+    """
+    # pandas solo hace falta al entrenar: no se importa en tiempo real
+    import numpy as np
+    import pandas as pd
+
+    # rolling es posicional: dentro de cada grupo las filas deben ir en orden temporal
+    order = df[time_col].sort_values(kind='mergesort').index
+    data = df.loc[order]
+    group_keys = [data[k] for k in keys]
+    g = data.groupby(group_keys, sort=False)
+
+    # Centrado por grupo: momentos pequeños, sin cancelación al restar
+    t = data[time_col] - g[time_col].transform('mean')
+    s = data['snr'] - g['snr'].transform('mean')
+    e = data['elevation'] - g['elevation'].transform('mean')
+    work = pd.DataFrame({
+        't': t, 's': s, 'e': e,
+        'tt': t * t, 'ss': s * s, 'ts': t * s, 'te': t * e,
+    })
+    m = (work.groupby(group_keys, sort=False)
+             .rolling(window, min_periods=1).mean()
+             .reset_index(level=list(range(len(keys))), drop=True)
+             .reindex(data.index))
+
+    var_t = (m['tt'] - m['t'] ** 2).to_numpy()
+    cov_ts = (m['ts'] - m['t'] * m['s']).to_numpy()
+    cov_te = (m['te'] - m['t'] * m['e']).to_numpy()
+    has_span = var_t > MIN_TIME_VAR
+    safe_var = np.where(has_span, var_t, 1.0)
+
+    elevation = data['elevation'].to_numpy(dtype=float)
+    expected = CN0_HORIZON + (CN0_ZENITH - CN0_HORIZON) * np.sin(np.radians(np.maximum(elevation, 0.0)))
+    features = pd.DataFrame({
+        'snr_slope': np.where(has_span, cov_ts / safe_var, 0.0),
+        'snr_var': np.maximum((m['ss'] - m['s'] ** 2).to_numpy(), 0.0),
+        'elev_rate': np.where(has_span, cov_te / safe_var, 0.0),
+        'cn0_elev_residual': data['snr'].to_numpy(dtype=float) - expected,
+    }, index=data.index)
+
+    out = df.copy()
+    for name in TEMPORAL_FEATURES:
+        out[name] = features[name].reindex(df.index)
+    return out
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Benchmark Suite
+- NMEA sintético (o un log .gnraw grabado) a través de todo el pipeline:
+    parse      -> SmartProcessor.process_nmea_line
+    classify   -> SignalClassifier.classify_signals
+    json       -> SmartProcessor.update_dashboard_json
+    fifo       -> escritura al FIFO con un lector real
+    api_stats  -> GET /api/stats del dashboard_server (si Flask está instalado)
+- Informe: ops/s, percentiles de latencia, asignaciones (tracemalloc) y RSS
+- Baselines guardados en JSON para detectar regresiones entre ejecuciones
+
+Uso:
+    python3 gnssai_benchmark.py                      # sintético, 300 épocas
+    python3 gnssai_benchmark.py --replay log.gnraw   # datos reales grabados
+    python3 gnssai_benchmark.py --save-baseline      # guarda baseline
+    python3 gnssai_benchmark.py --check              # exit 1 si hay regresión
+    python3 gnssai_benchmark.py --load http://127.0.0.1:5000 --clients 1 5 20
+                                                     # carga sobre un dashboard vivo
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import errno
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "benchmarks", "baseline.json")
+
+# Regresión si el throughput cae o el p99 sube más de este porcentaje
+DEFAULT_TOLERANCE = 15.0
+
+
+# =============================================================================
+# DATOS DE ENTRADA
+# =============================================================================
+
+def nmea_checksum(body: str) -> str:
+    calc = 0
+    for ch in body[1:]:
+        calc ^= ord(ch)
+    return f"{body}*{calc:02X}"
+
+
+def synthetic_epoch(epoch: int, rng: random.Random):
+    """Una época 1 Hz multi-constelación: GGA + RMC + GSA + GST + GSV."""
+    hhmmss = time.strftime("%H%M%S", time.gmtime(epoch))
+    lat = 4807.038 + rng.uniform(-0.0005, 0.0005)
+    lon = 1131.000 + rng.uniform(-0.0005, 0.0005)
+    lines = [
+        nmea_checksum(f"$GNGGA,{hhmmss}.00,{lat:.6f},N,{lon:.6f},E,4,24,0.7,545.412,M,46.9,M,1.0,0001"),
+        nmea_checksum(f"$GNRMC,{hhmmss}.00,A,{lat:.6f},N,{lon:.6f},E,0.02,12.5,191026,,,D"),
+        nmea_checksum("$GNGSA,A,3,02,05,12,15,18,24,25,29,,,,,1.2,0.7,1.0"),
+        nmea_checksum(f"$GNGST,{hhmmss}.00,1.2,0.012,0.009,45.0,0.011,0.010,0.021"),
+    ]
+    # GSV NMEA 4.11: un bloque por señal (ID final), L1 + L5/E5a/B2a
+    for talker, count, signals in (("GP", 12, "18"), ("GL", 8, "1"), ("GA", 10, "71"), ("GB", 14, "15")):
+        msgs = (count + 3) // 4
+        for signal_id in signals:
+            offset = 0 if signal_id == signals[0] else 3   # L5 llega algo más fuerte
+            for msg in range(msgs):
+                fields = [f"${talker}GSV", str(msgs), str(msg + 1), str(count)]
+                for k in range(msg * 4, min(count, msg * 4 + 4)):
+                    elevation = (k * 7 + epoch // 60) % 85 + 5
+                    azimuth = (k * 29) % 360
+                    snr = max(0, int(18 + offset + elevation * 0.35 + rng.gauss(0, 3)))
+                    fields += [f"{k + 1:02d}", str(elevation), f"{azimuth:03d}", str(snr)]
+                fields.append(signal_id)
+                lines.append(nmea_checksum(",".join(fields)))
+    return lines
+
+
+def synthetic_epochs(count: int, seed=42):
+    rng = random.Random(seed)
+    return [synthetic_epoch(ep, rng) for ep in range(count)]
+
+
+def replay_epochs(path: str):
+    """Agrupa las sentencias de un log .gnraw en épocas (corte en cada GGA)."""
+    from rtcm3 import StreamDemuxer, KIND_NMEA
+    from uart_replay import iter_records
+
+    demux = StreamDemuxer()
+    epochs, current = [], []
+    for _, data in iter_records(path):
+        for kind, frame in demux.feed(data):
+            if kind != KIND_NMEA:
+                continue
+            line = str(frame, "ascii", "ignore")
+            if "GGA" in line[:7] and current:
+                epochs.append(current)
+                current = []
+            current.append(line)
+    if current:
+        epochs.append(current)
+    return epochs
+
+
+# =============================================================================
+# MEDICIÓN
+# =============================================================================
+
+def rss_kb() -> int:
+    """RSS actual en kB (Linux /proc, o ru_maxrss como aproximación)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run_stage(name, items, fn, unit="op"):
+    """
+    Ejecuta fn(item) para cada item dos veces: una midiendo latencias
+    (perf_counter_ns) y otra con tracemalloc para contar asignaciones.
+    Si fn devuelve False la operación se descartó (p. ej. EAGAIN en el
+    FIFO): cuenta en "dropped", no en ops/s ni en las latencias.
+    """
+    clock = time.perf_counter_ns
+    latencies = []
+    dropped = 0
+
+    gc.collect()
+    rss_before = rss_kb()
+    start = clock()
+    for item in items:
+        t0 = clock()
+        ok = fn(item)
+        t1 = clock()
+        if ok is False:
+            dropped += 1
+        else:
+            latencies.append(t1 - t0)
+    total_ns = clock() - start
+    rss_after = rss_kb()
+
+    tracemalloc.start()
+    snap_before = tracemalloc.take_snapshot()
+    for item in items:
+        fn(item)
+    snap_after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    alloc_blocks = sum(s.count_diff for s in snap_after.compare_to(snap_before, "filename") if s.count_diff > 0)
+
+    latencies.sort()
+    ops = len(latencies)
+    us = lambda ns: round(ns / 1000.0, 2)
+    return {
+        "stage": name,
+        "unit": unit,
+        "ops": ops,
+        "dropped": dropped,
+        "ops_per_s": round(ops / (total_ns / 1e9), 1) if total_ns else 0.0,
+        "p50_us": us(percentile(latencies, 50)),
+        "p90_us": us(percentile(latencies, 90)),
+        "p99_us": us(percentile(latencies, 99)),
+        "max_us": us(latencies[-1]) if latencies else 0.0,
+        "alloc_peak_kb": round(peak / 1024.0, 1),
+        "alloc_blocks_retained": alloc_blocks,
+        "rss_kb": rss_after,
+        "rss_delta_kb": rss_after - rss_before,
+    }
+
+
+# =============================================================================
+# ETAPAS
+# =============================================================================
+
+class FifoDrain:
+    """FIFO temporal con un lector que vacía continuamente (como bt-gps-spp)."""
+
+    def __init__(self):
+        self.dir = tempfile.mkdtemp(prefix="gnssai_bench_")
+        self.path = os.path.join(self.dir, "fifo")
+        os.mkfifo(self.path, 0o600)
+        self.bytes = 0
+        self._fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        self.running = True
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        import select
+        while self.running:
+            ready, _, _ = select.select([self._fd], [], [], 0.001)
+            if ready:
+                try:
+                    self.bytes += len(os.read(self._fd, 1 << 20))
+                except OSError as e:
+                    if e.errno != errno.EAGAIN:
+                        return
+
+    def close(self):
+        self.running = False
+        self._thread.join(1.0)
+        os.close(self._fd)
+        os.remove(self.path)
+        os.rmdir(self.dir)
+
+
+def make_processor(tmpdir):
+    """
+    SmartProcessor aislado en tmpdir: nada de lo que procesa toca el estado
+    de producción (histórico, máscara de cielo, checkpoint, archivo).
+    """
+    from smart_processor import SmartProcessor
+
+    # Rutas aisladas desde el constructor: histórico y máscara de cielo
+    # (vacía) en tmpdir, sin checkpoint ni archivo crudo; se sigue midiendo
+    # el coste del histórico
+    proc = SmartProcessor(state_dir=tmpdir)
+    # Aísla el parseo: FIFO a /dev/null (la etapa fifo lo mide aparte)
+    proc.fifo_fd = os.open(os.devnull, os.O_WRONLY)
+    # El clasificador comparte la máscara aislada del procesador
+    proc.load_deferred()
+    return proc
+
+
+def bench_all(epochs, stages=None):
+    stages = set(stages or ("parse", "classify", "json", "fifo", "api_stats"))
+    results = []
+    lines = [line for epoch in epochs for line in epoch]
+    tmpdir = tempfile.mkdtemp(prefix="gnssai_bench_")
+
+    proc = make_processor(tmpdir)
+
+    if "parse" in stages:
+        results.append(run_stage("parse", lines, proc.process_nmea_line, "sentence"))
+
+    if "classify" in stages:
+        try:
+            from ml_classifier import SignalClassifier
+            classifier = SignalClassifier()
+            classifier.logger.disabled = True
+            snapshots = []
+            for epoch in epochs:
+                for line in epoch:
+                    proc.process_nmea_line(line)
+                snapshots.append(proc.sat_table.classifier_input())
+            results.append(run_stage("classify", snapshots, classifier.classify_signals, "epoch"))
+        except ImportError as e:
+            print(f"⚠️  classify omitido: {e}")
+
+    if "json" in stages:
+        results.append(run_stage("json", range(max(len(epochs), 50)),
+                                 lambda _: proc.update_dashboard_json(), "publish"))
+
+    if "fifo" in stages:
+        drain = FifoDrain()
+        fifo_proc = make_processor(tmpdir)
+        os.close(fifo_proc.fifo_fd)
+        fifo_proc.fifo_fd = None
+        fifo_proc.fifo_path = drain.path
+        payloads = [(line + "\r\n").encode("ascii") for line in lines]
+        results.append(run_stage("fifo", payloads, fifo_proc._write_fifo, "sentence"))
+        if fifo_proc.fifo_fd is not None:
+            os.close(fifo_proc.fifo_fd)
+        drain.close()
+
+    if "api_stats" in stages:
+        try:
+            import dashboard_server
+            # Sin lector del JSON real ni concesión en el SmartProcessor de producción
+            dashboard_server.AUTOSTART_TASKS = False
+            proc.update_dashboard_json()
+            with open(proc.json_path) as f:
+                dashboard_server.latest_stats = json.load(f)
+            dashboard_server.stats_cache = dashboard_server.build_stats_cache(
+                dashboard_server.latest_stats)
+            client = dashboard_server.app.test_client()
+            results.append(run_stage("api_stats", range(500),
+                                     lambda _: client.get("/api/stats"), "request"))
+        except ImportError as e:
+            print(f"⚠️  api_stats omitido: {e}")
+
+    os.close(proc.fifo_fd)
+    shutil.rmtree(tmpdir, ignore_errors=True)
+    return results
+
+
+# =============================================================================
+# CARGA HTTP SOBRE UN DASHBOARD EN MARCHA
+# =============================================================================
+
+def _load_client(host, port, path, deadline, latencies, counters, lock):
+    """Un cliente tipo tablet: conexión keep-alive, gzip e If-None-Match."""
+    import http.client
+
+    conn = None
+    etag = None
+    local = []
+    ok = not_modified = errors = 0
+    nbytes = 0
+    while time.perf_counter() < deadline:
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection(host, port, timeout=10)
+            headers = {"Accept-Encoding": "gzip"}
+            if etag:
+                headers["If-None-Match"] = etag
+            t0 = time.perf_counter_ns()
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+            local.append(time.perf_counter_ns() - t0)
+            nbytes += len(body)
+            if resp.status == 304:
+                not_modified += 1
+            elif resp.status == 200:
+                ok += 1
+                etag = resp.getheader("ETag")
+            else:
+                errors += 1
+            if resp.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            if conn is not None:
+                conn.close()
+            conn = None
+            time.sleep(0.05)
+    if conn is not None:
+        conn.close()
+    with lock:
+        latencies.extend(local)
+        counters["ok"] += ok
+        counters["not_modified"] += not_modified
+        counters["errors"] += errors
+        counters["bytes"] += nbytes
+
+
+def load_test(url, client_counts, duration=10.0, path="/api/stats"):
+    """Latencia y throughput de `path` para distintos números de clientes."""
+    from urllib.parse import urlparse
+
+    parsed = urlparse(url)
+    host, port = parsed.hostname, parsed.port or 80
+    results = []
+    for clients in client_counts:
+        latencies, lock = [], threading.Lock()
+        counters = {"ok": 0, "not_modified": 0, "errors": 0, "bytes": 0}
+        deadline = time.perf_counter() + duration
+        threads = [
+            threading.Thread(target=_load_client,
+                             args=(host, port, path, deadline, latencies, counters, lock),
+                             daemon=True)
+            for _ in range(clients)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(duration + 15)
+        latencies.sort()
+        total = counters["ok"] + counters["not_modified"]
+        results.append({
+            "clients": clients,
+            "req_per_s": round(total / duration, 1),
+            "p50_ms": round(percentile(latencies, 50) / 1e6, 2),
+            "p90_ms": round(percentile(latencies, 90) / 1e6, 2),
+            "p99_ms": round(percentile(latencies, 99) / 1e6, 2),
+            "max_ms": round(latencies[-1] / 1e6, 2) if latencies else 0.0,
+            "not_modified_pct": round(counters["not_modified"] * 100.0 / total, 1) if total else 0.0,
+            "kb_per_s": round(counters["bytes"] / 1024.0 / duration, 1),
+            "errors": counters["errors"],
+        })
+    return results
+
+
+def print_load_report(url, results):
+    print("=" * 92)
+    print(f"🌐 Carga sobre {url}/api/stats (keep-alive, gzip, If-None-Match)")
+    print("=" * 92)
+    print(f"{'clientes':>8s} {'req/s':>9s} {'p50 ms':>8s} {'p90 ms':>8s} {'p99 ms':>8s} "
+          f"{'max ms':>8s} {'304 %':>6s} {'kB/s':>8s} {'errores':>8s}")
+    for r in results:
+        print(f"{r['clients']:8d} {r['req_per_s']:9.1f} {r['p50_ms']:8.2f} {r['p90_ms']:8.2f} "
+              f"{r['p99_ms']:8.2f} {r['max_ms']:8.2f} {r['not_modified_pct']:6.1f} "
+              f"{r['kb_per_s']:8.1f} {r['errors']:8d}")
+    print("-" * 92)
+
+
+# =============================================================================
+# BASELINES
+# =============================================================================
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Devuelve lista de regresiones (texto) respecto al baseline."""
+    regressions = []
+    base_stages = {s["stage"]: s for s in baseline.get("stages", [])}
+    for stage in results:
+        base = base_stages.get(stage["stage"])
+        if not base:
+            continue
+        if base["ops_per_s"]:
+            drop = (base["ops_per_s"] - stage["ops_per_s"]) / base["ops_per_s"] * 100.0
+            stage["vs_baseline_ops_pct"] = round(-drop, 1)
+            if drop > tolerance:
+                regressions.append(f"{stage['stage']}: ops/s {drop:.1f}% peor")
+        if base["p99_us"]:
+            rise = (stage["p99_us"] - base["p99_us"]) / base["p99_us"] * 100.0
+            stage["vs_baseline_p99_pct"] = round(rise, 1)
+            if rise > tolerance:
+                regressions.append(f"{stage['stage']}: p99 {rise:.1f}% peor")
+    return regressions
+
+
+def print_report(report):
+    meta = report["meta"]
+    print("=" * 100)
+    print(f"🏁 GNSS.AI Benchmark | {meta['source']} | {meta['epochs']} épocas, "
+          f"{meta['sentences']} sentencias | Python {meta['python']}")
+    print("=" * 100)
+    print(f"{'etapa':10s} {'ops/s':>11s} {'p50 µs':>9s} {'p90 µs':>9s} {'p99 µs':>9s} "
+          f"{'max µs':>9s} {'peak kB':>9s} {'RSS kB':>9s} {'Δbase':>8s}")
+    for s in report["stages"]:
+        delta = s.get("vs_baseline_ops_pct")
+        delta = f"{delta:+.1f}%" if delta is not None else "--"
+        print(f"{s['stage']:10s} {s['ops_per_s']:11.1f} {s['p50_us']:9.2f} {s['p90_us']:9.2f} "
+              f"{s['p99_us']:9.2f} {s['max_us']:9.2f} {s['alloc_peak_kb']:9.1f} "
+              f"{s['rss_kb']:9d} {delta:>8s}")
+    print("-" * 100)
+    for s in report["stages"]:
+        if s.get("dropped"):
+            print(f"⚠️  {s['stage']}: {s['dropped']} operaciones descartadas (EAGAIN), "
+                  "fuera de ops/s y latencias")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GNSS.AI benchmark suite")
+    parser.add_argument("--epochs", type=int, default=300, help="épocas sintéticas")
+    parser.add_argument("--replay", help="log .gnraw grabado con uart_replay.py")
+    parser.add_argument("--stages", nargs="*", help="parse classify json fifo api_stats")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 si hay regresión")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--json", help="guardar el informe completo en este archivo")
+    parser.add_argument("--load", metavar="URL", help="prueba de carga contra un dashboard vivo")
+    parser.add_argument("--clients", type=int, nargs="*", default=[1, 5, 20])
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos por nivel de carga")
+    args = parser.parse_args(argv)
+
+    if args.load:
+        url = args.load.rstrip("/")
+        results = load_test(url, args.clients, args.duration)
+        print_load_report(url, results)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"url": url, "load": results}, f, indent=2)
+        return 0
+
+    if args.replay:
+        epochs = replay_epochs(args.replay)
+        source = os.path.basename(args.replay)
+    else:
+        epochs = synthetic_epochs(args.epochs)
+        source = "sintético"
+
+    report = {
+        "meta": {
+            "source": source,
+            "epochs": len(epochs),
+            "sentences": sum(len(e) for e in epochs),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "timestamp": time.time(),
+        },
+        "stages": bench_all(epochs, args.stages),
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("source") == source:
+            regressions = compare_with_baseline(report["stages"], baseline, args.tolerance)
+        else:
+            print(f"ℹ️  Baseline de otra fuente ({baseline.get('meta', {}).get('source')}), no se compara")
+
+    print_report(report)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline guardado en {args.baseline}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        print("⚠️  Regresiones respecto al baseline:")
+        for r in regressions:
+            print(f"   - {r}")
+        if args.check:
+            return 1
+    elif os.path.exists(args.baseline) and not args.save_baseline:
+        print("✅ Sin regresiones respecto al baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
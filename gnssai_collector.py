@@ -11,27 +11,84 @@ import time
 from datetime import datetime
 from pathlib import Path
 
+from uart_link import autodetect_baud
+from control_channel import send_command
+from satellite_table import BANDS, SatelliteTable
+
+LEASE_TTL = 30
+
+# JSON de estado de SmartProcessor y antigüedad máxima para fiarse de él
+STATUS_JSON = '/tmp/gnssai_dashboard_data.json'
+STATUS_MAX_AGE = 10.0
+
+
+def processor_baud(status_json=STATUS_JSON, max_age=STATUS_MAX_AGE):
+    """
+    Baudios del enlace si hay un SmartProcessor en marcha, o None.
+
+    El puerto es compartido: probar velocidades cambiaría la del proceso que
+    lo está leyendo. Primero el canal de control y, si no responde, el JSON
+    de estado siempre que sea reciente.
+    """
+    reply = send_command('link_status', timeout=0.5)
+    if reply.get('ok'):
+        baud = (reply.get('link') or {}).get('baud')
+        if baud:
+            return int(baud)
+    try:
+        with open(status_json) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - float(data.get('last_update') or 0) > max_age:
+        return None
+    baud = (data.get('uart_link') or {}).get('baud')
+    return int(baud) if baud else None
+
+
 class SimpleGNSSCollector:
     """Recolector simple de datos GNSS"""
     
-    def __init__(self, output_dir='ml_training_data'):
+    def __init__(self, output_dir='ml_training_data', port='/dev/serial0',
+                 baudrate=None, uart=None):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
         self.session = datetime.now().strftime('%Y%m%d_%H%M%S')
         self.csv_file = self.output_dir / f'session_{self.session}.csv'
         
-        self.uart = serial.Serial('/dev/serial0', 115200, timeout=1)
+        # uart inyectable: ReplaySerial/pty (uart_replay.py) para pruebas sin K922
+        if uart is None:
+            probe = False
+            if baudrate is None:
+                # Sin velocidad explícita: la que tenga el receptor (p. ej. 460800
+                # si SmartProcessor ya la negoció); solo se prueba si nadie
+                # más tiene el puerto
+                baudrate = processor_baud()
+                if baudrate is not None:
+                    print(f"🔗 Baudios de SmartProcessor: {baudrate}")
+                else:
+                    probe = True
+            uart = serial.Serial(port, baudrate or 115200, timeout=1)
+            if probe:
+                detected = autodetect_baud(uart)
+                if detected is None:
+                    print("⚠️  No se detectó NMEA válido; sigo a 115200")
+                    uart.baudrate = 115200
+        self.uart = uart
         
         # Crear CSV
         with open(self.csv_file, 'w', newline='') as f:
             writer = csv.writer(f)
             writer.writerow([
                 'timestamp', 'prn', 'constellation', 'elevation', 
-                'azimuth', 'snr', 'quality', 'hdop', 'environment'
-            ])
+                'azimuth', 'snr', 'quality', 'hdop', 'environment',
+                'sat_id'
+            ] + [f'cn0_{band.lower()}' for band in BANDS])
         
-        self.satellites = {}
+        # Satélites por (sistema, PRN): GPS 5 y GLONASS 5 son filas distintas
+        self.sat_table = SatelliteTable()
+        self.window_start = time.time()
         self.quality = 0
         self.hdop = 0
         self.epochs = 0
@@ -42,47 +99,11 @@ class SimpleGNSSCollector:
         print("="*60)
     
     def parse_gsv(self, line):
-        """Parse GSV sentence"""
-        parts = line.split(',')
+        """Parse GSV sentence (NMEA 4.11 multi-signal included)"""
+        parts = line.split('*', 1)[0].split(',')
         if len(parts) < 8:
             return
-        
-        # GSV has 4 satellites per sentence
-        for i in range(4):
-            try:
-                base = 4 + (i * 4)
-                if base + 3 >= len(parts):
-                    break
-                
-                prn = int(parts[base]) if parts[base] else None
-                if not prn:
-                    continue
-                
-                elevation = float(parts[base + 1]) if parts[base + 1] else 0
-                azimuth = float(parts[base + 2]) if parts[base + 2] else 0
-                snr = float(parts[base + 3].split('*')[0]) if parts[base + 3] else 0
-                
-                # Determine constellation
-                if line.startswith('$GPGSV'):
-                    constellation = 'GPS'
-                elif line.startswith('$GLGSV'):
-                    constellation = 'GLONASS'
-                elif line.startswith('$GAGSV'):
-                    constellation = 'Galileo'
-                elif line.startswith('$GBGSV') or line.startswith('$BDGSV'):
-                    constellation = 'BeiDou'
-                else:
-                    constellation = 'Unknown'
-                
-                self.satellites[prn] = {
-                    'prn': prn,
-                    'constellation': constellation,
-                    'elevation': elevation,
-                    'azimuth': azimuth,
-                    'snr': snr
-                }
-            except (ValueError, IndexError):
-                continue
+        self.sat_table.update_gsv(parts)
     
     def parse_gga(self, line):
         """Parse GGA sentence"""
@@ -98,14 +119,20 @@ class SimpleGNSSCollector:
     
     def save_epoch(self, environment='unknown'):
         """Save current epoch to CSV"""
-        if not self.satellites:
+        now = time.time()
+        table = self.sat_table
+        # Satélites vistos desde el último guardado
+        slots = list(table.active(now, now - self.window_start))
+        self.window_start = now
+        if not slots:
             return
         
         timestamp = datetime.now().isoformat()
         
         with open(self.csv_file, 'a', newline='') as f:
             writer = csv.writer(f)
-            for sat in self.satellites.values():
+            for slot in slots:
+                sat = table.record(slot, now)
                 writer.writerow([
                     timestamp,
                     sat['prn'],
@@ -115,11 +142,12 @@ class SimpleGNSSCollector:
                     sat['snr'],
                     self.quality,
                     self.hdop,
-                    environment
-                ])
+                    environment,
+                    sat['id']
+                ] + [sat['cn0'].get(band, 0) for band in BANDS])
         
         self.epochs += 1
-        self.satellites.clear()
+        table.expire(now)
     
     def collect(self, duration_seconds=3600, environment='urban'):
         """Collect data for specified duration"""
@@ -128,10 +156,20 @@ class SimpleGNSSCollector:
         
         start_time = time.time()
         last_save = time.time()
+        last_lease = 0
         
         try:
             while time.time() - start_time < duration_seconds:
+                # Consumidor "collector": SmartProcessor mantiene GSV+GGA a 1 Hz
+                if time.time() - last_lease > LEASE_TTL / 3:
+                    send_command('consumer_register', name='collector', ttl=LEASE_TTL, timeout=0.5)
+                    last_lease = time.time()
+                
                 line = self.uart.readline().decode('ascii', errors='ignore').strip()
+                if not line and getattr(self.uart, 'eof', False):
+                    # Fin de un log reproducido (uart_replay.py)
+                    self.save_epoch(environment)
+                    break
                 
                 if line.startswith('$'):
                     if 'GSV' in line:
@@ -147,7 +185,7 @@ class SimpleGNSSCollector:
                     elapsed = int(time.time() - start_time)
                     progress = (elapsed / duration_seconds) * 100
                     print(f"\r⏳ {progress:.1f}% | Epochs: {self.epochs} | "
-                          f"Sats: {len(self.satellites)}", end='', flush=True)
+                          f"Sats: {len(self.sat_table)}", end='', flush=True)
             
             print("\n✅ Collection complete!")
             
@@ -155,6 +193,7 @@ class SimpleGNSSCollector:
             print("\n\n🛑 Stopped by user")
         
         finally:
+            send_command('consumer_release', name='collector', timeout=0.5)
             self.uart.close()
             print(f"\n📁 Data saved to: {self.csv_file}")
             print(f"📊 Total epochs: {self.epochs}")
@@ -164,6 +203,7 @@ if __name__ == '__main__':
     
     duration = int(sys.argv[1]) if len(sys.argv) > 1 else 300  # 5 min default
     environment = sys.argv[2] if len(sys.argv) > 2 else 'urban'
+    port = sys.argv[3] if len(sys.argv) > 3 else '/dev/serial0'
     
-    collector = SimpleGNSSCollector()
+    collector = SimpleGNSSCollector(port=port)
     collector.collect(duration, environment)
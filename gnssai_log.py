@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Log
+- Logger estructurado común a SmartProcessor, BluetoothSPPServer y
+  SignalClassifier: cada línea es un evento (componente, tipo, mensaje,
+  campos clave=valor)
+- Nunca bloquea al que registra: el evento se encola (cola acotada,
+  put_nowait) y un único hilo de fondo lo escribe. Si stdout/journald se
+  atasca se pierden líneas (contadas), no épocas de la UART
+- Límite por tipo de evento: ráfaga de `burst` eventos por ventana; el resto
+  se cuenta y el hilo escritor publica un resumen cada ventana
+  ("fifo_write_error: 812 eventos suprimidos")
+- Contadores por evento (emitidos / suprimidos), líneas perdidas y errores
+  de escritura en stats() para el JSON del dashboard
+
+Variables de entorno:
+    GNSSAI_LOG_LEVEL    DEBUG / INFO (por defecto) / WARNING / ERROR
+    GNSSAI_LOG_FORMAT   text (por defecto) o json (una línea JSON por evento)
+    GNSSAI_LOG_FILE     fichero de salida (por defecto stdout)
+    GNSSAI_LOG_BURST    eventos por tipo y ventana antes de suprimir (5)
+    GNSSAI_LOG_WINDOW   ventana del límite en segundos (10)
+"""
+
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+QUEUE_SIZE = 4096
+_STOP = object()
+
+
+class _Limit:
+    """Estado del límite de un (componente, evento)."""
+
+    __slots__ = ("t0", "count", "level", "emitted", "suppressed", "pending")
+
+    def __init__(self, now):
+        self.t0 = now
+        self.count = 0
+        self.level = INFO
+        self.emitted = 0
+        self.suppressed = 0     # total histórico
+        self.pending = 0        # suprimidos aún sin resumir
+
+
+class LogWriter:
+    """Cola acotada + hilo escritor + límite por tipo de evento."""
+
+    def __init__(self, stream=None, fmt="text", level=INFO, burst=5, window=10.0,
+                 queue_size=QUEUE_SIZE):
+        self.stream = stream
+        self.fmt = fmt
+        self.level = level
+        self.burst = burst
+        self.window = window
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.limits = {}            # (componente, evento) -> _Limit
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Lado del que registra (cualquier hilo, nunca bloquea)
+    # ------------------------------------------------------------------
+    def submit(self, level, component, event, msg, fields):
+        """Encola el evento. False si se filtró, se suprimió o se perdió."""
+        if level < self.level:
+            return False
+        now = time.monotonic()
+        key = (component, event)
+        lim = self.limits.get(key)
+        if lim is None:
+            lim = self.limits.setdefault(key, _Limit(now))
+        if now - lim.t0 >= self.window:
+            lim.t0 = now
+            lim.count = 0
+        lim.count += 1
+        lim.level = level
+        if lim.count > self.burst:
+            lim.suppressed += 1
+            lim.pending += 1
+            return False
+        lim.emitted += 1
+        try:
+            self.queue.put_nowait((time.time(), level, component, event, msg, fields))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        if self._thread is None:
+            self._start()
+        return True
+
+    # ------------------------------------------------------------------
+    # Hilo escritor
+    # ------------------------------------------------------------------
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="gnssai-log", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        next_summary = time.monotonic() + self.window
+        while True:
+            try:
+                item = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                item = None
+            batch = []
+            stop = False
+            while item is not None:
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(self.format(*item))
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            now = time.monotonic()
+            if now >= next_summary or stop:
+                batch.extend(self._summaries())
+                next_summary = now + self.window
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _summaries(self):
+        lines = []
+        for (component, event), lim in list(self.limits.items()):
+            n = lim.pending
+            if n:
+                lim.pending -= n
+                lines.append(self.format(
+                    time.time(), lim.level, component, event,
+                    f"⏸️  {event}: {n} eventos suprimidos (límite {self.burst}/{self.window:g} s)",
+                    {"suppressed": n},
+                ))
+        return lines
+
+    def _write(self, lines):
+        stream = self.stream or sys.stdout
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+            self.written += len(lines)
+        except (OSError, ValueError):
+            self.write_errors += 1
+
+    def format(self, ts, level, component, event, msg, fields):
+        if self.fmt == "json":
+            record = {
+                "ts": round(ts, 3),
+                "level": LEVEL_NAMES.get(level, str(level)),
+                "component": component,
+                "event": event,
+                "msg": msg,
+            }
+            record.update(fields)
+            return json.dumps(record, ensure_ascii=False, default=str)
+        line = f"{time.strftime('%H:%M:%S', time.localtime(ts))} {component}: {msg}"
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+    # ------------------------------------------------------------------
+    def close(self, timeout=1.0):
+        """Vacía la cola (con límite de tiempo) y para el hilo."""
+        if self._thread is None:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        events = {}
+        for (component, event), lim in self.limits.items():
+            events[f"{component}.{event}"] = {"emitted": lim.emitted, "suppressed": lim.suppressed}
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "queued": self.queue.qsize(),
+            "events": events,
+        }
+
+
+class EventLogger:
+    """Logger de un componente: log.warning("fifo_write_error", "mensaje", errno=11)."""
+
+    def __init__(self, component, writer=None):
+        self.component = component
+        self.writer = writer
+        self.disabled = False
+
+    def log(self, level, event, msg="", **fields):
+        if self.disabled:
+            return False
+        writer = self.writer or get_writer()
+        return writer.submit(level, self.component, event, msg, fields)
+
+    def debug(self, event, msg="", **fields):
+        return self.log(DEBUG, event, msg, **fields)
+
+    def info(self, event, msg="", **fields):
+        return self.log(INFO, event, msg, **fields)
+
+    def warning(self, event, msg="", **fields):
+        return self.log(WARNING, event, msg, **fields)
+
+    def error(self, event, msg="", **fields):
+        return self.log(ERROR, event, msg, **fields)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Escritor compartido del proceso, configurado por variables de entorno."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                stream = None
+                path = os.environ.get("GNSSAI_LOG_FILE")
+                if path:
+                    try:
+                        stream = open(path, "a", buffering=1, encoding="utf-8")
+                    except OSError as e:
+                        print(f"⚠️  GNSSAI_LOG_FILE no disponible ({e}); uso stdout")
+                _writer = LogWriter(
+                    stream=stream,
+                    fmt=os.environ.get("GNSSAI_LOG_FORMAT", "text"),
+                    level=LEVELS.get(os.environ.get("GNSSAI_LOG_LEVEL", "INFO").upper(), INFO),
+                    burst=int(os.environ.get("GNSSAI_LOG_BURST", "5")),
+                    window=float(os.environ.get("GNSSAI_LOG_WINDOW", "10")),
+                )
+                atexit.register(_writer.close)
+    return _writer
+
+
+def get_logger(component):
+    return EventLogger(component)
+
+
+def log_stats():
+    return _writer.stats() if _writer is not None else None
@@ -2,27 +2,89 @@
 """
 GNSS.AI ML Trainer
 Entrena modelos de clasificación de calidad de señal
+- Validación por grupos (sesión o entorno): las épocas consecutivas de una
+  misma sesión son casi idénticas y nunca caen a ambos lados del split
+- Búsqueda de hiperparámetros en paralelo (GridSearchCV sobre un pool de
+  procesos de joblib) con GroupKFold
+- Caché en disco (joblib.Memory) del CSV ya leído y etiquetado de cada
+  sesión, por ruta + mtime + tamaño: iterar sobre modelos no relee los CSV
+- Características temporales de gnss_features.py (pendiente y varianza de
+  SNR, tasa de elevación, residuo C/N0-elevación) por sesión y satélite,
+  las mismas que calcula SignalClassifier en tiempo real
+
+Uso:
+    python gnssai_trainer.py [data_dir] [session|environment]
 """
 
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import (
+    GridSearchCV, GroupKFold, GroupShuffleSplit, ParameterGrid, train_test_split
+)
 from sklearn.metrics import classification_report, confusion_matrix
 import joblib
 from pathlib import Path
 import json
 
+from gnss_features import FEATURES_VERSION, TEMPORAL_FEATURES, add_temporal_features
+
+CACHE_DIR = 'ml_cache'
+CV_FOLDS = 5
+
+# Rejilla de la búsqueda (RandomForest con n_jobs=1: el paralelismo va por
+# combinación/fold, no dentro de cada bosque)
+PARAM_GRID = {
+    'n_estimators': [100, 200],
+    'max_depth': [8, 12, None],
+    'min_samples_leaf': [1, 5],
+    'class_weight': [None, 'balanced'],
+}
+
+
+def label_frame(df):
+    """Etiquetado por reglas, vectorizado (mismo criterio fila a fila de siempre)"""
+    # LOS (Line of Sight) - Buena señal
+    los = (df['snr'] > 35) & (df['elevation'] > 25)
+    # NLOS (Non Line of Sight) - Señal bloqueada
+    nlos = (df['snr'] < 25) | (df['elevation'] < 15)
+    # Multipath - Señal con rebotes (el resto)
+    return np.select([los, nlos], ['LOS', 'NLOS'], 'Multipath')
+
+
+def read_session(path, mtime=None, size=None, features_version=FEATURES_VERSION):
+    """
+    CSV de una sesión, etiquetado, con la columna 'session' y las
+    características temporales. mtime, tamaño y versión de las
+    características solo forman parte de la clave de la caché: si el CSV
+    cambia (sesión aún grabándose) o la definición cambia, se recalcula.
+    """
+    df = pd.read_csv(path)
+    df['session'] = Path(path).stem
+    df['label'] = label_frame(df)
+    df['t'] = (pd.to_datetime(df['timestamp']) - pd.Timestamp('1970-01-01')).dt.total_seconds()
+    # Satélite = sistema + PRN (sat_id en CSV nuevos)
+    keys = ['sat_id'] if 'sat_id' in df else ['constellation', 'prn']
+    return add_temporal_features(df, keys, time_col='t')
+
 class GNSSMLTrainer:
     """Entrenador de modelos ML para GNSS"""
     
-    def __init__(self, data_dir='ml_training_data'):
+    def __init__(self, data_dir='ml_training_data', group_by='session',
+                 cache_dir=CACHE_DIR, n_jobs=-1):
         self.data_dir = Path(data_dir)
         self.model_dir = Path('ml_models')
         self.model_dir.mkdir(exist_ok=True)
         
         self.model = None
-        self.feature_names = ['elevation', 'snr', 'hdop']
+        self.feature_names = ['elevation', 'snr', 'hdop'] + TEMPORAL_FEATURES
+        self.group_by = group_by
+        self.n_jobs = n_jobs
+        self.cv_results = None
+        
+        # cache_dir=None: sin caché (siempre se leen los CSV)
+        self.memory = joblib.Memory(cache_dir, verbose=0) if cache_dir else None
+        self._read_session = self.memory.cache(read_session) if self.memory else read_session
         
         print("🧠 GNSS.AI ML Trainer")
         print("="*60)
@@ -36,35 +98,24 @@ class GNSSMLTrainer:
         
         print(f"📁 Found {len(csv_files)} session files")
         
-        # Combinar todos los CSVs
+        # Combinar todos los CSVs (cacheados por ruta + mtime + tamaño)
         dfs = []
-        for f in csv_files:
-            df = pd.read_csv(f)
-            dfs.append(df)
+        for f in sorted(csv_files):
+            st = f.stat()
+            dfs.append(self._read_session(str(f), st.st_mtime, st.st_size))
         
         self.data = pd.concat(dfs, ignore_index=True)
         print(f"📊 Total samples: {len(self.data)}")
-        print(f"🛰️  Unique satellites: {self.data['prn'].nunique()}")
+        # sat_id (G05, R05...) distingue el mismo PRN en constelaciones distintas
+        sat_key = 'sat_id' if 'sat_id' in self.data else 'prn'
+        print(f"🛰️  Unique satellites: {self.data[sat_key].nunique()}")
         
         return self.data
     
     def label_data(self):
         """Etiquetar datos automáticamente basado en métricas"""
-        # Reglas simples para etiquetado
-        def classify_signal(row):
-            # LOS (Line of Sight) - Buena señal
-            if row['snr'] > 35 and row['elevation'] > 25:
-                return 'LOS'
-            
-            # NLOS (Non Line of Sight) - Señal bloqueada
-            elif row['snr'] < 25 or row['elevation'] < 15:
-                return 'NLOS'
-            
-            # Multipath - Señal con rebotes
-            else:
-                return 'Multipath'
-        
-        self.data['label'] = self.data.apply(classify_signal, axis=1)
+        # read_session ya etiqueta; se repite por si self.data viene de otra fuente
+        self.data['label'] = label_frame(self.data)
         
         print("\n🏷️  Labels:")
         print(self.data['label'].value_counts())
@@ -78,32 +129,71 @@ class GNSSMLTrainer:
         
         X = self.data[self.feature_names].values
         y = self.data['label'].values
+        groups = self.data[self.group_by].astype(str).values
         
         print(f"\n📈 Features shape: {X.shape}")
         print(f"🎯 Labels shape: {y.shape}")
+        print(f"👥 Groups ({self.group_by}): {len(np.unique(groups))}")
         
-        return X, y
+        return X, y, groups
     
-    def train(self, test_size=0.2):
-        """Entrenar modelo"""
+    def train(self, test_size=0.2, param_grid=None):
+        """Entrenar modelo: split de test por grupos + búsqueda con GroupKFold"""
         print("\n🏋️  Training model...")
         
-        X, y = self.prepare_features()
-        
-        # Split
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=42, stratify=y
-        )
-        
-        # Train Random Forest
-        self.model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42,
-            n_jobs=-1
-        )
+        X, y, groups = self.prepare_features()
+        n_groups = len(np.unique(groups))
         
-        self.model.fit(X_train, y_train)
+        if n_groups < 3:
+            # Con 1-2 sesiones no hay grupos para test y validación: split
+            # aleatorio como antes (la precisión de test sale optimista)
+            print(f"⚠️  Solo {n_groups} grupo(s) '{self.group_by}': split aleatorio, "
+                  "test optimista. Graba más sesiones.")
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=test_size, random_state=42, stratify=y
+            )
+            self.model = RandomForestClassifier(
+                n_estimators=100,
+                max_depth=10,
+                random_state=42,
+                n_jobs=self.n_jobs
+            )
+            self.model.fit(X_train, y_train)
+        else:
+            # Test con sesiones enteras que el modelo no ve al entrenar
+            splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=42)
+            train_idx, test_idx = next(splitter.split(X, y, groups))
+            X_train, X_test = X[train_idx], X[test_idx]
+            y_train, y_test = y[train_idx], y[test_idx]
+            
+            folds = min(CV_FOLDS, len(np.unique(groups[train_idx])))
+            param_grid = param_grid or PARAM_GRID
+            search = GridSearchCV(
+                RandomForestClassifier(random_state=42, n_jobs=1),
+                param_grid,
+                cv=GroupKFold(n_splits=folds),
+                scoring='f1_macro',
+                n_jobs=self.n_jobs,
+                refit=True,
+            )
+            print(f"🔎 Grid search: {len(ParameterGrid(param_grid))} combinaciones "
+                  f"× {folds} folds por {self.group_by}")
+            search.fit(X_train, y_train, groups=groups[train_idx])
+            self.model = search.best_estimator_
+            
+            best = search.best_index_
+            self.cv_results = {
+                'group_by': self.group_by,
+                'n_groups': n_groups,
+                'test_groups': sorted(set(groups[test_idx])),
+                'folds': folds,
+                'scoring': 'f1_macro',
+                'best_params': search.best_params_,
+                'cv_mean': float(search.cv_results_['mean_test_score'][best]),
+                'cv_std': float(search.cv_results_['std_test_score'][best]),
+            }
+            print(f"   Best params: {search.best_params_}")
+            print(f"   CV f1_macro: {self.cv_results['cv_mean']:.3f} ± {self.cv_results['cv_std']:.3f}")
         
         # Evaluate
         train_score = self.model.score(X_train, y_train)
@@ -112,6 +202,9 @@ class GNSSMLTrainer:
         print(f"\n✅ Training complete!")
         print(f"   Train accuracy: {train_score:.3f}")
         print(f"   Test accuracy:  {test_score:.3f}")
+        if self.cv_results is not None:
+            self.cv_results['train_score'] = float(train_score)
+            self.cv_results['test_score'] = float(test_score)
         
         # Detailed report
         y_pred = self.model.predict(X_test)
@@ -122,7 +215,7 @@ class GNSSMLTrainer:
         importances = self.model.feature_importances_
         print("\n🔍 Feature Importance:")
         for name, imp in zip(self.feature_names, importances):
-            print(f"   {name:12s}: {imp:.3f}")
+            print(f"   {name:18s}: {imp:.3f}")
         
         return self.model
     
@@ -142,7 +235,9 @@ class GNSSMLTrainer:
             'feature_names': self.feature_names,
             'classes': list(self.model.classes_),
             'n_samples': len(self.data),
-            'train_date': pd.Timestamp.now().isoformat()
+            'train_date': pd.Timestamp.now().isoformat(),
+            'features_version': FEATURES_VERSION,
+            'validation': self.cv_results
         }
         
         with open(metadata_path, 'w') as f:
@@ -163,5 +258,10 @@ class GNSSMLTrainer:
         print("="*60)
 
 if __name__ == '__main__':
-    trainer = GNSSMLTrainer()
+    import sys
+    
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else 'ml_training_data'
+    group_by = sys.argv[2] if len(sys.argv) > 2 else 'session'
+    
+    trainer = GNSSMLTrainer(data_dir, group_by=group_by)
     trainer.full_pipeline()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI History Store
+- Series temporales embebidas para el dashboard (SNR, calidad de fix, HDOP...)
+- Por métrica: anillo a resolución completa + rollups 1 s / 1 min / 1 h
+  con min/max/media
+- Cada anillo es un archivo de tamaño fijo memory-mapped: el escritor
+  (SmartProcessor) añade registros y el lector (dashboard_server) hace
+  consultas por rango con búsqueda binaria, sin cargar todo en RAM
+
+Formato de segmento (<metric>.<res>.ring):
+    cabecera 64 B: magic "GNTS", versión, tamaño registro, capacidad,
+                   cabeza (siguiente índice), nº registros, resolución (s)
+    raw:    <dd>   t, valor
+    rollup: <ddddI> t_inicio, min, max, media, n  (+4 B relleno)
+"""
+
+import os
+import re
+import mmap
+import time
+import struct
+
+HISTORY_DIR = os.environ.get("GNSSAI_HISTORY_DIR", "/var/tmp/gnssai_history")
+
+MAGIC = b"GNTS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIId")
+HEADER_SIZE = 64
+RAW_RECORD = struct.Struct("<dd")
+ROLLUP_RECORD = struct.Struct("<ddddI4x")
+
+# (nombre, segundos por punto, capacidad)
+RESOLUTIONS = (
+    ("raw", 0.0, 36000),     # ~1 h a 10 Hz
+    ("1s", 1.0, 21600),      # 6 h
+    ("1m", 60.0, 43200),     # 30 días
+    ("1h", 3600.0, 17520),   # 2 años
+)
+
+_METRIC_RE = re.compile(r"[^A-Za-z0-9_]+")
+
+
+def metric_name(name: str) -> str:
+    return _METRIC_RE.sub("_", name).strip("_") or "metric"
+
+
+class RingSegment:
+    """Anillo de registros de tamaño fijo sobre un archivo memory-mapped."""
+
+    def __init__(self, path, record, capacity=0, resolution=0.0, writable=False):
+        self.path = path
+        self.record = record
+        self.writable = writable
+
+        if writable and not os.path.exists(path):
+            size = HEADER_SIZE + capacity * record.size
+            with open(path, "wb") as f:
+                f.truncate(size)
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, VERSION, record.size, capacity, 0, 0, resolution))
+
+        self._file = open(path, "r+b" if writable else "rb")
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=access)
+
+        magic, _, rec_size, cap, _, _, res = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or rec_size != record.size:
+            self.close()
+            raise ValueError(f"Segmento inválido: {path}")
+        self.capacity = cap
+        self.resolution = res
+
+    def _state(self):
+        _, _, _, _, head, count, _ = HEADER.unpack_from(self.mm, 0)
+        return head, count
+
+    def append(self, *values):
+        head, count = self._state()
+        self.record.pack_into(self.mm, HEADER_SIZE + head * self.record.size, *values)
+        head = (head + 1) % self.capacity
+        count = min(count + 1, self.capacity)
+        # La cabecera se actualiza después del registro: el lector nunca ve basura
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, self.record.size,
+                         self.capacity, head, count, self.resolution)
+
+    def _at(self, head, count, i):
+        """i-ésimo registro más antiguo (0 = el más viejo)."""
+        idx = (head - count + i) % self.capacity
+        return self.record.unpack_from(self.mm, HEADER_SIZE + idx * self.record.size)
+
+    def last(self):
+        head, count = self._state()
+        if not count:
+            return None
+        return self._at(head, count, count - 1)
+
+    def query(self, start, end, max_points=0):
+        """Registros con start <= t < end (búsqueda binaria, lectura parcial)."""
+        head, count = self._state()
+        if not count:
+            return []
+
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._at(head, count, mid)[0] < start:
+                lo = mid + 1
+            else:
+                hi = mid
+        first = lo
+
+        lo, hi = first, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._at(head, count, mid)[0] < end:
+                lo = mid + 1
+            else:
+                hi = mid
+        last = lo
+
+        n = last - first
+        step = 1
+        if max_points and n > max_points:
+            step = -(-n // max_points)
+        return [self._at(head, count, i) for i in range(first, last, step)]
+
+    def close(self):
+        try:
+            self.mm.close()
+        except Exception:
+            pass
+        self._file.close()
+
+
+class _Rollup:
+    """Acumulador en memoria del bucket en curso de una resolución."""
+
+    __slots__ = ("start", "vmin", "vmax", "vsum", "n")
+
+    def __init__(self):
+        self.start = None
+        self.vmin = self.vmax = self.vsum = 0.0
+        self.n = 0
+
+    def reset(self, start, value):
+        self.start = start
+        self.vmin = self.vmax = self.vsum = value
+        self.n = 1
+
+    def add(self, value):
+        if value < self.vmin:
+            self.vmin = value
+        if value > self.vmax:
+            self.vmax = value
+        self.vsum += value
+        self.n += 1
+
+
+class HistoryWriter:
+    """Escritor (un solo proceso: SmartProcessor)."""
+
+    def __init__(self, base_dir=HISTORY_DIR):
+        self.base_dir = base_dir
+        os.makedirs(base_dir, exist_ok=True)
+        self._series = {}
+
+    def _open(self, metric):
+        rings, rollups = [], []
+        for name, res, cap in RESOLUTIONS:
+            path = os.path.join(self.base_dir, f"{metric}.{name}.ring")
+            record = RAW_RECORD if res == 0.0 else ROLLUP_RECORD
+            rings.append(RingSegment(path, record, cap, res, writable=True))
+            rollups.append(_Rollup())
+        last = rings[0].last()
+        series = {"rings": rings, "rollups": rollups, "last_t": last[0] if last else 0.0}
+        self._series[metric] = series
+        return series
+
+    def append(self, metric, value, t=None):
+        if value is None:
+            return
+        metric = metric_name(metric)
+        series = self._series.get(metric) or self._open(metric)
+        if t is None:
+            t = time.time()
+        if t < series["last_t"]:
+            return  # reloj hacia atrás: se descarta para mantener el orden
+        series["last_t"] = t
+        value = float(value)
+
+        rings = series["rings"]
+        rings[0].append(t, value)
+
+        for ring, acc, (_, res, _) in zip(rings[1:], series["rollups"][1:], RESOLUTIONS[1:]):
+            bucket = t - (t % res)
+            if acc.start is None:
+                acc.reset(bucket, value)
+            elif bucket != acc.start:
+                ring.append(acc.start, acc.vmin, acc.vmax, acc.vsum / acc.n, acc.n)
+                acc.reset(bucket, value)
+            else:
+                acc.add(value)
+
+    def append_many(self, values, t=None):
+        if t is None:
+            t = time.time()
+        for metric, value in values.items():
+            self.append(metric, value, t)
+
+    def close(self):
+        for series in self._series.values():
+            for ring in series["rings"]:
+                ring.close()
+        self._series.clear()
+
+
+class HistoryReader:
+    """Lector (dashboard_server): consultas por rango sobre los mmaps."""
+
+    def __init__(self, base_dir=HISTORY_DIR):
+        self.base_dir = base_dir
+        self._segments = {}
+
+    def metrics(self):
+        try:
+            names = os.listdir(self.base_dir)
+        except OSError:
+            return []
+        return sorted({n.split(".", 1)[0] for n in names if n.endswith(".raw.ring")})
+
+    def _segment(self, metric, res_name):
+        key = (metric, res_name)
+        seg = self._segments.get(key)
+        if seg is None:
+            path = os.path.join(self.base_dir, f"{metric}.{res_name}.ring")
+            if not os.path.exists(path):
+                return None
+            record = RAW_RECORD if res_name == "raw" else ROLLUP_RECORD
+            seg = RingSegment(path, record)
+            self._segments[key] = seg
+        return seg
+
+    @staticmethod
+    def pick_resolution(span, max_points):
+        """Resolución más fina que no supera max_points en el rango."""
+        for name, res, _ in RESOLUTIONS[1:]:
+            if span / res <= max_points:
+                return name
+        return RESOLUTIONS[-1][0]
+
+    def query(self, metric, start, end, resolution="auto", max_points=1000):
+        metric = metric_name(metric)
+        if resolution == "auto":
+            resolution = self.pick_resolution(end - start, max_points)
+        seg = self._segment(metric, resolution)
+        if seg is None:
+            return {"metric": metric, "resolution": resolution, "points": []}
+
+        rows = seg.query(start, end, max_points)
+        if resolution == "raw":
+            columns = ["t", "value"]
+            points = [[round(t, 3), v] for t, v in rows]
+        else:
+            columns = ["t", "min", "max", "mean", "n"]
+            points = [[t, vmin, vmax, round(mean, 4), n] for t, vmin, vmax, mean, n in rows]
+        return {
+            "metric": metric,
+            "resolution": resolution,
+            "start": start,
+            "end": end,
+            "columns": columns,
+            "points": points,
+        }
+
+    def close(self):
+        for seg in self._segments.values():
+            seg.close()
+        self._segments.clear()
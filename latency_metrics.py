@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Latency Metrics
+- Histogramas de latencia tipo HDR (log-lineales, tamaño fijo, error < 3.2%)
+- Registro por etapa del pipeline de SmartProcessor:
+    parse      llegada UART   -> parseo hecho (sin la clasificación)
+    classify   duración de la clasificación ML de la época (solo GGA con ML)
+    fifo       parseo hecho   -> escritura FIFO hecha
+    end_to_end llegada UART   -> escritura FIFO hecha
+    json       duración de update_dashboard_json
+    publish    llegada UART   -> JSON publicado (edad del dato)
+- Exportación a dict (dashboard JSON) y a texto Prometheus
+- Activable en caliente: con enabled=False el hot path no toca nada
+"""
+
+import time
+
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS          # 32 sub-buckets por potencia de 2
+HALF_COUNT = SUB_COUNT >> 1
+MAX_VALUE_US = (1 << 27) - 1       # ~134 s, suficiente para cualquier etapa
+N_BUCKETS = SUB_COUNT + (MAX_VALUE_US.bit_length() - SUB_BITS) * HALF_COUNT
+
+STAGES = ("parse", "classify", "fifo", "end_to_end", "json", "publish")
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def bucket_index(value_us: int) -> int:
+    if value_us < SUB_COUNT:
+        return value_us if value_us > 0 else 0
+    if value_us > MAX_VALUE_US:
+        value_us = MAX_VALUE_US
+    shift = value_us.bit_length() - SUB_BITS
+    return SUB_COUNT + (shift - 1) * HALF_COUNT + ((value_us >> shift) - HALF_COUNT)
+
+
+def bucket_upper(index: int) -> int:
+    """Límite superior (exclusivo, µs) del bucket."""
+    if index < SUB_COUNT:
+        return index + 1
+    shift = (index - SUB_COUNT) // HALF_COUNT + 1
+    top = (index - SUB_COUNT) % HALF_COUNT + HALF_COUNT
+    return (top + 1) << shift
+
+
+class LatencyHistogram:
+    """Histograma log-lineal de latencias en microsegundos."""
+
+    __slots__ = ("counts", "count", "total_us", "max_us")
+
+    def __init__(self):
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def record(self, value_us: int):
+        self.counts[bucket_index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def percentile(self, q: float) -> int:
+        if not self.count:
+            return 0
+        target = q * self.count
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            if c:
+                seen += c
+                if seen >= target:
+                    return min(bucket_upper(idx) - 1, self.max_us)
+        return self.max_us
+
+    def cumulative_buckets(self):
+        """[(le_us, acumulado)] en potencias de 2 hasta el máximo observado."""
+        out = []
+        seen = 0
+        le = SUB_COUNT
+        for idx, c in enumerate(self.counts):
+            upper = bucket_upper(idx)
+            if upper > le:
+                out.append((le, seen))
+                if seen == self.count:
+                    return out
+                le <<= 1
+            seen += c
+        out.append((le, seen))
+        return out
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum_us": self.total_us,
+            "mean_us": round(self.total_us / self.count, 1) if self.count else 0.0,
+            "max_us": self.max_us,
+            "p50_us": self.percentile(0.5),
+            "p90_us": self.percentile(0.9),
+            "p99_us": self.percentile(0.99),
+            "p999_us": self.percentile(0.999),
+            "buckets": self.cumulative_buckets(),
+        }
+
+
+class StageMetrics:
+    """Conjunto de histogramas por etapa, activable en caliente."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.since = time.time()
+        self.reset()
+
+    def reset(self):
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.since = time.time()
+
+    def toggle(self) -> bool:
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.reset()
+        return self.enabled
+
+    def record_ns(self, stage: str, start_ns: int, end_ns: int):
+        self.histograms[stage].record((end_ns - start_ns) // 1000)
+
+    def snapshot(self):
+        if not self.enabled:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "since": self.since,
+            "stages": {name: h.snapshot() for name, h in self.histograms.items() if h.count},
+        }
+
+
+# =============================================================================
+# EXPORTACIÓN PROMETHEUS
+# =============================================================================
+
+def render_prometheus(latency, gauges=None, prefix="gnssai", counters=None) -> str:
+    """
+    Texto de exposición Prometheus (v0.0.4) a partir de StageMetrics.snapshot()
+    y dicts opcionales de gauges y counters {nombre: valor}. Los counters
+    se publican con el sufijo _total (reservado a counters).
+    """
+    lines = []
+    stages = (latency or {}).get("stages", {})
+
+    name = f"{prefix}_stage_latency_seconds"
+    lines.append(f"# HELP {name} Latencia por etapa del pipeline SmartProcessor")
+    lines.append(f"# TYPE {name} histogram")
+    for stage, snap in stages.items():
+        for le_us, cumulative in snap.get("buckets", []):
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{le_us / 1e6:.6f}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {snap["count"]}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {snap["sum_us"] / 1e6:.6f}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {snap["count"]}')
+
+    qname = f"{prefix}_stage_latency_quantile_seconds"
+    lines.append(f"# HELP {qname} Cuantiles de latencia por etapa")
+    lines.append(f"# TYPE {qname} gauge")
+    for stage, snap in stages.items():
+        for q, key in zip(QUANTILES, ("p50_us", "p90_us", "p99_us", "p999_us")):
+            lines.append(f'{qname}{{stage="{stage}",quantile="{q}"}} {snap.get(key, 0) / 1e6:.6f}')
+
+    lines.append(f"# HELP {prefix}_metrics_enabled Instrumentación activa en SmartProcessor")
+    lines.append(f"# TYPE {prefix}_metrics_enabled gauge")
+    lines.append(f"{prefix}_metrics_enabled {1 if (latency or {}).get('enabled') else 0}")
+
+    for key, value in (gauges or {}).items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        lines.append(f"# TYPE {prefix}_{key} gauge")
+        lines.append(f"{prefix}_{key} {value}")
+
+    for key, value in (counters or {}).items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        lines.append(f"# TYPE {prefix}_{key}_total counter")
+        lines.append(f"{prefix}_{key}_total {value}")
+
+    return "\n".join(lines) + "\n"
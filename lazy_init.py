@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Lazy Init
+- Arranque rápido: lo pesado (NumPy, geodesia, clasificador ML, modelos
+  joblib) se carga en un hilo de fondo DESPUÉS de abrir la UART y el FIFO;
+  mientras tanto el NMEA ya se reenvía y lo que depende de ello se omite
+- Deferred: carga diferida de un componente (factory en un hilo daemon),
+  con estado, error y tiempo de carga
+- StartupTimer: marcas desde el arranque del proceso (imports, UART, FIFO,
+  primera sentencia reenviada, ML listo...) para el JSON y el log
+
+Informe de imports (procesos nuevos, sin caché del intérprete):
+    python lazy_init.py                       # smart_processor y dashboard_server
+    python lazy_init.py smart_processor -n 20 # los 20 módulos más lentos
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+
+class Deferred:
+    """Un componente que se construye en segundo plano: value es None hasta que está."""
+
+    def __init__(self, name, factory, on_ready=None, on_error=None):
+        self.name = name
+        self.factory = factory
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self.value = None
+        self.error = None
+        self.elapsed_s = None
+        self._thread = None
+        self._done = threading.Event()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    def _run(self):
+        t0 = time.monotonic()
+        try:
+            self.value = self.factory()
+            if self.on_ready is not None:
+                self.on_ready(self.value)
+        except Exception as e:
+            # ImportError incluido: el componente es opcional
+            self.error = e
+            if self.on_error is not None:
+                self.on_error(e)
+        self.elapsed_s = time.monotonic() - t0
+        self._done.set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"load-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def load(self):
+        """Carga síncrona (benchmark, herramientas): mismo resultado que start()+wait()."""
+        if self._thread is None and not self._done.is_set():
+            self._run()
+        return self.wait()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self.value
+
+    def status(self):
+        if not self._done.is_set():
+            state = "loading" if self._thread is not None else "pending"
+        else:
+            state = "error" if self.error is not None else "ready"
+        return {
+            "state": state,
+            "elapsed_ms": round(self.elapsed_s * 1000, 1) if self.elapsed_s is not None else None,
+            "error": str(self.error) if self.error is not None else None,
+        }
+
+
+class StartupTimer:
+    """Marcas de arranque en ms desde t0 (la primera vez que se marca cada una)."""
+
+    def __init__(self, t0=None):
+        self.t0 = t0 if t0 is not None else time.monotonic()
+        self.marks = {}
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = round((time.monotonic() - self.t0) * 1000, 1)
+            return True
+        return False
+
+    def snapshot(self):
+        return dict(self.marks)
+
+
+# =============================================================================
+# INFORME DE IMPORTS
+# =============================================================================
+
+def import_profile(module, top=10, python=sys.executable):
+    """
+    Importa `module` en un intérprete nuevo con -X importtime.
+    Devuelve (total_ms, [(acumulado_ms, propio_ms, módulo)] más lentos).
+    """
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            own, cumulative, name = line[len("import time:"):].split("|", 2)
+            rows.append((int(cumulative) / 1000.0, int(own) / 1000.0, name.strip()))
+        except ValueError:
+            continue
+    total = next((r[0] for r in rows if r[2] == module), None)
+    rows.sort(reverse=True)
+    return total, rows[:top]
+
+
+def _main(argv):
+    top = 10
+    if "-n" in argv:
+        i = argv.index("-n")
+        top = int(argv[i + 1])
+        argv = argv[:i] + argv[i + 2:]
+    modules = argv or ["smart_processor", "dashboard_server"]
+    for module in modules:
+        total, rows = import_profile(module, top)
+        if total is None:
+            print(f"❌ {module}: no se pudo importar")
+            continue
+        print(f"📦 import {module}: {total:.1f} ms")
+        for cumulative, own, name in rows:
+            print(f"   {cumulative:8.1f} ms  {own:7.1f} ms propio  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -7,10 +7,13 @@ Clasificación de señales GNSS en tiempo real usando ML
 import os
 import sys
 import time
-import logging
 from collections import deque, defaultdict
 import math
 
+from sky_mask import SkyMask
+from gnssai_log import get_logger
+from gnss_features import RollingTrend, TEMPORAL_FEATURES, WINDOW
+
 # =============================================================================
 # CONFIGURACIÓN DE NUMPY - MANEJO ROBUSTO DE IMPORTACIONES
 # =============================================================================
@@ -40,16 +43,22 @@ class SignalClassifier:
     - MULTIPATH: Señales con rebotes
     """
     
-    def __init__(self, model_type="hybrid"):
+    def __init__(self, model_type="hybrid", sky_mask=None, learn_mask=True):
         """
         Inicializar el clasificador
         
         Args:
             model_type: Tipo de modelo ("rules", "ml", "hybrid")
+            sky_mask: SkyMask del emplazamiento (None = máscara vacía en memoria)
+            learn_mask: Actualizar la máscara con cada observación
         """
         self.model_type = model_type
+        self.sky_mask = sky_mask if sky_mask is not None else SkyMask(None)
+        self.learn_mask = learn_mask
         self.numpy_available = NUMPY_AVAILABLE
-        self.signal_history = defaultdict(lambda: deque(maxlen=50))
+        self.signal_history = defaultdict(lambda: deque(maxlen=WINDOW))
+        # Características temporales incrementales (misma definición que el entrenador)
+        self.trends = defaultdict(RollingTrend)
         self.classification_history = defaultdict(lambda: deque(maxlen=20))
         
         # Umbrales para clasificación por reglas
@@ -60,16 +69,25 @@ class SignalClassifier:
             'elevation_nlos_max': 15,
             'snr_multipath_min': 25,
             'snr_multipath_max': 35,
-            'elevation_multipath_min': 10
+            'elevation_multipath_min': 10,
+            'band_diff_multipath': 6.0
         }
         
+        # Diferencia L1 - L5 nominal por constelación (EWMA): la potencia
+        # transmitida y la antena desplazan la diferencia; lo que delata el
+        # multipath es la desviación respecto a lo habitual
+        self.band_offset = {}
+        self.band_offset_alpha = 0.05
+        
         # Estadísticas
         self.stats = {
             'total_classifications': 0,
             'los_count': 0,
             'nlos_count': 0,
             'multipath_count': 0,
-            'avg_confidence': 0.0
+            'avg_confidence': 0.0,
+            'mask_lookups': 0,
+            'band_multipath': 0
         }
         
         # Configurar logging
@@ -77,39 +95,26 @@ class SignalClassifier:
         self._log_startup_info()
     
     def _setup_logger(self):
-        """Configurar el sistema de logging"""
-        logger = logging.getLogger('GNSS_ML_Classifier')
-        logger.setLevel(logging.INFO)
-        
-        # Evitar múltiples handlers
-        if not logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter(
-                '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                datefmt='%H:%M:%S'
-            )
-            handler.setFormatter(formatter)
-            logger.addHandler(handler)
-            logger.propagate = False
-            
-        return logger
+        """Logger por eventos compartido (no bloquea la clasificación)"""
+        return get_logger('classifier')
     
     def _log_startup_info(self):
         """Log información de inicio"""
-        self.logger.info("=" * 50)
-        self.logger.info("🚀 GNSS.AI ML Classifier Inicializado")
-        self.logger.info(f"📊 Modelo: {self.model_type}")
-        self.logger.info(f"🔢 Numpy: {NP_VERSION}")
-        self.logger.info(f"📈 Umbrales: SNR_LOS>{self.thresholds['snr_los_min']}, "
-                        f"SNR_NLOS<{self.thresholds['snr_nlos_max']}")
-        self.logger.info("=" * 50)
+        self.logger.info(
+            "startup", "🚀 GNSS.AI ML Classifier Inicializado",
+            model=self.model_type,
+            numpy=NP_VERSION,
+            snr_los_min=self.thresholds['snr_los_min'],
+            snr_nlos_max=self.thresholds['snr_nlos_max']
+        )
     
     def extract_features(self, satellite_data):
         """
         Extraer características de las señales de satélites
         
         Args:
-            satellite_data: Diccionario con datos de satélites
+            satellite_data: Diccionario con datos de satélites (opcional
+                'cn0': {banda: C/N0} de SatelliteTable.classifier_input)
             
         Returns:
             Dict con vectores de características por PRN
@@ -128,14 +133,19 @@ class SignalClassifier:
                 snr_quality = min(snr / 50.0, 1.0)  # Normalizado 0-1
                 elevation_quality = elevation / 90.0  # Normalizado 0-1
                 
-                # Características históricas
-                history = self.signal_history[prn]
-                if history:
-                    snr_trend = self._calculate_trend([h['snr'] for h in history])
-                    elevation_trend = self._calculate_trend([h['elevation'] for h in history])
-                else:
-                    snr_trend = 0.0
-                    elevation_trend = 0.0
+                # Máscara de cielo: C/N0 esperado en la celda (0 = sin datos)
+                expected_cn0 = self.sky_mask.expected_cn0(azimuth, elevation)
+                cn0_residual = snr - expected_cn0 if expected_cn0 is not None else 0.0
+                
+                # Multifrecuencia: desviación de (L1 - L5) sobre la nominal
+                band_deviation, n_bands = self._band_deviation(data)
+                
+                # Características temporales (gnss_features.py): ventana con
+                # la observación actual incluida, igual que al entrenar
+                now = time.time()
+                trend = self.trends[prn]
+                trend.push(now, snr, elevation)
+                snr_slope, snr_var, elev_rate, cn0_elev_residual = trend.features()
                 
                 # Vector de características
                 feature_vector = [
@@ -145,44 +155,62 @@ class SignalClassifier:
                     time_of_day,         # 3: Tiempo del día
                     snr_quality,         # 4: Calidad de SNR (0-1)
                     elevation_quality,   # 5: Calidad de elevación (0-1)
-                    snr_trend,           # 6: Tendencia de SNR
-                    elevation_trend      # 7: Tendencia de elevación
+                    snr_slope,           # 6: Pendiente de SNR (dB-Hz/s)
+                    elev_rate,           # 7: Pendiente de elevación (°/s)
+                    expected_cn0 or 0.0, # 8: C/N0 esperado (máscara)
+                    cn0_residual,        # 9: C/N0 - esperado
+                    band_deviation,      # 10: (L1 - L5) - nominal del sistema
+                    n_bands,             # 11: Bandas con señal
+                    snr_var,             # 12: Varianza de SNR en la ventana
+                    cn0_elev_residual    # 13: C/N0 - nominal por elevación
                 ]
                 
                 features[prn] = {
                     'vector': feature_vector,
-                    'basic_features': [elevation, snr, azimuth]
+                    'basic_features': [elevation, snr, azimuth],
+                    # Por nombre, para montar el vector del modelo entrenado
+                    'temporal': dict(zip(TEMPORAL_FEATURES, (snr_slope, snr_var, elev_rate, cn0_elev_residual))),
+                    'mask_class': self.sky_mask.lookup(azimuth, elevation, snr)
                 }
                 
+                # Aprender después de consultar (la observación no se juzga a sí misma)
+                if self.learn_mask:
+                    self.sky_mask.observe(azimuth, elevation, snr)
+                
                 # Actualizar historial
                 self.signal_history[prn].append({
                     'elevation': elevation,
                     'snr': snr,
                     'azimuth': azimuth,
-                    'timestamp': time.time()
+                    'timestamp': now
                 })
                 
             except (ValueError, TypeError, KeyError) as e:
-                self.logger.debug(f"⚠️ Error extrayendo features PRN {prn}: {e}")
+                self.logger.debug("feature_error", f"⚠️ Error extrayendo features PRN {prn}: {e}")
                 continue
         
         return features
     
-    def _calculate_trend(self, values):
-        """Calcular tendencia de una serie de valores"""
-        if len(values) < 2:
-            return 0.0
-        
-        if self.numpy_available:
-            try:
-                x = np.arange(len(values))
-                slope = np.polyfit(x, values, 1)[0]
-                return float(slope)
-            except:
-                pass
-        
-        # Fallback sin numpy
-        return (values[-1] - values[0]) / len(values) if values else 0.0
+    def _band_deviation(self, data):
+        """
+        (desviación, nº de bandas). El multipath afecta distinto a cada
+        frecuencia: una diferencia L1-L5 (o L1-L2) fuera de lo habitual para
+        la constelación es un indicador fuerte.
+        """
+        cn0 = data.get('cn0') or {}
+        n_bands = len(cn0)
+        l1 = cn0.get('L1')
+        other = cn0.get('L5') or cn0.get('L2')
+        if not l1 or not other:
+            return 0.0, n_bands
+        diff = float(l1 - other)
+        system = data.get('constellation', 'GNSS')
+        nominal = self.band_offset.get(system)
+        if nominal is None:
+            self.band_offset[system] = diff
+            return 0.0, n_bands
+        self.band_offset[system] = nominal + self.band_offset_alpha * (diff - nominal)
+        return diff - nominal, n_bands
     
     def classify_by_rules(self, features):
         """
@@ -201,10 +229,28 @@ class SignalClassifier:
                 feature_vector = feature_data['vector']
                 elevation, snr, azimuth = feature_data['basic_features']
                 
+                mask_class = feature_data.get('mask_class')
+                band_deviation = feature_vector[10]
+                
+                # 0. Multifrecuencia: L1-L5 muy fuera de lo nominal => MULTIPATH
+                if (abs(band_deviation) >= self.thresholds['band_diff_multipath'] and
+                        elevation >= self.thresholds['elevation_multipath_min']):
+                    classification = 'MULTIPATH'
+                    excess = abs(band_deviation) - self.thresholds['band_diff_multipath']
+                    confidence = 0.75 + min(excess, 10.0) * 0.02
+                    self.stats['band_multipath'] += 1
+                
+                # 0b. Máscara del emplazamiento: consulta de tabla
+                elif mask_class is not None:
+                    classification = mask_class.upper()
+                    residual = feature_vector[9]
+                    confidence = 0.80 + min(abs(residual), 10.0) * 0.01
+                    self.stats['mask_lookups'] += 1
+                
                 # REGLAS DE CLASIFICACIÓN
                 
                 # 1. LOS (Line of Sight) - Condiciones ideales
-                if (elevation >= self.thresholds['elevation_los_min'] and 
+                elif (elevation >= self.thresholds['elevation_los_min'] and 
                     snr >= self.thresholds['snr_los_min']):
                     confidence = 0.85 + (snr - 35) * 0.01
                     classification = 'LOS'
@@ -245,7 +291,7 @@ class SignalClassifier:
                 }
                 
             except Exception as e:
-                self.logger.error(f"❌ Error clasificando PRN {prn}: {e}")
+                self.logger.error("classify_sat_error", f"❌ Error clasificando PRN {prn}: {e}")
                 continue
         
         return classifications
@@ -322,7 +368,7 @@ class SignalClassifier:
             return classifications
             
         except Exception as e:
-            self.logger.error(f"💥 Error en classify_signals: {e}")
+            self.logger.error("classify_error", f"💥 Error en classify_signals: {e}")
             return {}
     
     def _update_stats(self, classifications):
@@ -357,6 +403,7 @@ class SignalClassifier:
                 multipath_pct = (sum(1 for c in classifications.values() if c['class'] == 'MULTIPATH') / total) * 100
                 
                 self.logger.info(
+                    "stats",
                     f"📊 ML Stats: LOS={los_pct:.1f}% | NLOS={nlos_pct:.1f}% | "
                     f"Multipath={multipath_pct:.1f}% | Conf={self.stats['avg_confidence']:.2f} | "
                     f"Sats={total}"
@@ -364,6 +411,55 @@ class SignalClassifier:
             
             self._last_log_time = current_time
     
+    def get_state(self):
+        """
+        Estado para el checkpoint de arranque en caliente (state_checkpoint.py):
+        históricos por satélite, offsets L1-L5 y estadísticas, JSON compacto
+        """
+        return {
+            'signal_history': {
+                str(prn): [[round(h['elevation'], 1), round(h['snr'], 1),
+                            round(h['azimuth'], 1), round(h['timestamp'], 1)] for h in history]
+                for prn, history in self.signal_history.items() if history
+            },
+            'classification_history': {
+                str(prn): [[h['class'], round(h['confidence'], 3), round(h['timestamp'], 1)]
+                           for h in history]
+                for prn, history in self.classification_history.items() if history
+            },
+            'band_offset': dict(self.band_offset),
+            'stats': dict(self.stats)
+        }
+    
+    def set_state(self, state):
+        """Restaurar lo guardado por get_state()"""
+        for prn, rows in state.get('signal_history', {}).items():
+            history = self.signal_history[prn]
+            history.clear()
+            trend = self.trends[prn] = RollingTrend()
+            for elevation, snr, azimuth, timestamp in rows:
+                history.append({
+                    'elevation': elevation,
+                    'snr': snr,
+                    'azimuth': azimuth,
+                    'timestamp': timestamp
+                })
+                trend.push(timestamp, snr, elevation)
+        for prn, rows in state.get('classification_history', {}).items():
+            history = self.classification_history[prn]
+            history.clear()
+            for classification, confidence, timestamp in rows:
+                history.append({
+                    'class': classification,
+                    'confidence': confidence,
+                    'timestamp': timestamp
+                })
+        self.band_offset.update(state.get('band_offset', {}))
+        for key, value in state.get('stats', {}).items():
+            if key in self.stats:
+                self.stats[key] = value
+        return len(self.signal_history)
+    
     def get_stats(self):
         """Obtener estadísticas actuales"""
         return self.stats.copy()
@@ -375,7 +471,9 @@ class SignalClassifier:
             'los_count': 0,
             'nlos_count': 0,
             'multipath_count': 0,
-            'avg_confidence': 0.0
+            'avg_confidence': 0.0,
+            'mask_lookups': 0,
+            'band_multipath': 0
         }
 
 # =============================================================================
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI NTRIP Client
+- Cliente NTRIP (v1/v2 simple) que recibe correcciones RTCM3 de un caster
+- Entrega los bytes a un callback (normalmente UARTWriter.send_rtcm)
+- Subida de GGA al caster cada N segundos (redes VRS/NRTK)
+- Incluye un caster local de prueba (LocalCaster) para ensayar sin Internet
+"""
+
+import time
+import base64
+import socket
+import threading
+
+NTRIP_USER_AGENT = "NTRIP GNSSAI/3.3"
+
+
+class NTRIPClient:
+    """Cliente NTRIP en hilo propio con reconexión automática."""
+
+    def __init__(self, host, port=2101, mountpoint="", user="", password="",
+                 on_data=None, gga_provider=None, gga_interval=10.0,
+                 timeout=10.0, reconnect_delay=5.0):
+        """
+        Args:
+            on_data: callable(bytes) para cada bloque de correcciones recibido
+            gga_provider: callable() -> str|None con la última GGA del receptor
+            gga_interval: segundos entre GGA subidas (0 = no subir GGA)
+        """
+        self.host = host
+        self.port = int(port)
+        self.mountpoint = mountpoint.lstrip("/")
+        self.user = user
+        self.password = password
+        self.on_data = on_data
+        self.gga_provider = gga_provider
+        self.gga_interval = float(gga_interval)
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+
+        self.sock = None
+        self.running = False
+        self._thread = None
+
+        self.stats = {
+            "status": "DISCONNECTED",
+            "connects": 0,
+            "bytes_received": 0,
+            "gga_sent": 0,
+            "last_data_time": 0.0,
+            "last_error": "",
+        }
+
+    # ---------------------- Ciclo de vida ---------------------- #
+    def start(self):
+        if self._thread is not None:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="ntrip-client", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self.running = False
+        self._close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ---------------------- Conexión ---------------------- #
+    def build_request(self) -> bytes:
+        lines = [
+            f"GET /{self.mountpoint} HTTP/1.0",
+            f"User-Agent: {NTRIP_USER_AGENT}",
+            f"Host: {self.host}:{self.port}",
+            "Accept: */*",
+        ]
+        if self.user:
+            token = base64.b64encode(f"{self.user}:{self.password}".encode("utf-8")).decode("ascii")
+            lines.append(f"Authorization: Basic {token}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("ascii")
+
+    def _connect(self) -> bytes:
+        """Abre la conexión y valida la respuesta. Devuelve bytes sobrantes."""
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.sendall(self.build_request())
+
+        header = b""
+        while b"\r\n\r\n" not in header and b"ICY 200 OK\r\n" not in header:
+            chunk = sock.recv(1024)
+            if not chunk:
+                sock.close()
+                raise ConnectionError("Caster cerró la conexión durante la cabecera")
+            header += chunk
+            if len(header) > 8192:
+                sock.close()
+                raise ConnectionError("Cabecera NTRIP demasiado larga")
+
+        status_line = header.split(b"\r\n", 1)[0].decode("ascii", errors="ignore")
+        if not (status_line.startswith("ICY 200") or
+                (status_line.startswith("HTTP/") and " 200" in status_line)):
+            sock.close()
+            raise ConnectionError(f"Respuesta del caster: {status_line}")
+
+        if b"\r\n\r\n" in header:
+            rest = header.split(b"\r\n\r\n", 1)[1]
+        else:
+            rest = header.split(b"ICY 200 OK\r\n", 1)[1]
+
+        # recv corto para poder subir GGA a tiempo
+        sock.settimeout(0.5)
+        self.sock = sock
+        self.stats["connects"] += 1
+        self.stats["status"] = "CONNECTED"
+        return rest
+
+    def _close(self):
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            try:
+                sock.close()
+            except Exception:
+                pass
+        self.stats["status"] = "DISCONNECTED"
+
+    def _deliver(self, data: bytes):
+        if not data:
+            return
+        self.stats["bytes_received"] += len(data)
+        self.stats["last_data_time"] = time.time()
+        if self.on_data is not None:
+            try:
+                self.on_data(data)
+            except Exception as e:
+                self.stats["last_error"] = f"on_data: {e}"
+
+    def _send_gga(self):
+        if self.gga_provider is None or self.sock is None:
+            return
+        gga = self.gga_provider()
+        if not gga:
+            return
+        self.sock.sendall(gga.strip().encode("ascii", errors="ignore") + b"\r\n")
+        self.stats["gga_sent"] += 1
+
+    # ---------------------- Hilo lector ---------------------- #
+    def _run(self):
+        while self.running:
+            try:
+                self._deliver(self._connect())
+                last_gga = 0.0
+                while self.running:
+                    now = time.monotonic()
+                    if self.gga_interval > 0 and now - last_gga >= self.gga_interval:
+                        self._send_gga()
+                        last_gga = now
+                    try:
+                        data = self.sock.recv(4096)
+                    except socket.timeout:
+                        continue
+                    if not data:
+                        raise ConnectionError("Caster cerró la conexión")
+                    self._deliver(data)
+            except (OSError, ConnectionError) as e:
+                if self.running:
+                    self.stats["last_error"] = str(e)
+            finally:
+                self._close()
+
+            # Espera de reconexión interrumpible
+            deadline = time.monotonic() + self.reconnect_delay
+            while self.running and time.monotonic() < deadline:
+                time.sleep(0.1)
+
+    def get_stats(self):
+        data = dict(self.stats)
+        last = data["last_data_time"]
+        data["age"] = round(time.time() - last, 1) if last else None
+        return data
+
+
+class LocalCaster:
+    """
+    Caster NTRIP mínimo en localhost para pruebas.
+
+    Acepta clientes, responde "ICY 200 OK", emite `frames` cada `interval`
+    segundos y guarda las GGA recibidas en `gga_received`.
+    """
+
+    def __init__(self, frames, interval=1.0, host="127.0.0.1", port=0):
+        self.frames = list(frames)
+        self.interval = interval
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen(4)
+        self.host, self.port = self.server.getsockname()
+        self.requests = []
+        self.gga_received = []
+        self.running = False
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+        try:
+            self.server.close()
+        except Exception:
+            pass
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        try:
+            request = b""
+            while b"\r\n\r\n" not in request:
+                chunk = conn.recv(1024)
+                if not chunk:
+                    return
+                request += chunk
+            self.requests.append(request.decode("ascii", errors="ignore"))
+            conn.sendall(b"ICY 200 OK\r\n\r\n")
+            conn.settimeout(self.interval)
+            while self.running:
+                for frame in self.frames:
+                    conn.sendall(frame)
+                try:
+                    data = conn.recv(1024)
+                    if not data:
+                        return
+                    self.gga_received.extend(
+                        line for line in data.decode("ascii", errors="ignore").split("\r\n") if line
+                    )
+                except socket.timeout:
+                    pass
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+
+# =============================================================================
+# PRUEBA CONTRA CASTER LOCAL
+# =============================================================================
+
+def test_ntrip_local(duration=3.0):
+    """Cliente + caster local: verifica correcciones recibidas y GGA subida."""
+    from rtcm3 import StreamDemuxer, build_rtcm3_frame
+
+    print("🧪 Probando NTRIP client contra caster local...")
+    print("=" * 60)
+
+    frames = [
+        build_rtcm3_frame(bytes([0x3E, 0xD0]) + bytes(17)),   # 1005
+        build_rtcm3_frame(bytes([0x43, 0x20]) + bytes(200)),  # 1074
+    ]
+    caster = LocalCaster(frames, interval=0.2).start()
+
+    demux = StreamDemuxer()
+    gga = "$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47"
+
+    client = NTRIPClient(
+        caster.host, caster.port, "TEST", "user", "pass",
+        on_data=lambda data: list(demux.feed(data)),
+        gga_provider=lambda: gga,
+        gga_interval=1.0,
+    )
+    client.start()
+    time.sleep(duration)
+    client.stop()
+    caster.stop()
+
+    stats = client.get_stats()
+    print(f"📡 Conexiones: {stats['connects']} | Bytes: {stats['bytes_received']} | "
+          f"GGA subidas: {stats['gga_sent']}")
+    print(f"🧩 RTCM por tipo: {demux.get_stats()['rtcm_types']}")
+    print(f"🛰️  GGA en el caster: {len(caster.gga_received)}")
+    ok = demux.stats["rtcm_frames"] > 0 and caster.gga_received
+    print("✅ Test completado exitosamente!" if ok else "❌ Test fallido")
+    return ok
+
+
+if __name__ == "__main__":
+    test_ntrip_local()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Output Demand
+- Qué sentencias (y a qué tasa) necesita de verdad cada consumidor activo:
+  FIFO/Bluetooth, dashboard, clasificador, máscara de cielo, colector...
+- La salida del receptor es la unión (tasa máxima por tipo); lo que nadie
+  usa se apaga con UNLOG y lo que baja de tasa se reprograma con LOG ONTIME
+- Consumidores internos (se detectan en SmartProcessor) y externos con
+  concesión renovable por el canal de control (consumer_register / _release)
+- Reevaluación con histéresis: el cambio se aplica cuando la demanda lleva
+  estable `settle` segundos (una reconexión Bluetooth no reconfigura dos veces)
+- Informe del ahorro: bytes/s por tipo antes y después y bytes/s de la UART
+  medidos (uart_link.LinkMonitor)
+
+Solo se gestionan las sentencias NMEA/actitud de MANAGED_TYPES; el RTCM de
+salida (modo base) no se toca.
+"""
+
+import time
+
+from receiver_config import PORT, ontime_period
+from gnssai_log import get_logger
+
+FULL = "full"   # tasa base de la solución (GNSSAI_NMEA_RATE)
+
+MANAGED_TYPES = ("GGA", "GSA", "GSV", "GLL", "GST", "HDT", "RMC", "VTG", "ZDA", "HPR")
+
+# Necesidades por consumidor: {tipo: Hz | FULL}
+PROFILES = {
+    "processor": {"GGA": FULL},
+    "sky_mask": {"GSV": 0.2},
+    "classifier": {"GSV": 1.0},
+    "tilt": {"HPR": 10.0},
+    "dashboard": {"GGA": 1.0, "RMC": 1.0, "GST": 1.0, "GSA": 1.0, "GSV": 1.0, "HPR": 2.0},
+    "fifo": {"GGA": FULL, "RMC": FULL, "GST": FULL, "VTG": FULL, "GSA": 1.0, "GSV": 1.0, "HPR": 10.0},
+    "collector": {"GGA": 1.0, "GSV": 1.0},
+}
+
+DEFAULT_TTL = 30.0
+
+log = get_logger("demand")
+
+
+def sentence_type(key):
+    """Clave del medidor (GNGGA, GPHPR...) -> tipo gestionado o None."""
+    kind = key[2:5] if len(key) == 5 else ""
+    return kind if kind in MANAGED_TYPES else None
+
+
+class DemandTracker:
+    """Consumidores activos -> salida deseada del receptor -> comandos diff."""
+
+    def __init__(self, full_rate=1.0, settle=2.0, talker="GN", port=PORT):
+        self.full_rate = full_rate
+        self.settle = settle
+        self.talker = talker
+        self.port = port
+        self.leases = {}            # nombre -> (necesidades, caducidad | None)
+        self.applied = None         # {tipo: Hz} configurado; None = desconocido
+        self.paused = False
+        self._pending = None
+        self._pending_since = 0.0
+        self.baseline = None        # medida antes de la primera poda
+        self.last_change = None
+        self.changes = 0
+
+    # ------------------------------------------------------------------
+    # Consumidores
+    # ------------------------------------------------------------------
+    def set_consumer(self, name, active, needs=None, ttl=None, now=None):
+        """Alta/baja de un consumidor. ttl=None: interno, sin caducidad."""
+        if not active:
+            self.leases.pop(name, None)
+            return
+        if needs is None:
+            needs = PROFILES.get(name)
+            if needs is None:
+                raise ValueError(f"consumidor sin perfil: {name}")
+        for kind in needs:
+            if kind not in MANAGED_TYPES:
+                raise ValueError(f"sentencia no gestionada: {kind}")
+        expires = (now or time.monotonic()) + ttl if ttl else None
+        self.leases[name] = (dict(needs), expires)
+
+    def expire(self, now=None):
+        now = now or time.monotonic()
+        for name, (_, expires) in list(self.leases.items()):
+            if expires is not None and expires < now:
+                del self.leases[name]
+                log.info("consumer_expired", f"⌛ Consumidor {name} caducado", consumer=name)
+
+    def active(self):
+        return sorted(self.leases)
+
+    def desired(self):
+        """Unión de necesidades: tasa máxima por tipo."""
+        out = {}
+        for needs, _ in self.leases.values():
+            for kind, rate in needs.items():
+                rate = self.full_rate if rate == FULL else float(rate)
+                if kind != "HPR":
+                    # La actitud va a la tasa de la IMU, no a la de la solución
+                    rate = min(rate, self.full_rate)
+                if rate > out.get(kind, 0.0):
+                    out[kind] = rate
+        return out
+
+    # ------------------------------------------------------------------
+    # Reconfiguración
+    # ------------------------------------------------------------------
+    def _log_name(self, kind):
+        return "GPHPR" if kind == "HPR" else f"{self.talker}{kind}"
+
+    def commands(self, desired, streaming=()):
+        """
+        Comandos para pasar de lo aplicado a `desired`. Si aún no se sabe lo
+        aplicado, se apaga todo lo que se está viendo salir y no hace falta.
+        """
+        current = self.applied
+        if current is None:
+            current = {kind: None for kind in streaming}
+        out = []
+        for kind in MANAGED_TYPES:
+            if kind in current and kind not in desired:
+                out.append(f"UNLOG {self.port} {self._log_name(kind)}")
+        for kind, rate in sorted(desired.items()):
+            if current.get(kind) != rate:
+                out.append(f"LOG {self.port} {self._log_name(kind)} ONTIME {ontime_period(rate)}")
+        return out
+
+    def poll(self, streaming=(), now=None):
+        """
+        Devuelve (comandos, demanda {tipo: Hz}) si hay que reconfigurar, si
+        no None. `streaming`: tipos que se ven salir del receptor ahora mismo.
+        """
+        if self.paused:
+            return None
+        now = now or time.monotonic()
+        self.expire(now)
+        desired = self.desired()
+        commands = self.commands(desired, streaming)
+        if not commands:
+            self._pending = None
+            return None
+        if desired != self._pending:
+            self._pending = desired
+            self._pending_since = now
+            return None
+        if now - self._pending_since < self.settle:
+            return None
+        self._pending = None
+        return commands, desired
+
+    def expected_rates(self, desired):
+        """{tipo: Hz} -> {nombre del log: Hz} (lo que mide OutputRateMeter)."""
+        return {self._log_name(k): r for k, r in desired.items()}
+
+    def mark_applied(self, desired, baseline=None):
+        self.applied = dict(desired)
+        if self.baseline is None and baseline is not None:
+            self.baseline = baseline
+        self.last_change = time.time()
+        self.changes += 1
+
+    # ------------------------------------------------------------------
+    def report(self, byte_rates=None, link_bytes_per_s=None):
+        """
+        Ahorro: bytes/s de la UART medidos ahora frente a la referencia
+        anterior a la primera poda, y bytes/s actuales por tipo.
+        """
+        per_type = {}
+        for key, bps in (byte_rates or {}).items():
+            kind = sentence_type(key)
+            if kind is not None and bps > 0:
+                per_type[kind] = round(per_type.get(kind, 0.0) + bps, 1)
+        out = {
+            "paused": self.paused,
+            "consumers": self.active(),
+            "desired_hz": self.desired(),
+            "applied_hz": self.applied,
+            "changes": self.changes,
+            "last_change": self.last_change,
+            "bytes_per_s_by_type": per_type,
+            "baseline_bytes_per_s": None,
+            "saved_bytes_per_s": None,
+        }
+        if self.baseline is not None:
+            out["baseline_bytes_per_s"] = round(self.baseline, 1)
+            if link_bytes_per_s is not None:
+                out["saved_bytes_per_s"] = round(self.baseline - link_bytes_per_s, 1)
+        return out
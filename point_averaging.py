@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Point Averaging
+- Sesión de promediado sobre un punto (replanteo / toma de puntos)
+- Media y covarianza ENU incrementales (Welford): O(1) en tiempo y memoria
+  por época, sin guardar las posiciones
+- Filtro por calidad de fix (por defecto solo RTK fijo) y rechazo de
+  atípicos: arranque robusto con mediana/MAD sobre las primeras épocas y
+  después distancia normalizada respecto a la media y varianza acumuladas
+- Puntos terminados en un JSONL (GNSSAI_POINTS_FILE)
+
+El origen ENU es la primera época aceptada; la media se devuelve en
+geodésicas con geodesy.enu_to_geodetic.
+"""
+
+import os
+import json
+import math
+import time
+
+import geodesy
+
+POINTS_FILE = os.environ.get("GNSSAI_POINTS_FILE", "/var/tmp/gnssai_points.jsonl")
+
+QUALITY_NAMES = {1: "GPS", 2: "DGPS", 4: "RTK_FIXED", 5: "RTK_FLOAT"}
+
+
+class PointSession:
+    """Acumulador Welford 3D (E, N, U) con rechazo de atípicos."""
+
+    def __init__(self, name="", accept_quality=(4,), outlier_sigma=4.0,
+                 min_for_outliers=10, min_sigma=0.005, target_epochs=0):
+        self.name = name
+        self.accept_quality = tuple(accept_quality)
+        self.outlier_sigma = outlier_sigma
+        self.min_for_outliers = min_for_outliers
+        self.min_sigma = min_sigma          # suelo (m): evita rechazarlo todo con RTK muy estable
+        self.target_epochs = target_epochs  # 0 = hasta stop
+        self.started = time.time()
+        self.finished = None
+
+        self.origin = None
+        self.n = 0
+        self.mean = [0.0, 0.0, 0.0]
+        self.m2 = [[0.0] * 3 for _ in range(3)]   # suma de productos cruzados
+        self.rejected_quality = 0
+        self.rejected_outlier = 0
+        self.qualities = {}
+        self._warmup = []                         # primeras épocas (tamaño fijo)
+
+    # ------------------------------------------------------------------
+    def covariance(self):
+        if self.n < 2:
+            return [[0.0] * 3 for _ in range(3)]
+        d = self.n - 1
+        return [[self.m2[i][j] / d for j in range(3)] for i in range(3)]
+
+    def _is_outlier(self, delta):
+        """Distancia normalizada por eje (diagonal): ~chi² con 3 g.l."""
+        d = self.n - 1
+        if d < 1:
+            return False
+        dist2 = 0.0
+        for i in range(3):
+            var = max(self.m2[i][i] / d, self.min_sigma ** 2)
+            dist2 += delta[i] * delta[i] / var
+        return dist2 > 3 * self.outlier_sigma ** 2
+
+    def _accumulate(self, x, quality):
+        delta = [x[i] - self.mean[i] for i in range(3)]
+        self.n += 1
+        for i in range(3):
+            self.mean[i] += delta[i] / self.n
+        delta2 = [x[i] - self.mean[i] for i in range(3)]
+        for i in range(3):
+            row = self.m2[i]
+            for j in range(3):
+                row[j] += delta[i] * delta2[j]
+        self.qualities[quality] = self.qualities.get(quality, 0) + 1
+
+    def _seed(self):
+        """Fin del arranque: mediana/MAD por eje y Welford con lo que pasa."""
+        warmup, self._warmup = self._warmup, None
+        limits = []
+        for i in range(3):
+            values = sorted(x[i] for x, _ in warmup)
+            med = values[len(values) // 2]
+            mad = sorted(abs(v - med) for v in values)[len(values) // 2]
+            limits.append((med, self.outlier_sigma * max(1.4826 * mad, self.min_sigma)))
+        for x, quality in warmup:
+            if all(abs(x[i] - med) <= lim for i, (med, lim) in enumerate(limits)):
+                self._accumulate(x, quality)
+            else:
+                self.rejected_outlier += 1
+
+    def add(self, lat, lon, h, quality):
+        """Añade una época. Devuelve 'ok', 'quality' u 'outlier'."""
+        if quality not in self.accept_quality:
+            self.rejected_quality += 1
+            return "quality"
+
+        if self.origin is None:
+            self.origin = (lat, lon, h)
+            e = n = u = 0.0
+        else:
+            e, n, u = (float(v) for v in geodesy.geodetic_to_enu(lat, lon, h, *self.origin))
+
+        x = (e, n, u)
+        if self._warmup is not None:
+            # Un atípico en las primeras épocas envenenaría la varianza
+            self._warmup.append((x, quality))
+            if len(self._warmup) >= self.min_for_outliers:
+                self._seed()
+            return "ok"
+
+        delta = [x[i] - self.mean[i] for i in range(3)]
+        if self._is_outlier(delta):
+            self.rejected_outlier += 1
+            return "outlier"
+        self._accumulate(x, quality)
+        return "ok"
+
+    def flush(self):
+        """Cierra el arranque aunque haya menos épocas (stop temprano)."""
+        if self._warmup:
+            self._seed()
+
+    @property
+    def done(self):
+        return bool(self.target_epochs) and self.n >= self.target_epochs
+
+    def result(self):
+        cov = self.covariance()
+        sd = [math.sqrt(max(cov[i][i], 0.0)) for i in range(3)]
+        out = {
+            "name": self.name,
+            "epochs": self.n,
+            "rejected_quality": self.rejected_quality,
+            "rejected_outlier": self.rejected_outlier,
+            "accept_quality": [QUALITY_NAMES.get(q, str(q)) for q in self.accept_quality],
+            "qualities": {QUALITY_NAMES.get(q, str(q)): c for q, c in self.qualities.items()},
+            "started": self.started,
+            "finished": self.finished,
+            "duration_s": round((self.finished or time.time()) - self.started, 1),
+            "active": self.finished is None,
+            "target_epochs": self.target_epochs,
+        }
+        if self.origin is None:
+            out["position"] = None
+            return out
+
+        lat, lon, h = geodesy.enu_to_geodetic(*self.mean, *self.origin)
+        n_eff = max(self.n, 1)
+        out.update({
+            "position": {"lat": float(lat), "lon": float(lon), "alt": round(float(h), 4)},
+            "std_enu_m": [round(v, 4) for v in sd],
+            "std_mean_enu_m": [round(v / math.sqrt(n_eff), 5) for v in sd],
+            "cov_enu_m2": [[round(v, 8) for v in row] for row in cov],
+            "horizontal_rms_m": round(math.hypot(sd[0], sd[1]), 4),
+        })
+        return out
+
+
+class PointAveragingEngine:
+    """Una sesión activa como máximo + almacenamiento de los puntos."""
+
+    def __init__(self, points_file=POINTS_FILE):
+        self.points_file = points_file
+        self.session = None
+        self.last_result = None
+
+    def start(self, name="", accept_quality=(4,), outlier_sigma=4.0, target_epochs=0):
+        if self.session is not None:
+            self.stop()
+        self.session = PointSession(
+            name=name or time.strftime("P%Y%m%d_%H%M%S"),
+            accept_quality=accept_quality,
+            outlier_sigma=outlier_sigma,
+            target_epochs=target_epochs,
+        )
+        return self.session.result()
+
+    def add_epoch(self, lat, lon, h, quality):
+        session = self.session
+        if session is None:
+            return None
+        status = session.add(lat, lon, h, quality)
+        if session.done:
+            self.stop()
+        return status
+
+    def stop(self, save=True):
+        session = self.session
+        if session is None:
+            return self.last_result
+        session.finished = time.time()
+        session.flush()
+        self.session = None
+        result = session.result()
+        if save and session.n:
+            result["saved"] = self.save(result)
+        self.last_result = result
+        return result
+
+    def status(self):
+        if self.session is not None:
+            return self.session.result()
+        return self.last_result
+
+    def save(self, result):
+        try:
+            os.makedirs(os.path.dirname(self.points_file) or ".", exist_ok=True)
+            with open(self.points_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, separators=(",", ":")) + "\n")
+            return True
+        except OSError as e:
+            print(f"⚠️  Error guardando punto: {e}")
+            return False
+
+
+def load_points(path=POINTS_FILE, limit=100):
+    """Últimos `limit` puntos guardados (más reciente al final)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()[-limit:]
+    except OSError:
+        return []
+    points = []
+    for line in lines:
+        try:
+            points.append(json.loads(line))
+        except ValueError:
+            continue
+    return points
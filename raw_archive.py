@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Raw Archive
+- Archivo continuo de lo que produce el receptor: cada sentencia NMEA con
+  checksum válido y cada trama RTCM3 con CRC válido, tal cual (CRLF incluido)
+- Segmentos rotados por tiempo (alineados al reloj: una hora por defecto),
+  comprimidos con zstd si está instalado o gzip si no
+- Cada segmento es una concatenación de bloques comprimidos independientes
+  (un bloque por minuto de reloj o BLOCK_BYTES): zcat / zstd -d leen el
+  segmento entero y un minuto se extrae descomprimiendo solo su bloque
+- Índice disperso por segmento (.idx, JSON por línea): un registro por
+  bloque con [t0, t1], offset y longitud comprimida
+- El hilo de la UART solo añade bytes a un búfer; la compresión y la
+  escritura van en un hilo de fondo. Memoria acotada: si la cola supera
+  max_queue_bytes el bloque se descarta y se cuenta
+
+Variables de entorno (SmartProcessor):
+    GNSSAI_ARCHIVE          directorio del archivo (vacío = desactivado)
+    GNSSAI_ARCHIVE_ROTATE   segundos por segmento (3600)
+    GNSSAI_ARCHIVE_CODEC    zstd / gzip (por defecto zstd si está disponible)
+
+Extracción:
+    python raw_archive.py list DIR
+    python raw_archive.py extract DIR 2026-10-19T12:34 [minutos] > minuto.nmea
+"""
+
+import gzip
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+# zstd opcional (mejor ratio y mucho más rápido); gzip siempre disponible
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+BLOCK_SECONDS = 60
+BLOCK_BYTES = 256 * 1024
+ROTATE_SECONDS = 3600
+MAX_QUEUE_BYTES = 4 * 1024 * 1024
+EXTENSIONS = {"zstd": ".raw.zst", "gzip": ".raw.gz"}
+_STOP = None
+
+
+def _compressor(codec):
+    if codec == "zstd":
+        cctx = zstandard.ZstdCompressor(level=3)
+        return cctx.compress
+    return lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompressor(codec):
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard no instalado: no se puede leer un segmento .zst")
+        dctx = zstandard.ZstdDecompressor()
+        return lambda data: dctx.decompress(data, max_output_size=BLOCK_BYTES * 4)
+    return gzip.decompress
+
+
+class RawArchive:
+    """Búfer del bloque en curso + hilo compresor/escritor."""
+
+    def __init__(self, directory, rotate=ROTATE_SECONDS, codec=None,
+                 max_queue_bytes=MAX_QUEUE_BYTES):
+        if codec is None:
+            codec = "zstd" if ZSTD_AVAILABLE else "gzip"
+        if codec not in EXTENSIONS:
+            raise ValueError(f"códec no soportado: {codec}")
+        if codec == "zstd" and not ZSTD_AVAILABLE:
+            raise RuntimeError("GNSSAI_ARCHIVE_CODEC=zstd pero zstandard no está instalado")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.rotate = rotate
+        self.codec = codec
+        self.max_queue_bytes = max_queue_bytes
+
+        # Bloque en curso (solo lo toca el hilo de la UART)
+        self._buf = bytearray()
+        self._block_t0 = 0.0
+        self._block_end = 0.0
+        self._block_t1 = 0.0
+        self._nmea = 0
+        self._rtcm = 0
+
+        self._queue = queue.Queue()
+        self._queued_bytes = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="gnssai-archive", daemon=True)
+        self._thread.start()
+
+        self.stats = {
+            "segments": 0,
+            "blocks": 0,
+            "raw_bytes": 0,
+            "compressed_bytes": 0,
+            "dropped_blocks": 0,
+            "dropped_bytes": 0,
+            "write_errors": 0,
+            "segment": None,
+        }
+
+    @classmethod
+    def from_env(cls):
+        directory = os.environ.get("GNSSAI_ARCHIVE", "")
+        if not directory:
+            return None
+        return cls(
+            directory,
+            rotate=int(os.environ.get("GNSSAI_ARCHIVE_ROTATE", str(ROTATE_SECONDS))),
+            codec=os.environ.get("GNSSAI_ARCHIVE_CODEC") or None,
+        )
+
+    # ------------------------------------------------------------------
+    # Hilo de la UART: solo añadir bytes
+    # ------------------------------------------------------------------
+    def _append(self, data, now):
+        if now >= self._block_end or len(self._buf) >= BLOCK_BYTES:
+            self._cut()
+            self._block_t0 = now
+            # Bloques alineados al minuto de reloj
+            self._block_end = (int(now) // BLOCK_SECONDS + 1) * BLOCK_SECONDS
+        self._buf += data
+        self._block_t1 = now
+
+    def add_nmea(self, line, now=None):
+        """Sentencia ya validada (str, sin CRLF)."""
+        self._append(line.encode("ascii", "ignore") + b"\r\n", now or time.time())
+        self._nmea += 1
+
+    def add_rtcm(self, frame, now=None):
+        """Trama RTCM3 ya validada (bytes/memoryview)."""
+        self._append(frame, now or time.time())
+        self._rtcm += 1
+
+    def _cut(self):
+        """Cierra el bloque en curso y lo pasa al hilo escritor."""
+        if not self._buf:
+            return
+        block = (self._block_t0, self._block_t1, bytes(self._buf), self._nmea, self._rtcm)
+        size = len(self._buf)
+        self._buf.clear()
+        self._nmea = self._rtcm = 0
+        with self._lock:
+            if self._queued_bytes + size > self.max_queue_bytes:
+                # El disco no da abasto: se pierde el bloque, no la UART
+                self.stats["dropped_blocks"] += 1
+                self.stats["dropped_bytes"] += size
+                return
+            self._queued_bytes += size
+        self._queue.put(block)
+
+    # ------------------------------------------------------------------
+    # Hilo escritor
+    # ------------------------------------------------------------------
+    def segment_start(self, t):
+        return int(t) // self.rotate * self.rotate
+
+    def segment_path(self, start):
+        name = datetime.fromtimestamp(start).strftime("gnss_%Y%m%d_%H%M%S")
+        return os.path.join(self.directory, name + EXTENSIONS[self.codec])
+
+    def _run(self):
+        compress = _compressor(self.codec)
+        seg_start = None
+        data_f = idx_f = None
+        try:
+            while True:
+                block = self._queue.get()
+                if block is _STOP:
+                    return
+                t0, t1, raw, nmea, rtcm = block
+                with self._lock:
+                    self._queued_bytes -= len(raw)
+                try:
+                    start = self.segment_start(t0)
+                    if start != seg_start:
+                        for f in (data_f, idx_f):
+                            if f is not None:
+                                f.close()
+                        path = self.segment_path(start)
+                        data_f = open(path, "ab")
+                        idx_f = open(path + ".idx", "a")
+                        seg_start = start
+                        self.stats["segments"] += 1
+                        self.stats["segment"] = os.path.basename(path)
+                    packed = compress(raw)
+                    offset = data_f.tell()
+                    data_f.write(packed)
+                    data_f.flush()
+                    # El índice se escribe después de los datos: una entrada
+                    # del índice siempre apunta a un bloque completo
+                    idx_f.write(json.dumps({
+                        "t0": round(t0, 3), "t1": round(t1, 3),
+                        "offset": offset, "length": len(packed), "raw": len(raw),
+                        "nmea": nmea, "rtcm": rtcm,
+                    }, separators=(",", ":")) + "\n")
+                    idx_f.flush()
+                    self.stats["blocks"] += 1
+                    self.stats["raw_bytes"] += len(raw)
+                    self.stats["compressed_bytes"] += len(packed)
+                except OSError:
+                    self.stats["write_errors"] += 1
+                    for f in (data_f, idx_f):
+                        if f is not None:
+                            f.close()
+                    data_f = idx_f = None
+                    seg_start = None
+        finally:
+            for f in (data_f, idx_f):
+                if f is not None:
+                    f.close()
+
+    def close(self, timeout=5.0):
+        """Cierra el bloque en curso y espera a que se escriba."""
+        self._cut()
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def snapshot(self):
+        out = dict(self.stats)
+        out["codec"] = self.codec
+        out["queued_bytes"] = self._queued_bytes
+        raw = out["raw_bytes"]
+        out["ratio"] = round(out["compressed_bytes"] / raw, 3) if raw else None
+        return out
+
+
+# =============================================================================
+# LECTURA / EXTRACCIÓN
+# =============================================================================
+
+def _codec_of(path):
+    for codec, ext in EXTENSIONS.items():
+        if path.endswith(ext):
+            return codec
+    return None
+
+
+def list_segments(directory):
+    """[(ruta, códec)] de los segmentos con índice, por orden de nombre (= tiempo)."""
+    out = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        codec = _codec_of(name)
+        if codec and os.path.exists(path + ".idx"):
+            out.append((path, codec))
+    return out
+
+
+def read_index(path):
+    entries = []
+    with open(path + ".idx") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break   # línea a medias (corte de corriente)
+    return entries
+
+
+def extract(directory, start, end):
+    """Genera los bytes crudos de los bloques que solapan [start, end) (epoch)."""
+    for path, codec in list_segments(directory):
+        entries = [e for e in read_index(path) if e["t1"] >= start and e["t0"] < end]
+        if not entries:
+            continue
+        decompress = _decompressor(codec)
+        with open(path, "rb") as f:
+            for e in entries:
+                f.seek(e["offset"])
+                yield decompress(f.read(e["length"]))
+
+
+def _main(argv):
+    if len(argv) < 2 or argv[0] not in ("list", "extract"):
+        print(__doc__)
+        return 2
+    directory = argv[1]
+    if argv[0] == "list":
+        for path, codec in list_segments(directory):
+            entries = read_index(path)
+            raw = sum(e["raw"] for e in entries)
+            packed = sum(e["length"] for e in entries)
+            span = (f"{datetime.fromtimestamp(entries[0]['t0']):%H:%M:%S}-"
+                    f"{datetime.fromtimestamp(entries[-1]['t1']):%H:%M:%S}") if entries else "-"
+            print(f"📦 {os.path.basename(path)} {codec} {span} bloques={len(entries)} "
+                  f"{raw / 1e6:.1f} MB -> {packed / 1e6:.1f} MB")
+        return 0
+    if len(argv) < 3:
+        print("uso: raw_archive.py extract DIR AAAA-MM-DDTHH:MM [minutos]")
+        return 2
+    start = datetime.fromisoformat(argv[2]).timestamp()
+    minutes = float(argv[3]) if len(argv) > 3 else 1.0
+    out = sys.stdout.buffer
+    for data in extract(directory, start, start + minutes * 60):
+        out.write(data)
+    out.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
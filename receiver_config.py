@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Receiver Config
+- Traduce el JSON del panel K922 COM1 (app.js) a comandos ASCII ComNav
+  (LOG / UNLOGALL / LOCKOUTSYSTEM / COM / SAVECONFIG ...)
+- Los comandos se inyectan en la UART en vivo por el UARTWriter del
+  SmartProcessor: la lectura NMEA/RTCM no se detiene
+- Envío por lotes (varios comandos en una sola escritura) con ventana:
+  el siguiente lote sale cuando el anterior está confirmado o caducado
+- Confirmaciones: el receptor responde $command,<comando>,response: OK*cs;
+  cada comando queda en ok | error | timeout
+- Medidor de tasas de salida por mensaje (GNGGA, GPHPR, RTCM1074...) para
+  comprobar en el panel el resultado real de la configuración
+
+Cambio de baudios: el COM va solo en su lote; al confirmarse (o caducar,
+la respuesta puede perderse en el cambio) se llama on_baud(baud) para que
+el procesador cambie su lado antes de seguir con el resto de comandos.
+"""
+
+import time
+import itertools
+
+PORT = "COM1"
+
+# Panel -> nombre de sistema en LOCKOUTSYSTEM
+CONSTELLATION_SYSTEMS = {
+    "GPS": "GPS",
+    "BDS-2": "BD2",
+    "BDS-3": "BD3",
+    "GLONASS": "GLONASS",
+    "GALILEO": "GALILEO",
+    "QZSS": "QZSS",
+    "SBAS": "SBAS",
+}
+
+NMEA_MESSAGES = ("GGA", "GSA", "GSV", "GLL", "GST", "HDT", "RMC", "VTG", "ZDA")
+# Mensajes que no tiene sentido sacar más rápido de 1 Hz
+NMEA_MAX_1HZ = ("GSV", "ZDA")
+# RTCM de base "estáticos" (posición, antena, sesgos GLONASS): cada 10 s
+RTCM_SLOW = ("1005", "1006", "1033", "1230")
+RTCM_SLOW_PERIOD = 10
+
+BAUDRATES = (9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600)
+
+# Campos del panel que son del backend, no del receptor
+IGNORED_FIELDS = (
+    "connection.transportType",
+    "connection.serialPort",
+    "connection.tcpPort",
+    "gnss.baselineKm",
+    "imu.insFusion",
+)
+
+STATE_QUEUED = "queued"
+STATE_SENT = "sent"
+STATE_OK = "ok"
+STATE_ERROR = "error"
+STATE_TIMEOUT = "timeout"
+STATE_CANCELLED = "cancelled"
+
+
+def ontime_period(rate_hz):
+    """Hz -> periodo ONTIME (1, 0.5, 0.2, 0.1, 0.05...)."""
+    rate_hz = float(rate_hz)
+    if rate_hz <= 0:
+        raise ValueError(f"tasa inválida: {rate_hz}")
+    return f"{1.0 / rate_hz:g}"
+
+
+def _normalize(command):
+    return " ".join(command.split()).upper()
+
+
+def build_commands(cfg, current_baud=None, port=PORT):
+    """
+    JSON del panel -> (comandos, tasas esperadas {mensaje: Hz}).
+    Lanza ValueError si la configuración no es aplicable.
+    """
+    if not isinstance(cfg, dict):
+        raise ValueError("configuración inválida")
+    gnss = cfg.get("gnss") or {}
+    nmea = cfg.get("nmea") or {}
+    imu = cfg.get("imu") or {}
+    connection = cfg.get("connection") or {}
+    role = ((cfg.get("com") or {}).get("com1") or {}).get("role", "nmea_out")
+
+    commands = [f"UNLOGALL {port}"]
+    expected = {}
+
+    # Constelaciones
+    enabled = gnss.get("constellationsEnabled")
+    if enabled is not None:
+        unknown = [c for c in enabled if c not in CONSTELLATION_SYSTEMS]
+        if unknown:
+            raise ValueError(f"constelación desconocida: {', '.join(unknown)}")
+        if not enabled:
+            raise ValueError("hay que dejar al menos una constelación")
+        for name, system in CONSTELLATION_SYSTEMS.items():
+            verb = "UNLOCKOUTSYSTEM" if name in enabled else "LOCKOUTSYSTEM"
+            commands.append(f"{verb} {system}")
+
+    # Modo RTK
+    mode = gnss.get("mode", "standalone")
+    if mode == "rtk_base":
+        commands.append("FIX AUTO")
+    elif mode in ("standalone", "rtk_rover"):
+        commands.append("FIX NONE")
+    else:
+        raise ValueError(f"modo GNSS desconocido: {mode}")
+
+    corr = gnss.get("corrIn") or {}
+    if mode == "rtk_rover" or role == "rtk_rover":
+        if corr.get("source", "none") != "none":
+            fmt = "RTCMV3" if corr.get("format", "RTCM3") == "RTCM3" else "RTCM"
+            commands.append(f"INTERFACEMODE {port} {fmt} AUTO ON")
+
+    # NMEA
+    talker = nmea.get("talker", "GN")
+    if talker not in ("GN", "GP"):
+        raise ValueError(f"talker NMEA inválido: {talker}")
+    nmea_rate = float(nmea.get("baseRateHz", 1) or 1)
+    solution_rate = float(gnss.get("rateHz", nmea_rate) or nmea_rate)
+    for msg in nmea.get("messages") or ():
+        if msg not in NMEA_MESSAGES:
+            raise ValueError(f"mensaje NMEA desconocido: {msg}")
+        rate = min(nmea_rate, solution_rate)
+        if msg in NMEA_MAX_1HZ:
+            rate = min(rate, 1.0)
+        elif msg == "HDT" and imu.get("enabled"):
+            rate = float(imu.get("rateHz", rate) or rate)
+        name = f"{talker}{msg}"
+        commands.append(f"LOG {port} {name} ONTIME {ontime_period(rate)}")
+        expected[name] = rate
+
+    # Actitud (IMU)
+    if imu.get("enabled"):
+        rate = float(imu.get("rateHz", 5) or 5)
+        commands.append(f"LOG {port} GPHPR ONTIME {ontime_period(rate)}")
+        expected["GPHPR"] = rate
+
+    # RTCM de salida (base)
+    if mode == "rtk_base" or role == "rtk_base":
+        for msg in gnss.get("rtcmBaseMessages") or ():
+            msg = str(msg)
+            if not msg.isdigit():
+                raise ValueError(f"mensaje RTCM inválido: {msg}")
+            period = RTCM_SLOW_PERIOD if msg in RTCM_SLOW else 1
+            commands.append(f"LOG {port} RTCM{msg} ONTIME {period}")
+            expected[f"RTCM{msg}"] = 1.0 / period
+
+    if cfg.get("save"):
+        commands.append("SAVECONFIG")
+
+    # Baudios al final: lo que venga después ya va a la nueva velocidad
+    baud = connection.get("serialBaud")
+    if baud:
+        baud = int(baud)
+        if baud not in BAUDRATES:
+            raise ValueError(f"baudios no soportados: {baud}")
+        if baud != current_baud:
+            commands.append(f"COM {port} {baud}")
+            if cfg.get("save"):
+                commands.append("SAVECONFIG")
+
+    return commands, expected
+
+
+def parse_response(line):
+    """
+    $command,<comando>,response: <texto>*cs -> (comando, ok, texto)
+    o None si la línea no es una respuesta de comando.
+    """
+    if not line.startswith("$command,"):
+        return None
+    body = line.split("*", 1)[0][9:]
+    command, sep, response = body.rpartition(",response:")
+    if not sep:
+        return body, False, ""
+    response = response.strip()
+    return command, response.upper().startswith("OK"), response
+
+
+class ConfigJob:
+    """Una configuración aplicada: comandos + estado de cada uno."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, commands, expected_rates=None, source="panel", now=None):
+        self.id = next(self._ids)
+        self.created = now or time.monotonic()
+        self.finished = None
+        self.source = source
+        self.expected_rates = expected_rates or {}
+        self.commands = [
+            {"cmd": c, "key": _normalize(c), "state": STATE_QUEUED,
+             "response": "", "t_sent": 0.0, "latency_ms": None}
+            for c in commands
+        ]
+        self.next_index = 0
+        self.batches = 0
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def in_flight(self):
+        return [c for c in self.commands if c["state"] == STATE_SENT]
+
+    def counts(self):
+        out = {}
+        for c in self.commands:
+            out[c["state"]] = out.get(c["state"], 0) + 1
+        return out
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "done": self.done,
+            "source": self.source,
+            "batches": self.batches,
+            "counts": self.counts(),
+            "duration_s": round((self.finished or time.monotonic()) - self.created, 2),
+            "expected_rates": self.expected_rates,
+            "commands": [
+                {"cmd": c["cmd"], "state": c["state"], "response": c["response"],
+                 "latency_ms": c["latency_ms"]}
+                for c in self.commands
+            ],
+        }
+
+
+class ReceiverConfigurator:
+    """
+    Cola de configuración sobre la UART en vivo. Se usa desde el hilo del
+    procesador: apply() desde el canal de control, on_response() por cada
+    $command recibido y poll() en cada vuelta del bucle.
+    """
+
+    def __init__(self, send, batch_size=8, ack_timeout=2.0, on_baud=None):
+        """
+        Args:
+            send: callable(bytes) -> bool (UARTWriter.submit)
+            batch_size: comandos por escritura
+            ack_timeout: segundos de espera por respuesta
+            on_baud: callable(baud) al completarse un COM
+        """
+        self.send = send
+        self.batch_size = batch_size
+        self.ack_timeout = ack_timeout
+        self.on_baud = on_baud
+        self.job = None
+        self.mode = None
+        self._pending_baud = None
+        self.stats = {
+            "jobs": 0,
+            "commands_sent": 0,
+            "batches_sent": 0,
+            "acks_ok": 0,
+            "acks_error": 0,
+            "timeouts": 0,
+            "unmatched_responses": 0,
+        }
+
+    # ------------------------------------------------------------------
+    def apply(self, cfg, current_baud=None, now=None):
+        """Traduce y encola una configuración (cancela la anterior)."""
+        commands, expected = build_commands(cfg, current_baud)
+        self.mode = (cfg.get("gnss") or {}).get("mode")
+        return self.submit(commands, expected, "panel", now)
+
+    def submit(self, commands, expected_rates=None, source="panel", now=None):
+        """Encola una lista de comandos ya construida (cancela la anterior)."""
+        now = now or time.monotonic()
+        if self.job is not None and not self.job.done:
+            for c in self.job.commands:
+                if c["state"] in (STATE_QUEUED, STATE_SENT):
+                    c["state"] = STATE_CANCELLED
+            self.job.finished = now
+        self.job = ConfigJob(commands, expected_rates, source, now)
+        self._pending_baud = None
+        self.stats["jobs"] += 1
+        self.poll(now)
+        return self.job.summary()
+
+    @property
+    def busy(self):
+        return self.job is not None and not self.job.done
+
+    def on_response(self, line, now=None):
+        """$command,... -> confirma el comando en vuelo. True si era respuesta."""
+        parsed = parse_response(line)
+        if parsed is None:
+            return False
+        command, ok, response = parsed
+        job = self.job
+        flying = job.in_flight() if job is not None else []
+        if not flying:
+            self.stats["unmatched_responses"] += 1
+            return True
+
+        key = _normalize(command)
+        target = next((c for c in flying if c["key"] == key), flying[0])
+        now = now or time.monotonic()
+        target["state"] = STATE_OK if ok else STATE_ERROR
+        target["response"] = response
+        target["latency_ms"] = round((now - target["t_sent"]) * 1000.0, 1)
+        self.stats["acks_ok" if ok else "acks_error"] += 1
+        if not ok and self._pending_baud is not None and target["key"].startswith("COM "):
+            # Cambio rechazado: el receptor sigue a la velocidad anterior
+            self._pending_baud = None
+        self.poll(now)
+        return True
+
+    def poll(self, now=None):
+        """Caduca confirmaciones y envía el siguiente lote si toca."""
+        job = self.job
+        if job is None or job.done:
+            return
+        now = now or time.monotonic()
+
+        flying = job.in_flight()
+        for c in flying:
+            if now - c["t_sent"] > self.ack_timeout:
+                c["state"] = STATE_TIMEOUT
+                self.stats["timeouts"] += 1
+        if job.in_flight():
+            return
+
+        if self._pending_baud is not None:
+            baud, self._pending_baud = self._pending_baud, None
+            if self.on_baud is not None:
+                self.on_baud(baud)
+
+        if job.next_index >= len(job.commands):
+            job.finished = now
+            return
+
+        batch = []
+        while job.next_index < len(job.commands) and len(batch) < self.batch_size:
+            c = job.commands[job.next_index]
+            if c["key"].startswith("COM ") and batch:
+                break
+            batch.append(c)
+            job.next_index += 1
+            if c["key"].startswith("COM "):
+                self._pending_baud = int(c["key"].split()[-1])
+                break
+
+        data = "".join(c["cmd"] + "\r\n" for c in batch).encode("ascii")
+        if not self.send(data):
+            # Cola del escritor llena: se reintenta en la siguiente vuelta
+            job.next_index -= len(batch)
+            self._pending_baud = None
+            return
+        for c in batch:
+            c["state"] = STATE_SENT
+            c["t_sent"] = now
+        job.batches += 1
+        self.stats["batches_sent"] += 1
+        self.stats["commands_sent"] += len(batch)
+
+    def status(self):
+        job = self.job
+        return {
+            "job": job.summary() if job is not None else None,
+            "stats": dict(self.stats),
+        }
+
+
+class OutputRateMeter:
+    """
+    Mensajes y bytes por tipo (GNGGA, GPHPR, RTCM1074...). add() es O(1);
+    las tasas se recalculan como mucho una vez por ventana.
+    """
+
+    def __init__(self, window=2.0):
+        self.window = window
+        self.counts = {}
+        self.bytes = {}
+        self._last_counts = {}
+        self._last_bytes = {}
+        self._t0 = time.monotonic()
+        self.rates = {}
+        self.byte_rates = {}
+
+    def add(self, kind, nbytes):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        self.bytes[kind] = self.bytes.get(kind, 0) + nbytes
+
+    def tick(self, now=None):
+        now = now or time.monotonic()
+        dt = now - self._t0
+        if dt < self.window:
+            return False
+        last_c, last_b = self._last_counts, self._last_bytes
+        self.rates = {k: round((v - last_c.get(k, 0)) / dt, 2) for k, v in self.counts.items()}
+        self.byte_rates = {k: round((v - last_b.get(k, 0)) / dt, 1) for k, v in self.bytes.items()}
+        self._last_counts = dict(self.counts)
+        self._last_bytes = dict(self.bytes)
+        self._t0 = now
+        return True
+
+    def snapshot(self):
+        return {
+            "window_s": self.window,
+            "rates_hz": {k: v for k, v in self.rates.items() if v > 0},
+            "bytes_per_s": round(sum(self.byte_rates.values()), 1),
+        }
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI RTCM3 / NMEA demux
+- Separa en un mismo flujo de bytes de la UART los mensajes RTCM3 (0xD3)
+  y las sentencias NMEA ($...\\r\\n)
+- Valida RTCM3 con longitud + CRC-24Q, sin tocar los bytes (passthrough)
+- Entrega memoryviews sobre el buffer interno (sin copias)
+- Cuenta mensajes por tipo (1004, 1005, 1074, 1084, 1094, 1124, 1230, ...)
+"""
+
+RTCM3_PREAMBLE = 0xD3
+RTCM3_HEADER_LEN = 3
+RTCM3_CRC_LEN = 3
+RTCM3_MAX_PAYLOAD = 1023
+
+NMEA_START = 0x24  # '$'
+NMEA_MAX_LEN = 256  # NMEA 4.11 limita a 82, dejamos margen para propietarias
+
+KIND_NMEA = "NMEA"
+KIND_RTCM = "RTCM"
+
+
+def _build_crc24q_table():
+    table = []
+    for i in range(256):
+        crc = i << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= 0x1864CFB
+        table.append(crc & 0xFFFFFF)
+    return tuple(table)
+
+
+CRC24Q_TABLE = _build_crc24q_table()
+
+
+def crc24q(data, start=0, end=None) -> int:
+    """CRC-24Q (Qualcomm) usado por RTCM3 sobre data[start:end]."""
+    if end is None:
+        end = len(data)
+    crc = 0
+    table = CRC24Q_TABLE
+    for i in range(start, end):
+        crc = ((crc << 8) & 0xFFFFFF) ^ table[(crc >> 16) ^ data[i]]
+    return crc
+
+
+def rtcm3_message_type(frame) -> int:
+    """Número de mensaje (12 bits) de una trama RTCM3 completa."""
+    if len(frame) < RTCM3_HEADER_LEN + 2:
+        return 0
+    return (frame[3] << 4) | (frame[4] >> 4)
+
+
+def build_rtcm3_frame(payload: bytes) -> bytes:
+    """Construye una trama RTCM3 (cabecera + payload + CRC). Útil en pruebas."""
+    length = len(payload)
+    if length > RTCM3_MAX_PAYLOAD:
+        raise ValueError(f"Payload RTCM3 demasiado largo: {length}")
+    body = bytes((RTCM3_PREAMBLE, (length >> 8) & 0x03, length & 0xFF)) + bytes(payload)
+    crc = crc24q(body)
+    return body + bytes(((crc >> 16) & 0xFF, (crc >> 8) & 0xFF, crc & 0xFF))
+
+
+class StreamDemuxer:
+    """
+    Demultiplexor incremental NMEA + RTCM3.
+
+    Uso:
+        demux = StreamDemuxer()
+        for kind, frame in demux.feed(chunk):
+            ...
+
+    `frame` es un memoryview sobre el buffer interno: solo es válido hasta
+    la siguiente llamada a feed(). Para NMEA no incluye el \\r\\n final; para
+    RTCM3 es la trama completa (cabecera + payload + CRC), lista para reenviar.
+    """
+
+    def __init__(self, max_nmea_len=NMEA_MAX_LEN):
+        self.max_nmea_len = max_nmea_len
+        self._buf = bytearray()
+        self._pos = 0
+
+        # Estadísticas
+        self.stats = {
+            "nmea_frames": 0,
+            "rtcm_frames": 0,
+            "rtcm_crc_errors": 0,
+            "discarded_bytes": 0,
+        }
+        self.rtcm_types = {}
+
+    def reset(self):
+        self._buf = bytearray()
+        self._pos = 0
+
+    @property
+    def pending(self) -> int:
+        """Bytes recibidos aún sin enmarcar."""
+        return len(self._buf) - self._pos
+
+    def feed(self, data):
+        """Añade bytes y genera (kind, memoryview) por cada trama completa."""
+        buf = self._buf
+
+        # Compactar lo ya consumido (las vistas anteriores ya no son válidas)
+        try:
+            if self._pos:
+                del buf[: self._pos]
+                self._pos = 0
+            if data:
+                buf += data
+        except BufferError:
+            # Alguien conserva una vista de la llamada anterior: buffer nuevo
+            buf = self._buf = buf[self._pos :] + bytes(data)
+            self._pos = 0
+
+        with memoryview(buf) as view:
+            for item in self._scan(buf, view):
+                yield item
+
+    def _scan(self, buf, view):
+        stats = self.stats
+        end = len(buf)
+        pos = self._pos
+
+        while pos < end:
+            byte = buf[pos]
+
+            if byte == RTCM3_PREAMBLE:
+                if end - pos < RTCM3_HEADER_LEN:
+                    break
+                # 6 bits reservados a 0 + 10 bits de longitud
+                if buf[pos + 1] & 0xFC:
+                    pos = self._skip(buf, pos + 1, end)
+                    continue
+                length = ((buf[pos + 1] & 0x03) << 8) | buf[pos + 2]
+                total = RTCM3_HEADER_LEN + length + RTCM3_CRC_LEN
+                if end - pos < total:
+                    break
+                crc_pos = pos + RTCM3_HEADER_LEN + length
+                crc_rx = (buf[crc_pos] << 16) | (buf[crc_pos + 1] << 8) | buf[crc_pos + 2]
+                if crc24q(buf, pos, crc_pos) != crc_rx:
+                    stats["rtcm_crc_errors"] += 1
+                    pos = self._skip(buf, pos + 1, end)
+                    continue
+
+                frame = view[pos : pos + total]
+                msg_type = rtcm3_message_type(frame) if length >= 2 else 0
+                self.rtcm_types[msg_type] = self.rtcm_types.get(msg_type, 0) + 1
+                stats["rtcm_frames"] += 1
+                pos += total
+                self._pos = pos
+                yield KIND_RTCM, frame
+                continue
+
+            if byte == NMEA_START:
+                nl = buf.find(b"\n", pos, min(end, pos + self.max_nmea_len))
+                # Un '$' o un preámbulo RTCM3 (0xD3 nunca es ASCII) antes del
+                # terminador indica sentencia truncada: resincronizar allí, o
+                # el '\n' de dentro de la trama se tragaría la trama entera
+                restart = self._next_start(buf, pos + 1, nl if nl >= 0 else end)
+                if restart >= 0:
+                    stats["discarded_bytes"] += restart - pos
+                    pos = restart
+                    continue
+                if nl < 0:
+                    if end - pos < self.max_nmea_len:
+                        break
+                    # Sentencia sin terminador: descartar el '$' y resincronizar
+                    pos = self._skip(buf, pos + 1, end)
+                    continue
+                stop = nl
+                if stop > pos and buf[stop - 1] == 0x0D:
+                    stop -= 1
+                stats["nmea_frames"] += 1
+                frame = view[pos:stop]
+                pos = nl + 1
+                self._pos = pos
+                yield KIND_NMEA, frame
+                continue
+
+            pos = self._skip(buf, pos, end)
+
+        self._pos = pos
+
+    @staticmethod
+    def _next_start(buf, pos, end):
+        """Posición del siguiente candidato ('$' o 0xD3) en [pos, end), o -1."""
+        nxt_nmea = buf.find(b"$", pos, end)
+        nxt_rtcm = buf.find(b"\xd3", pos, end)
+        if nxt_nmea < 0:
+            return nxt_rtcm
+        if nxt_rtcm < 0:
+            return nxt_nmea
+        return min(nxt_nmea, nxt_rtcm)
+
+    def _skip(self, buf, pos, end):
+        """Avanza hasta el siguiente candidato ('$' o 0xD3) contando basura."""
+        nxt = self._next_start(buf, pos, end)
+        if nxt < 0:
+            nxt = end
+        self.stats["discarded_bytes"] += nxt - pos
+        return nxt
+
+    def get_stats(self):
+        data = dict(self.stats)
+        data["rtcm_types"] = {str(k): v for k, v in sorted(self.rtcm_types.items())}
+        return data
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Satellite Table
+- Modelo de satélites con clave (sistema, PRN, señal): GPS 5 y GLONASS 5 no
+  se pisan, y las filas L1/L2/L5 (B1/B2/B3, E1/E5a...) del mismo PRN
+  tampoco
+- GSV NMEA 4.11: el campo final de ID de señal (hex) se traduce a una
+  banda de frecuencia; sin ese campo (NMEA < 4.10) la fila es L1
+- Columnas compactas (array) con ranuras por satélite y una columna de
+  C/N0 por banda: actualizar un GSV no crea ningún dict, solo escribe
+  enteros en su sitio. Los dicts se construyen al publicar (por época)
+
+Bandas (columna C/N0):
+    L1  GPS L1 C/A·P·M, GLONASS G1, Galileo E1, BeiDou B1I/B1C, QZSS L1
+    L2  GPS L2, GLONASS G2, Galileo E5b, BeiDou B2I/B2b, QZSS L2C
+    L5  GPS L5, Galileo E5a/E5, BeiDou B2a/B2a+b, QZSS L5, NavIC L5
+    L6  Galileo E6, BeiDou B3, QZSS L6
+Dos señales de la misma banda (p. ej. L2P y L2C) comparten columna.
+"""
+
+import struct
+import time
+from array import array
+
+SYSTEMS = ("GPS", "GLONASS", "Galileo", "BeiDou", "QZSS", "SBAS", "NavIC", "GNSS")
+SYSTEM_LETTERS = "GRECJSIX"
+GPS, GLONASS, GALILEO, BEIDOU, QZSS, SBAS, NAVIC, UNKNOWN = range(8)
+
+TALKER_SYSTEMS = {
+    "GP": GPS, "GL": GLONASS, "GA": GALILEO, "GB": BEIDOU, "BD": BEIDOU,
+    "GQ": QZSS, "QZ": QZSS, "GI": NAVIC,
+}
+
+BANDS = ("L1", "L2", "L5", "L6")
+NBANDS = len(BANDS)
+L1, L2, L5, L6 = range(NBANDS)
+
+# ID de señal NMEA 4.11 -> banda, por sistema ("0" = todas las señales -> L1)
+SIGNAL_BANDS = {
+    GPS: {"1": L1, "2": L1, "3": L1, "4": L2, "5": L2, "6": L2, "7": L5, "8": L5},
+    GLONASS: {"1": L1, "2": L1, "3": L2, "4": L2},
+    GALILEO: {"1": L5, "2": L2, "3": L5, "4": L6, "5": L6, "6": L1, "7": L1},
+    BEIDOU: {"1": L1, "2": L1, "3": L1, "4": L1, "5": L5, "6": L2, "7": L5,
+             "8": L6, "9": L6, "A": L6, "B": L2, "C": L2},
+    QZSS: {"1": L1, "2": L1, "3": L1, "4": L1, "5": L2, "6": L2, "7": L5, "8": L5,
+           "9": L6, "A": L6},
+    SBAS: {"1": L1, "7": L5},
+    NAVIC: {"1": L5},
+    UNKNOWN: {},
+}
+
+STATUSES = ("los", "multipath", "nlos")
+STATUS_INDEX = {s: i for i, s in enumerate(STATUSES)}
+
+_STATE_HEAD = struct.Struct("<HH")      # ranuras, bandas (checkpoint)
+_LITTLE = array("H", [1]).tobytes() == b"\x01\x00"
+
+CN0_MAX_AGE = 10.0      # una banda sin refrescar en 10 s ya no se sigue
+SAT_MAX_AGE = 60.0      # satélite sin GSV en 60 s sale de la tabla
+
+
+def system_from_prn(prn, default):
+    """Numeración extendida (talker GN/GP, NMEA 4.10): rango de PRN -> sistema."""
+    if prn <= 32:
+        # 1-32 es GPS también con talker GN, que no tiene sistema propio
+        return GPS
+    if prn <= 64:
+        return SBAS
+    if prn <= 96:
+        return GLONASS
+    if 193 <= prn <= 202:
+        return QZSS
+    if 301 <= prn <= 336:
+        return GALILEO
+    if 401 <= prn <= 463:
+        return BEIDOU
+    return default
+
+
+def local_prn(system, prn):
+    """PRN dentro del sistema: GLONASS 65-96 -> 1-32, Galileo 301-336 -> 1-36..."""
+    if system == GLONASS and prn > 64:
+        return prn - 64
+    if system == GALILEO and prn > 300:
+        return prn - 300
+    if system == BEIDOU and prn > 400:
+        return prn - 400
+    if system == QZSS and prn > 192:
+        return prn - 192
+    if system == SBAS and prn <= 64:
+        return prn + 87      # 33-64 -> 120-151
+    return prn
+
+
+def _int(field):
+    try:
+        return int(field)
+    except ValueError:
+        return int(float(field))
+
+
+class SatelliteTable:
+    """Tabla de satélites en columnas; una ranura por (sistema, PRN)."""
+
+    def __init__(self, capacity=96):
+        self.capacity = 0
+        self.system = array("B")
+        self.prn = array("H")
+        self.elevation = array("b")
+        self.azimuth = array("H")
+        self.status = array("B")
+        self.t_seen = array("d")
+        self.cn0 = array("B")       # [ranura * NBANDS + banda], 0 = sin señal
+        self.t_cn0 = array("d")
+        self.index = {}             # (sistema << 16) | prn -> ranura
+        self.free = []
+        self.used = 0
+        # Ranuras/bandas tocadas por el último GSV (máximo 4 satélites)
+        self.updated = array("H", bytes(8))
+        self.updated_band = array("B", bytes(4))
+        self.n_updated = 0
+        self.sentences = 0
+        self._grow(capacity)
+
+    def _grow(self, n):
+        self.system.extend(bytes(n))
+        self.prn.extend(array("H", bytes(2 * n)))
+        self.elevation.extend(array("b", bytes(n)))
+        self.azimuth.extend(array("H", bytes(2 * n)))
+        self.status.extend(bytes(n))
+        self.t_seen.extend(array("d", bytes(8 * n)))
+        self.cn0.extend(bytes(n * NBANDS))
+        self.t_cn0.extend(array("d", bytes(8 * n * NBANDS)))
+        self.capacity += n
+
+    def _slot(self, system, prn):
+        key = (system << 16) | prn
+        slot = self.index.get(key)
+        if slot is not None:
+            return slot
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.used >= self.capacity:
+                self._grow(self.capacity)
+            slot = self.used
+            self.used += 1
+        self.index[key] = slot
+        self.system[slot] = system
+        self.prn[slot] = prn
+        self.elevation[slot] = 0
+        self.azimuth[slot] = 0
+        self.status[slot] = 0
+        base = slot * NBANDS
+        for b in range(NBANDS):
+            self.cn0[base + b] = 0
+            self.t_cn0[base + b] = 0.0
+        return slot
+
+    # ------------------------------------------------------------------
+    def update_gsv(self, parts, now=None):
+        """
+        GSV ya partido (sin checksum). Devuelve cuántos satélites se tocaron;
+        sus ranuras y bandas quedan en updated / updated_band.
+        """
+        if len(parts) < 4:
+            return 0
+        if now is None:
+            now = time.time()
+        talker = parts[0][1:3]
+        default = TALKER_SYSTEMS.get(talker, UNKNOWN)
+        extended = talker in ("GN", "GP")
+
+        fields = len(parts) - 4
+        signal = ""
+        if fields % 4 == 1:
+            signal = parts[-1].upper()
+            fields -= 1
+        # Como mucho 4 satélites por sentencia (tamaño de updated): el resto
+        # de un GSV mal formado o extendido se ignora
+        fields = min(fields, 16)
+
+        count = 0
+        for base in range(4, 4 + fields, 4):
+            raw = parts[base]
+            if not raw:
+                continue
+            try:
+                prn = _int(raw)
+                system = system_from_prn(prn, default) if extended else default
+                prn = local_prn(system, prn)
+                band = SIGNAL_BANDS[system].get(signal, L1) if signal else L1
+                slot = self._slot(system, prn)
+                field = parts[base + 1]
+                if field:
+                    self.elevation[slot] = max(-90, min(_int(field), 90))
+                field = parts[base + 2]
+                if field:
+                    self.azimuth[slot] = _int(field) % 360
+                field = parts[base + 3]
+                i = slot * NBANDS + band
+                self.cn0[i] = max(0, min(_int(field), 255)) if field else 0
+                self.t_cn0[i] = now
+            except (ValueError, IndexError, OverflowError):
+                continue
+            self.t_seen[slot] = now
+            self.updated[count] = slot
+            self.updated_band[count] = band
+            count += 1
+        self.n_updated = count
+        self.sentences += 1
+        return count
+
+    # ------------------------------------------------------------------
+    def band_cn0(self, slot, band, now=None, max_age=CN0_MAX_AGE):
+        i = slot * NBANDS + band
+        if (now or time.time()) - self.t_cn0[i] > max_age:
+            return 0
+        return self.cn0[i]
+
+    def primary_cn0(self, slot, now=None, max_age=CN0_MAX_AGE):
+        """C/N0 de L1 si se sigue; si no, la mejor banda disponible."""
+        now = now or time.time()
+        value = self.band_cn0(slot, L1, now, max_age)
+        if value:
+            return value
+        return max(self.band_cn0(slot, b, now, max_age) for b in range(1, NBANDS))
+
+    def cn0_bands(self, slot, now=None, max_age=CN0_MAX_AGE):
+        """{banda: C/N0} de las bandas con señal."""
+        now = now or time.time()
+        out = {}
+        for b in range(NBANDS):
+            value = self.band_cn0(slot, b, now, max_age)
+            if value:
+                out[BANDS[b]] = value
+        return out
+
+    def set_status(self, slot, status):
+        self.status[slot] = STATUS_INDEX.get(status, 0)
+
+    def sat_id(self, slot):
+        """Identificador tipo RINEX: G05, R05, E11, C23, S120..."""
+        return f"{SYSTEM_LETTERS[self.system[slot]]}{self.prn[slot]:02d}"
+
+    def active(self, now=None, max_age=SAT_MAX_AGE):
+        now = now or time.time()
+        for slot in self.index.values():
+            if now - self.t_seen[slot] <= max_age:
+                yield slot
+
+    def expire(self, now=None, max_age=SAT_MAX_AGE):
+        now = now or time.time()
+        for key, slot in list(self.index.items()):
+            if now - self.t_seen[slot] > max_age:
+                del self.index[key]
+                self.free.append(slot)
+
+    def __len__(self):
+        return len(self.index)
+
+    # ------------------------------------------------------------------
+    # Checkpoint (state_checkpoint.py): columnas de las ranuras ocupadas
+    # ------------------------------------------------------------------
+    def _columns(self):
+        return (self.system, self.prn, self.elevation, self.azimuth, self.status, self.t_seen)
+
+    def dump(self):
+        slots = sorted(self.index.values())
+        cols = [array(c.typecode, [c[s] for s in slots]) for c in self._columns()]
+        cn0 = array("B")
+        t_cn0 = array("d")
+        for s in slots:
+            cn0.extend(self.cn0[s * NBANDS : (s + 1) * NBANDS])
+            t_cn0.extend(self.t_cn0[s * NBANDS : (s + 1) * NBANDS])
+        cols += [cn0, t_cn0]
+        if not _LITTLE:
+            for col in cols:
+                col.byteswap()
+        return _STATE_HEAD.pack(len(slots), NBANDS) + b"".join(c.tobytes() for c in cols)
+
+    def restore(self, blob):
+        """Carga lo volcado por dump(). Devuelve el nº de satélites restaurados."""
+        n, nbands = _STATE_HEAD.unpack_from(blob, 0)
+        if nbands != NBANDS:
+            raise ValueError(f"checkpoint con {nbands} bandas (se esperaban {NBANDS})")
+        offset = _STATE_HEAD.size
+        cols = []
+        for typecode, count in [(c.typecode, n) for c in self._columns()] + [("B", n * NBANDS), ("d", n * NBANDS)]:
+            col = array(typecode)
+            size = col.itemsize * count
+            col.frombytes(blob[offset : offset + size])
+            if len(col) != count:
+                raise ValueError("checkpoint de satélites truncado")
+            if not _LITTLE:
+                col.byteswap()
+            cols.append(col)
+            offset += size
+        system, prn, elevation, azimuth, status, t_seen, cn0, t_cn0 = cols
+        for i in range(n):
+            if system[i] >= len(SYSTEMS):
+                continue
+            slot = self._slot(system[i], prn[i])
+            self.elevation[slot] = elevation[i]
+            self.azimuth[slot] = azimuth[i]
+            self.status[slot] = status[i] if status[i] < len(STATUSES) else 0
+            self.t_seen[slot] = t_seen[i]
+            self.cn0[slot * NBANDS : (slot + 1) * NBANDS] = cn0[i * NBANDS : (i + 1) * NBANDS]
+            self.t_cn0[slot * NBANDS : (slot + 1) * NBANDS] = t_cn0[i * NBANDS : (i + 1) * NBANDS]
+        return n
+
+    # ------------------------------------------------------------------
+    # Vistas por época (aquí sí se crean dicts)
+    # ------------------------------------------------------------------
+    def record(self, slot, now=None):
+        now = now or time.time()
+        return {
+            "id": self.sat_id(slot),
+            "prn": str(self.prn[slot]),
+            "constellation": SYSTEMS[self.system[slot]],
+            "elevation": float(self.elevation[slot]),
+            "azimuth": float(self.azimuth[slot]),
+            "snr": float(self.primary_cn0(slot, now)),
+            "cn0": self.cn0_bands(slot, now),
+            "status": STATUSES[self.status[slot]],
+        }
+
+    def snapshot(self, now=None, max_age=SAT_MAX_AGE):
+        """Lista de satélites para el JSON, ordenada por sistema y PRN."""
+        now = now or time.time()
+        self.expire(now, max_age)
+        slots = sorted(self.index.values(), key=lambda s: (self.system[s], self.prn[s]))
+        return [self.record(s, now) for s in slots]
+
+    def classifier_input(self, now=None, max_age=CN0_MAX_AGE):
+        """{id: datos} para SignalClassifier.classify_signals (satélites con señal)."""
+        now = now or time.time()
+        out = {}
+        for slot in self.active(now, max_age):
+            rec = self.record(slot, now)
+            if rec["snr"] > 0:
+                rec["slot"] = slot
+                out[rec["id"]] = rec
+        return out
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Sky Aggregates
+- Agregados incrementales del cielo para el dashboard (skyplot sin que el
+  navegador procese satélites crudos cada segundo)
+- Rejilla azimut × elevación: ocupación (satélite-épocas) y SNR medio
+- Histogramas de SNR por constelación (bins de 1 dB-Hz)
+- Máscara de obstrucción aprendida: por sector de azimut, elevación por
+  debajo de la cual las señales llegan sistemáticamente degradadas
+- Coste por época O(satélites); la vista serializada se regenera solo si
+  hubo épocas nuevas desde la última consulta
+"""
+
+import time
+
+AZ_STEP = 10                       # grados por columna de azimut
+EL_STEP = 5                        # grados por fila de elevación
+AZ_BINS = 360 // AZ_STEP
+EL_BINS = 90 // EL_STEP
+SNR_BINS = 60                      # 0..59 dB-Hz (el último bin acumula el resto)
+
+GOOD_SNR = 35.0                    # señal "limpia" para la máscara
+MIN_CELL_SAMPLES = 20              # muestras antes de opinar sobre una celda
+OBSTRUCTED_GOOD_RATIO = 0.3        # < 30 % de señales limpias -> obstruida
+MAX_CELL_COUNT = 1 << 16           # al superarlo la celda se divide a la mitad
+
+
+def sky_cell(azimuth: float, elevation: float) -> int:
+    """Índice plano de la celda (fila = elevación, columna = azimut)."""
+    az = int(azimuth % 360) // AZ_STEP
+    el = int(elevation) // EL_STEP
+    if el < 0:
+        el = 0
+    elif el >= EL_BINS:
+        el = EL_BINS - 1
+    return el * AZ_BINS + az
+
+
+class SkyAggregator:
+    """Acumuladores del cielo, actualizados época a época."""
+
+    def __init__(self):
+        n_cells = AZ_BINS * EL_BINS
+        self.count = [0] * n_cells
+        self.snr_sum = [0.0] * n_cells
+        self.good = [0] * n_cells
+        self.current = {}           # satélites de la última época: celda ocupada ahora
+        self.snr_hist = {}          # constelación -> [SNR_BINS]
+        self.epochs = 0
+        self.samples = 0
+        self.since = time.time()
+        self.last_update = 0.0
+        self._dirty = True
+        self._view = None
+
+    def _hist(self, constellation):
+        hist = self.snr_hist.get(constellation)
+        if hist is None:
+            hist = self.snr_hist[constellation] = [0] * SNR_BINS
+        return hist
+
+    def update(self, satellites, t=None):
+        """Añade una época (lista de dicts prn/constellation/elevation/azimuth/snr)."""
+        current = {}
+        for sat in satellites or ():
+            snr = sat.get("snr") or 0.0
+            elevation = sat.get("elevation")
+            azimuth = sat.get("azimuth")
+            if snr <= 0 or elevation is None or azimuth is None:
+                continue
+
+            cell = sky_cell(azimuth, elevation)
+            n = self.count[cell] + 1
+            self.count[cell] = n
+            self.snr_sum[cell] += snr
+            if snr >= GOOD_SNR:
+                self.good[cell] += 1
+            if n >= MAX_CELL_COUNT:
+                # Olvido gradual: lo reciente pesa más que lo de hace semanas
+                self.count[cell] = n >> 1
+                self.snr_sum[cell] /= 2.0
+                self.good[cell] >>= 1
+
+            constellation = sat.get("constellation", "GNSS")
+            self._hist(constellation)[min(int(snr), SNR_BINS - 1)] += 1
+            current[f"{constellation}:{sat.get('prn')}"] = (cell, snr)
+            self.samples += 1
+
+        self.current = current
+        self.epochs += 1
+        self.last_update = t or time.time()
+        self._dirty = True
+
+    def obstruction_mask(self):
+        """
+        Elevación de máscara por sector de azimut: la celda obstruida más alta
+        contando desde el horizonte (las celdas sin datos no cortan la máscara).
+        """
+        mask = [0] * AZ_BINS
+        for az in range(AZ_BINS):
+            for el in range(EL_BINS):
+                cell = el * AZ_BINS + az
+                n = self.count[cell]
+                if n < MIN_CELL_SAMPLES:
+                    continue
+                if self.good[cell] / n < OBSTRUCTED_GOOD_RATIO:
+                    mask[az] = (el + 1) * EL_STEP
+                else:
+                    break
+        return mask
+
+    def view(self):
+        """Vista precomputada (se recalcula solo si hubo épocas nuevas)."""
+        if not self._dirty and self._view is not None:
+            return self._view
+
+        mean_snr = [
+            round(s / n, 1) if n else None
+            for s, n in zip(self.snr_sum, self.count)
+        ]
+        self._view = {
+            "grid": {
+                "az_step": AZ_STEP,
+                "el_step": EL_STEP,
+                "az_bins": AZ_BINS,
+                "el_bins": EL_BINS,
+                "occupancy": list(self.count),
+                "mean_snr": mean_snr,
+            },
+            "current": [
+                {"id": key, "cell": cell, "snr": snr}
+                for key, (cell, snr) in sorted(self.current.items())
+            ],
+            "snr_histograms": {
+                "bin_db": 1,
+                "constellations": {k: list(v) for k, v in sorted(self.snr_hist.items())},
+            },
+            "obstruction_mask": {
+                "az_step": AZ_STEP,
+                "elevation": self.obstruction_mask(),
+            },
+            "epochs": self.epochs,
+            "samples": self.samples,
+            "since": self.since,
+            "last_update": self.last_update,
+        }
+        self._dirty = False
+        return self._view
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Sky Mask
+- Máscara de cielo aprendida por emplazamiento: C/N0 esperado en cada
+  celda azimut × elevación (misma rejilla que sky_aggregates)
+- Aprendizaje incremental O(1) por observación (media exponencial)
+- Consulta O(1): clase precalculada por celda + residuo C/N0 - esperado
+- Persistida en disco (GNSSAI_SKYMASK) con escritura atómica: cuanto más
+  tiempo pasa la base en el punto, mejor clasifica
+
+Formato (.skymask, little endian):
+    cabecera: b"GNSM" <H versión> <H az_step> <H el_step> <H reservado>
+    float32[celdas]  C/N0 esperado (dB-Hz)
+    uint32[celdas]   nº de observaciones
+"""
+
+import os
+import time
+import struct
+from array import array
+
+from sky_aggregates import AZ_STEP, EL_STEP, AZ_BINS, EL_BINS, sky_cell
+
+SKYMASK_PATH = os.environ.get("GNSSAI_SKYMASK", "/var/tmp/gnssai_site.skymask")
+
+MAGIC = b"GNSM"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHH")
+N_CELLS = AZ_BINS * EL_BINS
+_LITTLE = array("I", [1]).tobytes() == b"\x01\x00\x00\x00"
+
+MIN_SAMPLES = 30          # observaciones antes de fiarse de una celda
+ALPHA_MIN = 0.02          # memoria de ~50 observaciones una vez madura
+LOS_CN0 = 38.0            # C/N0 esperado de una celda despejada
+NLOS_CN0 = 30.0           # por debajo: celda tapada (solo llegan reflejos)
+RESIDUAL_MULTIPATH = -4.0 # dB respecto a lo esperado
+RESIDUAL_NLOS = -9.0
+
+_CLASS_UNKNOWN = 0
+_CLASSES = (None, "los", "multipath", "nlos")
+
+
+class SkyMask:
+    """C/N0 esperado por celda y clase precalculada para consulta O(1)."""
+
+    def __init__(self, path=SKYMASK_PATH):
+        self.path = path
+        self.expected = array("f", bytes(4 * N_CELLS))
+        self.count = array("I", bytes(4 * N_CELLS))
+        self.cell_class = bytearray(N_CELLS)   # índice en _CLASSES
+        self.updates = 0
+        self.lookups = 0
+        self.hits = 0
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+    @classmethod
+    def load(cls, path=SKYMASK_PATH):
+        """Carga la máscara del emplazamiento (vacía si no existe o no cuadra)."""
+        mask = cls(path)
+        try:
+            with open(path, "rb") as f:
+                head = f.read(HEADER.size)
+                magic, version, az_step, el_step, _ = HEADER.unpack(head)
+                if magic != MAGIC or version != VERSION or (az_step, el_step) != (AZ_STEP, EL_STEP):
+                    print(f"⚠️  Máscara de cielo incompatible, se empieza de cero: {path}")
+                    return mask
+                expected = array("f")
+                count = array("I")
+                expected.fromfile(f, N_CELLS)
+                count.fromfile(f, N_CELLS)
+        except (OSError, EOFError, struct.error):
+            return mask
+
+        if not _LITTLE:
+            expected.byteswap()
+            count.byteswap()
+        mask.expected = expected
+        mask.count = count
+        for cell in range(N_CELLS):
+            mask._classify_cell(cell)
+        return mask
+
+    def save(self):
+        """Escritura atómica (tmp + rename): un corte de luz no la corrompe."""
+        if self.path is None:
+            return False   # máscara solo en memoria (reproducción, pruebas)
+        expected, count = self.expected, self.count
+        if not _LITTLE:
+            expected, count = array("f", expected), array("I", count)
+            expected.byteswap()
+            count.byteswap()
+        tmp = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, AZ_STEP, EL_STEP, 0))
+                expected.tofile(f)
+                count.tofile(f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️  Error guardando máscara de cielo: {e}")
+            return False
+        self._dirty = False
+        self._last_save = time.monotonic()
+        return True
+
+    def maybe_save(self, interval=60.0):
+        if self._dirty and time.monotonic() - self._last_save >= interval:
+            return self.save()
+        return False
+
+    # ------------------------------------------------------------------
+    # Aprendizaje y consulta
+    # ------------------------------------------------------------------
+    def _classify_cell(self, cell):
+        if self.count[cell] < MIN_SAMPLES:
+            self.cell_class[cell] = _CLASS_UNKNOWN
+        elif self.expected[cell] >= LOS_CN0:
+            self.cell_class[cell] = 1
+        elif self.expected[cell] >= NLOS_CN0:
+            self.cell_class[cell] = 2
+        else:
+            self.cell_class[cell] = 3
+
+    def observe(self, azimuth, elevation, snr):
+        """Añade una observación C/N0 (snr <= 0 = no seguido, se ignora)."""
+        if not snr or snr <= 0:
+            return
+        cell = sky_cell(azimuth, elevation)
+        n = self.count[cell] + 1
+        self.count[cell] = n
+        alpha = 1.0 / n if n * ALPHA_MIN < 1.0 else ALPHA_MIN
+        self.expected[cell] += alpha * (snr - self.expected[cell])
+        self._classify_cell(cell)
+        self.updates += 1
+        self._dirty = True
+
+    def expected_cn0(self, azimuth, elevation):
+        """C/N0 esperado en la celda o None si aún no hay muestras suficientes."""
+        cell = sky_cell(azimuth, elevation)
+        if self.count[cell] < MIN_SAMPLES:
+            return None
+        return self.expected[cell]
+
+    def lookup(self, azimuth, elevation, snr):
+        """
+        Clase por tabla ("los" | "multipath" | "nlos") o None si la celda no
+        está madura. Una señal muy por debajo de lo esperado baja de clase.
+        """
+        self.lookups += 1
+        cell = sky_cell(azimuth, elevation)
+        cls = self.cell_class[cell]
+        if cls == _CLASS_UNKNOWN:
+            return None
+        self.hits += 1
+        residual = snr - self.expected[cell]
+        if residual < RESIDUAL_NLOS:
+            cls = 3
+        elif residual < RESIDUAL_MULTIPATH and cls == 1:
+            cls = 2
+        return _CLASSES[cls]
+
+    def get_stats(self):
+        mature = sum(1 for c in self.cell_class if c)
+        return {
+            "path": self.path,
+            "cells": N_CELLS,
+            "mature_cells": mature,
+            "coverage_pct": round(100.0 * mature / N_CELLS, 1),
+            "updates": self.updates,
+            "lookups": self.lookups,
+            "hit_rate_pct": round(100.0 * self.hits / self.lookups, 1) if self.lookups else 0.0,
+        }
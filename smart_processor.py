@@ -5,46 +5,178 @@ GNSS.AI Smart Processor v3.3
 - Envía TODO por FIFO (/tmp/gnssai_smart) para Bluetooth
 - Actualiza JSON para dashboard (/tmp/gnssai_dashboard_data.json)
 - Integra ML (si el clasificador está disponible)
-- Esqueleto para TILT (pitch/roll/heading) listo para K222/K922
+- TILT real del K222/K922 ($xxHPR, $xxTRA, $PTNL,AVR): anillo + paso bajo,
+  decimado a la tasa del dashboard (GNSSAI_DASHBOARD_HZ) y del FIFO
+  (GNSSAI_TILT_FIFO_HZ, 0 = todas)
+- Compensación de inclinación: posición de la punta del bastón por época
+  (GNSSAI_POLE_HEIGHT) en el JSON y opcionalmente en NMEA (GNSSAI_TILT_NMEA)
+- Promediado de puntos (Welford ENU) controlado desde el dashboard por el
+  canal de control (socket UNIX, control_channel.py)
+- Modelo de fix completo GGA+RMC+GST+GSA (fix_model.py): coordenadas
+  exactas, separación geoide, edad diferencial, estación, DOPs y precisión
+  real a partir de las sigmas de GST
+- Demux NMEA + RTCM3 en la UART: RTCM se reenvía intacto al FIFO
+- Correcciones NTRIP -> UART con escritor priorizado (RTK) + subida de GGA
+- Grabación/reproducción de la UART cruda (GNSSAI_RECORD / GNSSAI_REPLAY)
+- Latencia por etapa (HDR) en el JSON; on/off en caliente con SIGUSR1
+- Histórico de series temporales (HDOP, calidad, SNR...) para /api/history
+- Máscara de cielo aprendida por emplazamiento (GNSSAI_SKYMASK): NLOS por tabla
+- Configuración del receptor en vivo desde el panel K922 (receiver_config.py):
+  comandos por lotes por el escritor de la UART, confirmaciones y tasas
+  de salida por mensaje
+- Baudios autodetectados y cambio negociado a 460800/921600 al arrancar
+  (uart_link.py); throughput, ocupación y mensajes perdidos en el JSON
+- Salida del receptor podada según los consumidores activos (output_demand.py,
+  GNSSAI_OUTPUT_PRUNING=1, desactivada por defecto): solo las sentencias y
+  tasas que alguien usa
+- Satélites por (sistema, PRN) con C/N0 por banda (satellite_table.py):
+  GSV multiseñal NMEA 4.11 sin colisiones de PRN entre constelaciones
+- Log estructurado no bloqueante (gnssai_log.py): cola + hilo escritor y
+  límite por tipo de evento; un stdout atascado no frena la UART
+- Archivo continuo de NMEA/RTCM validados (raw_archive.py, GNSSAI_ARCHIVE):
+  segmentos rotados y comprimidos con índice por minuto, en segundo plano
+- Arranque en caliente (state_checkpoint.py, GNSSAI_CHECKPOINT): posición,
+  fix, estadísticas, satélites y estado del clasificador en un checkpoint
+  periódico que se restaura al arrancar
+- Arranque rápido (lazy_init.py): NumPy, geodesia y clasificador ML se cargan
+  en segundo plano tras abrir UART y FIFO; marcas de arranque en el JSON
 """
 
 import os
 import time
+
+_T_PROCESS = time.monotonic()
+
 import json
 import signal
 import errno
+import struct
+import zlib
 
 from datetime import datetime
 import serial  # pyserial
 
-# ML opcional (probamos 2 nombres de módulo)
-ML_AVAILABLE = False
-GNSSClassifier = None
-try:
-    from gnss_ml_classifier import GNSS_ML_Classifier as GNSSClassifier
-    ML_AVAILABLE = True
-except ImportError:
-    try:
-        from ml_classifier import GNSS_ML_Classifier as GNSSClassifier
-        ML_AVAILABLE = True
-    except ImportError:
-        print("⚠️  ML Classifier no disponible, continuaré sin ML.")
-        ML_AVAILABLE = False
+from rtcm3 import StreamDemuxer, KIND_RTCM, rtcm3_message_type
+from uart_writer import UARTWriter
+from ntrip_client import NTRIPClient
+from uart_replay import ReplaySerial, UARTRecorder
+from latency_metrics import StageMetrics
+from history_store import HistoryWriter
+from sky_mask import SkyMask
+from attitude import AttitudeFilter, is_attitude_sentence, parse_attitude
+from control_channel import ControlServer
+from fix_model import FixModel, QUALITY_LABELS
+from uart_link import LinkMonitor, autodetect_baud, negotiate_baud
+from output_demand import DemandTracker, DEFAULT_TTL, sentence_type
+from receiver_config import ReceiverConfigurator, OutputRateMeter
+from gnssai_log import get_logger, log_stats
+from raw_archive import RawArchive
+from state_checkpoint import (
+    Checkpointer, CLASSIFIER_MAX_AGE, pack_json, unpack_json, pack_bytes, unpack_bytes,
+)
+from satellite_table import SatelliteTable, SYSTEMS, NBANDS, L1
+from lazy_init import Deferred, StartupTimer
+
+# Geodesia vectorizada (NumPy) para la compensación del bastón y el
+# promediado de puntos: se importa en segundo plano (None hasta entonces)
+geodesy = None
+
+
+def _load_geodesy():
+    global geodesy
+    import geodesy as module
+    from point_averaging import PointAveragingEngine
+    geodesy = module
+    return PointAveragingEngine()
+
+
+def _load_classifier(sky_mask=None):
+    """
+    SignalClassifier (ml_classifier.py) sobre la máscara del procesador; no
+    aprende de ella: parse_nmea_gsv ya la alimenta con cada GSV.
+    """
+    from ml_classifier import SignalClassifier
+    return SignalClassifier(model_type="hybrid", sky_mask=sky_mask, learn_mask=False)
+
+
+log = get_logger("processor")
+startup = StartupTimer(_T_PROCESS)
+startup.mark("imports")
+
+# Clasificación ML como mucho una vez por segundo (GGA a 5-20 Hz)
+CLASSIFY_INTERVAL = 1.0
 
 
 class SmartProcessor:
-    def __init__(self):
+    def __init__(self, state_dir=None):
+        """
+        state_dir: directorio aislado (benchmark, pruebas) para JSON, FIFO,
+        histórico y máscara de cielo; sin checkpoint ni archivo crudo. None
+        = rutas de producción.
+        """
         # Configuración básica
+        self.state_dir = state_dir
         self.uart_port = "/dev/serial0"
-        self.uart_baud = 115200
+        # Baudios: autodetección + cambio negociado al arrancar (uart_link.py)
+        self.uart_baud = int(os.environ.get("GNSSAI_UART_BAUD", "115200"))
+        self.autobaud = os.environ.get("GNSSAI_UART_AUTOBAUD", "1") != "0"
+        self.target_baud = int(os.environ.get("GNSSAI_UART_TARGET_BAUD", "460800"))
         self.fifo_path = "/tmp/gnssai_smart"
         self.json_path = "/tmp/gnssai_dashboard_data.json"
+        if state_dir:
+            self.fifo_path = os.path.join(state_dir, "gnssai_smart")
+            self.json_path = os.path.join(state_dir, "dashboard.json")
+
+        # Record & replay de la UART (logs .gnraw, ver uart_replay.py)
+        self.record_path = os.environ.get("GNSSAI_RECORD", "")
+        self.replay_path = os.environ.get("GNSSAI_REPLAY", "")
+        self.replay_speed = float(os.environ.get("GNSSAI_REPLAY_SPEED", "1"))
+
+        # Archivo comprimido de lo validado (GNSSAI_ARCHIVE=directorio)
+        self.archive = None
+        try:
+            self.archive = None if state_dir else RawArchive.from_env()
+        except (OSError, ValueError, RuntimeError) as e:
+            log.warning("archive_disabled", f"⚠️  Archivo crudo deshabilitado: {e}")
+
+        # Checkpoint de arranque en caliente (no al reproducir logs)
+        self.checkpoint = None if self.replay_path or state_dir else Checkpointer.from_env()
+        self.warm_start = None      # datos restaurados, hasta el primer GGA en vivo
+
+        # Correcciones NTRIP (se activan con NTRIP_HOST + NTRIP_MOUNT)
+        self.ntrip_config = {
+            "host": os.environ.get("NTRIP_HOST", ""),
+            "port": int(os.environ.get("NTRIP_PORT", "2101")),
+            "mountpoint": os.environ.get("NTRIP_MOUNT", ""),
+            "user": os.environ.get("NTRIP_USER", ""),
+            "password": os.environ.get("NTRIP_PASS", ""),
+            "gga_interval": float(os.environ.get("NTRIP_GGA_INTERVAL", "10")),
+        }
 
         # Estado
         self.uart = None
         self.fifo_fd = None
         self.running = True
         self.output_counter = 0
+        self.demux = StreamDemuxer()
+        self.writer = None
+        self.link = LinkMonitor(self.uart_baud)
+
+        # Instrumentación de latencia (GNSSAI_METRICS=1 o SIGUSR1)
+        self.metrics = StageMetrics(enabled=os.environ.get("GNSSAI_METRICS") == "1")
+        self._t_arrival = None
+
+        # Histórico (anillos memory-mapped + rollups 1s/1m/1h)
+        self.history = None
+        try:
+            if state_dir:
+                self.history = HistoryWriter(os.path.join(state_dir, "history"))
+            else:
+                self.history = HistoryWriter()
+        except OSError as e:
+            log.warning("history_disabled", f"⚠️  Histórico deshabilitado: {e}")
+        self.ntrip_client = None
+        self.last_gga = None
 
         # Estadísticas GNSS
         self.stats = {
@@ -53,6 +185,8 @@ class SmartProcessor:
             "hdop": 0.0,
             "nmea_sent": 0,
             "rtcm_sent": 0,
+            "rtcm_types": {},
+            "rtcm_crc_errors": 0,
             "ml_corrections": 0,
             "format_switches": 0,
             "ml_los": 0,
@@ -61,6 +195,9 @@ class SmartProcessor:
             "avg_confidence": 0.0,
         }
 
+        # Modelo completo del fix (GGA+RMC+GST+GSA)
+        self.fix = FixModel()
+
         # Posición
         self.position = {
             "lat": 0.0,
@@ -68,10 +205,64 @@ class SmartProcessor:
             "alt": 0.0,
         }
 
-        # Satélites (para ML / skyplot)
-        self.satellites_detail = {}
+        # Satélites (para ML / skyplot): columnas por (sistema, PRN) y banda
+        self.sat_table = SatelliteTable()
+
+        # Máscara de cielo del emplazamiento (C/N0 esperado por celda az × el).
+        # Reproducción: máscara vacía en memoria; el log puede ser de otro
+        # emplazamiento y no debe aprender sobre la de este ni guardarse
+        if state_dir:
+            self.sky_mask = SkyMask(os.path.join(state_dir, "site.skymask"))
+        else:
+            self.sky_mask = SkyMask(None) if self.replay_path else SkyMask.load()
+
+        # Tasa de publicación: JSON del dashboard y actitud reenviada al FIFO
+        self.dashboard_interval = 1.0 / float(os.environ.get("GNSSAI_DASHBOARD_HZ", "2"))
+        tilt_fifo_hz = float(os.environ.get("GNSSAI_TILT_FIFO_HZ", "10"))
+        self.tilt_fifo_interval = 1.0 / tilt_fifo_hz if tilt_fifo_hz > 0 else 0.0
+        self._t_json = 0.0
+        self._t_tilt_fifo = 0.0
+
+        # TILT: actitud de la IMU filtrada y decimada (ver attitude.py)
+        self.attitude = AttitudeFilter(
+            tau=float(os.environ.get("GNSSAI_TILT_TAU", "0.2")),
+            publish_hz=1.0 / self.dashboard_interval,
+        )
+        # Bastón: longitud punta -> centro de fase (altura + offset ARP->APC)
+        self.pole_length = (
+            float(os.environ.get("GNSSAI_POLE_HEIGHT", "2.0"))
+            + float(os.environ.get("GNSSAI_ANTENNA_APC", "0.0"))
+        )
+        # Salida NMEA de la punta: off | gga (reescribe GGA) | ptip ($PGNAI,TIP extra)
+        self.tilt_nmea = os.environ.get("GNSSAI_TILT_NMEA", "off").lower()
+        self.pole_tip = None
+
+        # Promediado de puntos + canal de órdenes desde el dashboard
+        self.points = None      # PointAveragingEngine, cuando cargue la geodesia
+        self.control = ControlServer()
+        self.control.register("point_start", self._cmd_point_start)
+        self.control.register("point_stop", self._cmd_point_stop)
+        self.control.register("point_status", self._cmd_point_status)
+
+        # Configuración del receptor en vivo (panel K922, ver receiver_config.py)
+        self.receiver = None
+        self.output_rates = OutputRateMeter()
+        self.control.register("receiver_apply", self._cmd_receiver_apply)
+        self.control.register("receiver_status", self._cmd_receiver_status)
+
+        # Salida del receptor según la demanda de los consumidores activos
+        # (opt-in: un consumidor externo sin registrar perdería sus sentencias)
+        self.output_pruning = (
+            os.environ.get("GNSSAI_OUTPUT_PRUNING", "0") == "1" and not self.replay_path
+        )
+        self.demand = DemandTracker(full_rate=float(os.environ.get("GNSSAI_NMEA_RATE", "1")))
+        self._t_demand = 0.0
+        self.control.register("consumer_register", self._cmd_consumer_register)
+        self.control.register("consumer_release", self._cmd_consumer_release)
+        self.control.register("demand_status", self._cmd_demand_status)
+        self.control.register("demand_resume", self._cmd_demand_resume)
+        self.control.register("link_status", self._cmd_link_status)
 
-        # TILT (esqueleto – se ajusta cuando se conozca la sentencia real)
         self.tilt = {
             "pitch": 0.0,    # +adelante / -atrás
             "roll": 0.0,     # +derecha / -izquierda
@@ -80,27 +271,75 @@ class SmartProcessor:
             "status": "NONE",
         }
 
-        # ML
-        self.ml_enabled = ML_AVAILABLE
+        # ML y geodesia: carga diferida (start_deferred, tras abrir UART y FIFO)
+        self.ml_enabled = False
         self.classifier = None
-        if self.ml_enabled and GNSSClassifier is not None:
-            try:
-                print("🧠 Inicializando clasificador ML...")
-                self.classifier = GNSSClassifier(model="hybrid")
-                print("   ✅ ML listo.")
-            except Exception as e:
-                print(f"⚠️  Error iniciando ML: {e}")
-                self.ml_enabled = False
+        self._classifier_state = None   # estado del checkpoint a la espera del ML
+        self._ml_loader = Deferred("ml", lambda: _load_classifier(self.sky_mask),
+                                   self._on_classifier, self._on_classifier_error)
+        self._t_classify = 0.0
+        # Reproducción a máxima velocidad: cada época, no una por segundo de reloj
+        self.classify_interval = 0.0 if self.replay_path else CLASSIFY_INTERVAL
+        self._geodesy_loader = Deferred("geodesy", _load_geodesy,
+                                        self._on_geodesy, self._on_geodesy_error)
 
         # Signal handlers
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
+        signal.signal(signal.SIGUSR1, self.toggle_metrics)
+
+    # ---------------------- Carga diferida ---------------------- #
+    def start_deferred(self):
+        """NumPy/geodesia y clasificador ML en segundo plano: el NMEA no espera."""
+        self._geodesy_loader.start()
+        self._ml_loader.start()
+
+    def load_deferred(self):
+        """Carga síncrona (benchmark y herramientas que no usan run())."""
+        self._geodesy_loader.load()
+        self._ml_loader.load()
+
+    def _on_geodesy(self, points):
+        self.points = points
+        startup.mark("geodesy_ready")
+        log.info("geodesy_ready", "📐 Geodesia y promediado listos")
+
+    def _on_geodesy_error(self, error):
+        log.warning("geodesy_unavailable", f"⚠️  Geodesia no disponible (falta NumPy): {error}")
+
+    def _on_classifier(self, classifier):
+        # El estado restaurado se aplica antes de publicar el clasificador
+        state, self._classifier_state = self._classifier_state, None
+        if state is not None and hasattr(classifier, "set_state"):
+            try:
+                classifier.set_state(unpack_json(state))
+            except (ValueError, KeyError, TypeError, zlib.error) as e:
+                log.warning("checkpoint_section", f"⚠️  Sección CLSF del checkpoint descartada: {e}")
+        self.classifier = classifier
+        self.ml_enabled = True
+        startup.mark("ml_ready")
+        log.info("ml_ready", "🧠 Clasificador ML listo")
+
+    def _on_classifier_error(self, error):
+        log.warning("ml_unavailable", f"⚠️  ML Classifier no disponible, continuaré sin ML: {error}")
+
+    def startup_report(self):
+        return {
+            "marks_ms": startup.snapshot(),
+            "geodesy": self._geodesy_loader.status(),
+            "ml": self._ml_loader.status(),
+        }
 
     # ---------------------- Señales ---------------------- #
     def signal_handler(self, signum, frame):
-        print("\n⚠️  Señal recibida, deteniendo SmartProcessor...")
+        log.warning("signal", "⚠️  Señal recibida, deteniendo SmartProcessor...", signum=signum)
         self.running = False
 
+    def toggle_metrics(self, signum=None, frame=None):
+        """SIGUSR1: activa/desactiva la instrumentación de latencia."""
+        enabled = self.metrics.toggle()
+        log.info("metrics_toggle", f"⏱️  Métricas de latencia {'ON' if enabled else 'OFF'}")
+
     # ---------------------- FIFO ---------------------- #
     def _open_fifo_for_write(self):
         """Intenta abrir el FIFO en modo escritura no bloqueante."""
@@ -109,28 +348,28 @@ class SmartProcessor:
 
         try:
             self.fifo_fd = os.open(self.fifo_path, os.O_WRONLY | os.O_NONBLOCK)
-            print(f"   🔁 FIFO ahora abierto para escritura (fd={self.fifo_fd})")
+            log.info("fifo_open", f"   🔁 FIFO ahora abierto para escritura (fd={self.fifo_fd})")
         except OSError as e:
             if e.errno in (errno.ENXIO, errno.ENOENT):
                 # ENXIO => aún no hay lector
                 # ENOENT => FIFO no existe (lo creamos en setup_fifo)
                 self.fifo_fd = None
             else:
-                print(f"   ⚠️  Error abriendo FIFO: {e}")
+                log.warning("fifo_open_error", f"   ⚠️  Error abriendo FIFO: {e}", errno=e.errno)
                 self.fifo_fd = None
 
     def setup_fifo(self):
         """Prepara el FIFO /tmp/gnssai_smart SIN borrarlo si ya existe."""
-        print(f"📂 FIFO objetivo: {self.fifo_path}")
+        log.info("fifo_setup", f"📂 FIFO objetivo: {self.fifo_path}")
 
         if not os.path.exists(self.fifo_path):
             try:
                 os.mkfifo(self.fifo_path, 0o666)
-                print("   ✅ FIFO creado (modo 666)")
+                log.info("fifo_setup", "   ✅ FIFO creado (modo 666)")
             except FileExistsError:
-                print("   ℹ️ FIFO ya existía.")
+                log.info("fifo_setup", "   ℹ️ FIFO ya existía.")
         else:
-            print("   ℹ️ FIFO ya existía, reutilizando.")
+            log.info("fifo_setup", "   ℹ️ FIFO ya existía, reutilizando.")
 
         # Intentar ajustar permisos
         try:
@@ -141,27 +380,99 @@ class SmartProcessor:
 
         self._open_fifo_for_write()
         if self.fifo_fd is None:
-            print("   ⚠️  FIFO sin lector todavía (ENXIO). Reintentaré más adelante.")
+            log.info("fifo_no_reader", "   ⚠️  FIFO sin lector todavía (ENXIO). Reintentaré más adelante.")
 
     # ---------------------- UART ---------------------- #
     def connect_uart(self):
-        print(f"🔌 UART {self.uart_port} @ {self.uart_baud}...")
-        self.uart = serial.Serial(
-            self.uart_port,
-            self.uart_baud,
-            timeout=1
-        )
-        print("   ✅ UART abierto")
-
-    # ---------------------- Salida + JSON ---------------------- #
-    def write_output(self, data: str):
-        """Escribe NMEA al FIFO y actualiza JSON cada cierto número de mensajes."""
-        if not data:
+        if self.replay_path:
+            log.info("uart_replay", f"▶️  Reproduciendo {self.replay_path} a {self.replay_speed or 'máx'}×...")
+            self.uart = ReplaySerial(self.replay_path, speed=self.replay_speed)
+        else:
+            log.info("uart_open", f"🔌 UART {self.uart_port} @ {self.uart_baud}...")
+            self.uart = serial.Serial(
+                self.uart_port,
+                self.uart_baud,
+                timeout=1
+            )
+            log.info("uart_open", "   ✅ UART abierto")
+            self.setup_baud()
+
+        if self.record_path:
+            log.info("uart_record", f"   ⏺️  Grabando UART cruda en {self.record_path}")
+            self.uart = UARTRecorder(self.uart, self.record_path)
+
+        # Escritor priorizado: correcciones/comandos sin frenar la lectura
+        self.writer = UARTWriter(self.uart)
+        self.writer.start()
+        self.receiver = ReceiverConfigurator(self.writer.submit, on_baud=self.switch_baud)
+
+    def setup_baud(self):
+        """Autodetecta la velocidad del receptor y negocia la de trabajo."""
+        baud = self.uart_baud
+        if self.autobaud:
+            log.info("autobaud", "🔎 Autodetectando baudios...")
+            detected = autodetect_baud(self.uart, first=self.uart_baud)
+            if detected is None:
+                log.warning("autobaud_failed", f"   ⚠️  Sin NMEA válido a ninguna velocidad; sigo a {self.uart_baud}")
+                self.uart.baudrate = self.uart_baud
+                return
+            baud = detected
+            log.info("autobaud", f"   ✅ Receptor a {baud} baudios", baud=baud)
+
+        if self.target_baud and self.target_baud != baud:
+            log.info("baud_negotiate", f"⏫ Negociando {baud} -> {self.target_baud}...")
+            achieved = negotiate_baud(self.uart, baud, self.target_baud)
+            if achieved == self.target_baud:
+                log.info("baud_negotiate", f"   ✅ Enlace a {achieved} baudios", baud=achieved)
+            else:
+                log.warning("baud_rejected", f"   ⚠️  El receptor no aceptó {self.target_baud}; sigo a {achieved}")
+            baud = achieved
+        self.uart_baud = baud
+        self.link.set_baud(baud)
+
+    def switch_baud(self, baud):
+        """El receptor ya cambió su COM1: se cambia nuestro lado sin cerrar el puerto."""
+        self.uart_baud = baud
+        self.link.set_baud(baud)
+        if self.replay_path:
+            return
+        try:
+            self.uart.baudrate = baud
+            log.info("baud_switch", f"🔁 UART a {baud} baudios", baud=baud)
+        except (AttributeError, OSError, ValueError) as e:
+            log.error("baud_switch_error", f"⚠️  No se pudo cambiar la UART a {baud}: {e}")
+
+    # ---------------------- Correcciones NTRIP ---------------------- #
+    def start_corrections(self):
+        """Arranca el cliente NTRIP si hay caster configurado."""
+        cfg = self.ntrip_config
+        if not cfg["host"] or not cfg["mountpoint"]:
             return
+        log.info("ntrip_start", f"📡 NTRIP {cfg['host']}:{cfg['port']}/{cfg['mountpoint']} "
+                 f"(GGA cada {cfg['gga_interval']:g}s)")
+        self.ntrip_client = NTRIPClient(
+            cfg["host"],
+            cfg["port"],
+            cfg["mountpoint"],
+            cfg["user"],
+            cfg["password"],
+            on_data=self.inject_corrections,
+            gga_provider=lambda: self.last_gga,
+            gga_interval=cfg["gga_interval"],
+        )
+        self.ntrip_client.start()
 
-        if isinstance(data, bytes):
-            data = data.decode("ascii", errors="ignore")
+    def inject_corrections(self, data: bytes):
+        """Encola correcciones RTCM hacia el receptor con prioridad máxima."""
+        if self.writer is not None:
+            self.writer.send_rtcm(data)
 
+    # ---------------------- Salida + JSON ---------------------- #
+    def _write_fifo(self, payload):
+        """
+        Escribe bytes (o memoryview) al FIFO, reabriéndolo si hace falta.
+        True si se escribió; False si se descartó (sin lector, EAGAIN...).
+        """
         # 1) Intentar abrir FIFO si aún no está listo
         if self.fifo_fd is None:
             self._open_fifo_for_write()
@@ -169,28 +480,61 @@ class SmartProcessor:
         # 2) Enviar al FIFO
         if self.fifo_fd is not None:
             try:
-                os.write(self.fifo_fd, data.encode("utf-8"))
+                os.write(self.fifo_fd, payload)
+                return True
             except OSError as e:
                 if e.errno in (errno.EPIPE, errno.ENXIO):
-                    print("   ⚠️  Lector FIFO desconectado (EPIPE/ENXIO), se reabrirá más adelante.")
+                    log.warning("fifo_reader_gone", "   ⚠️  Lector FIFO desconectado (EPIPE/ENXIO), se reabrirá más adelante.")
                     try:
                         os.close(self.fifo_fd)
                     except Exception:
                         pass
                     self.fifo_fd = None
                 else:
-                    print(f"   ⚠️  Error escribiendo FIFO: {e}")
+                    log.warning("fifo_write_error", f"   ⚠️  Error escribiendo FIFO: {e}", errno=e.errno)
+        return False
+
+    def write_output(self, data: str, marks=None):
+        """
+        Escribe NMEA al FIFO y actualiza JSON cada cierto número de mensajes.
+
+        marks: (t_llegada_ns, t_parseado_ns) si las métricas están activas.
+        """
+        if not data:
+            return
+
+        if isinstance(data, bytes):
+            data = data.decode("ascii", errors="ignore")
+
+        self._write_fifo(data.encode("utf-8"))
+
+        if marks is not None:
+            t_fifo = time.monotonic_ns()
+            self.metrics.record_ns("fifo", marks[1], t_fifo)
+            self.metrics.record_ns("end_to_end", marks[0], t_fifo)
 
         # 3) Contador de NMEA
         self.output_counter += 1
         self.stats["nmea_sent"] = self.output_counter
 
-        # 4) Actualizar JSON cada 20 frases
-        if self.output_counter % 20 == 0:
+        # 4) Actualizar JSON a la tasa del dashboard (no por nº de frases:
+        #    con la IMU a 50 Hz eso multiplicaba las escrituras)
+        now = time.monotonic()
+        if now - self._t_json >= self.dashboard_interval:
+            self._t_json = now
             self.update_dashboard_json()
 
+    def forward_rtcm(self, frame):
+        """Reenvía una trama RTCM3 ya validada (CRC-24Q) al FIFO, sin tocarla."""
+        self._write_fifo(frame)
+        if self.archive is not None:
+            self.archive.add_rtcm(frame)
+        self.stats["rtcm_sent"] += 1
+        self.output_rates.add(f"RTCM{rtcm3_message_type(frame)}", len(frame))
+
     def update_dashboard_json(self):
         """Genera /tmp/gnssai_dashboard_data.json para el dashboard."""
+        t_start = time.monotonic_ns() if self.metrics.enabled else 0
         quality = self.stats["quality"]
         if quality == 4:
             rtk_status = "RTK_FIXED"
@@ -214,7 +558,13 @@ class SmartProcessor:
             except Exception:
                 pass
 
-        # Snapshot de satélites (por si quieres skyplot futuro)
+        # Contadores RTCM3 por tipo de mensaje (desde el demux)
+        self.stats["rtcm_types"] = {
+            str(k): v for k, v in sorted(self.demux.rtcm_types.items())
+        }
+        self.stats["rtcm_crc_errors"] = self.demux.stats["rtcm_crc_errors"]
+
+        # Snapshot de satélites (una sola lista; el dashboard la compacta por cliente)
         satellites_view = self.get_satellite_snapshot()
 
         dashboard_data = {
@@ -225,115 +575,90 @@ class SmartProcessor:
             },
             "satellites": self.stats["satellites"],
             "satellites_detail": satellites_view,
-            "satellites_view": satellites_view,
             "quality": quality,
             "hdop": self.stats["hdop"],
             "nmea_sent": self.stats["nmea_sent"],
             "rtcm_sent": self.stats["rtcm_sent"],
+            "rtcm_types": self.stats["rtcm_types"],
+            "rtcm_crc_errors": self.stats["rtcm_crc_errors"],
             "ml_corrections": self.stats["ml_corrections"],
             "format_switches": self.stats["format_switches"],
             "los_sats": self.stats["ml_los"],
             "multipath_sats": self.stats["ml_multipath"],
             "nlos_sats": self.stats["ml_nlos"],
             "avg_confidence": self.stats["avg_confidence"],
-            "estimated_accuracy": self.estimate_accuracy(quality, self.stats["hdop"]),
+            "estimated_accuracy": self.estimated_accuracy_cm(),
+            "fix": self.fix.snapshot(),
             "rtk_status": rtk_status,
-            "format": "NMEA",
+            "format": "NMEA+RTCM3" if self.stats["rtcm_sent"] else "NMEA",
+            "corrections": self.get_corrections_status(),
+            "latency": self.metrics.snapshot(),
+            "sky_mask": self.sky_mask.get_stats() if self.sky_mask is not None else None,
             "last_update": time.time(),
-            "tilt": {
-                "pitch": self.tilt["pitch"],
-                "roll": self.tilt["roll"],
-                "heading": self.tilt["heading"],
-                "angle": self.tilt["angle"],
-                "status": self.tilt["status"],
-            },
+            "tilt": dict(self.tilt),
+            "pole_tip": self.pole_tip,
+            "point_session": self.points.status() if self.points is not None else None,
+            "receiver_output": self.output_rates.snapshot(),
+            "uart_link": self.link.snapshot(self.demux.stats),
+            "output_demand": self.demand_report(),
+            "log": log_stats(),
+            "archive": self.archive.snapshot() if self.archive is not None else None,
+            "warm_start": self.warm_start,
+            "checkpoint": self.checkpoint.snapshot() if self.checkpoint is not None else None,
+            "startup": self.startup_report(),
         }
 
         try:
+            # json.dumps compacto usa el codificador en C (dump + indent no)
+            body = json.dumps(dashboard_data, separators=(",", ":"))
             with open(self.json_path, "w") as f:
-                json.dump(dashboard_data, f, indent=2)
+                f.write(body)
         except Exception as e:
-            print(f"⚠️  Error escribiendo JSON: {e}")
-
-    @staticmethod
-    def estimate_accuracy(quality, hdop):
-        """Estimación burda de precisión (cm)."""
-        if quality == 4:
-            return 2.0
-        elif quality == 5:
-            return 20.0
-        elif quality == 2:
-            return 50.0
-        elif quality == 1:
-            return min(hdop * 100, 1000) if hdop < 10 else 1000
-        else:
-            return 0.0
+            log.error("json_write_error", f"⚠️  Error escribiendo JSON: {e}")
+
+        if t_start and self.metrics.enabled:
+            t_done = time.monotonic_ns()
+            self.metrics.record_ns("json", t_start, t_done)
+            if self._t_arrival is not None:
+                self.metrics.record_ns("publish", self._t_arrival, t_done)
+
+    def get_corrections_status(self):
+        """Estado de la entrada de correcciones (NTRIP -> UART)."""
+        status = {"source": "none"}
+        if self.ntrip_client is not None:
+            status["source"] = "ntrip"
+            status["ntrip"] = self.ntrip_client.get_stats()
+        if self.writer is not None:
+            status["uart_writer"] = self.writer.get_stats()
+        return status
+
+    def estimated_accuracy_cm(self):
+        """Precisión horizontal (cm): sigmas de GST o, sin GST, calidad/HDOP."""
+        horizontal, _, _ = self.fix.accuracy()
+        return round(horizontal * 100.0, 1) if horizontal is not None else 0.0
 
     # ---------------------- Parseo NMEA básicos ---------------------- #
-    def parse_nmea_gga(self, line: str):
-        """Parsea GGA para posición, sats, calidad, HDOP."""
-        try:
-            parts = line.split(",")
-            if len(parts) < 15:
-                return
-
-            # Lat/Lon
-            if parts[2] and parts[4]:
-                lat = self.parse_coordinate(parts[2], parts[3])
-                lon = self.parse_coordinate(parts[4], parts[5])
-                self.position["lat"] = lat
-                self.position["lon"] = lon
-
-            # Altura
-            if parts[9]:
-                self.position["alt"] = float(parts[9])
-
-            # Quality
-            if parts[6]:
-                self.stats["quality"] = int(parts[6])
-
-            # Satélites
-            if parts[7]:
-                self.stats["satellites"] = int(parts[7])
-
-            # HDOP
-            if parts[8]:
-                self.stats["hdop"] = float(parts[8])
-
-        except (ValueError, IndexError):
-            pass
-
-    @staticmethod
-    def parse_coordinate(coord: str, direction: str) -> float:
-        """Convierte DDMM.MMMM o DDDMM.MMMM a decimal."""
-        try:
-            if not coord or not direction:
-                return 0.0
-            dot_pos = coord.index(".")
-            degrees = float(coord[: dot_pos - 2])
-            minutes = float(coord[dot_pos - 2 :])
-            decimal = degrees + (minutes / 60.0)
-            if direction in ("S", "W"):
-                decimal = -decimal
-            return decimal
-        except Exception:
-            return 0.0
+    def parse_nmea_gga(self, line: str, parts=None):
+        """GGA -> FixModel y los campos de siempre (posición, sats, calidad, HDOP)."""
+        if parts is None:
+            parts = line.split("*", 1)[0].split(",")
+        fix = self.fix
+        if not fix.parse_gga(parts):
+            return
+        self.position["lat"] = fix.lat
+        self.position["lon"] = fix.lon
+        self.position["alt"] = fix.alt
+        self.stats["quality"] = fix.quality
+        self.stats["satellites"] = fix.sats_used
+        self.stats["hdop"] = fix.hdop
 
     # ---------------------- Satélites/GSV para ML ---------------------- #
-    @staticmethod
-    def guess_constellation(line: str) -> str:
-        talker = line[1:3].upper()
-        return {
-            "GP": "GPS",
-            "GL": "GLONASS",
-            "GA": "Galileo",
-            "GB": "BeiDou",
-            "BD": "BeiDou",
-            "GN": "Multi GNSS",
-        }.get(talker, "GNSS")
-
-    @staticmethod
-    def classify_satellite(elevation: float, snr: float) -> str:
+    def classify_satellite(self, elevation: float, snr: float, azimuth=None) -> str:
+        # Celda madura de la máscara: la clase es una consulta de tabla
+        if azimuth is not None and self.sky_mask is not None:
+            status = self.sky_mask.lookup(azimuth, elevation, snr)
+            if status is not None:
+                return status
         if snr >= 38 and elevation >= 15:
             return "los"
         if snr >= 25:
@@ -341,132 +666,425 @@ class SmartProcessor:
         return "nlos"
 
     def parse_nmea_gsv(self, line: str):
-        parts = line.split(",")
+        parts = line.split("*", 1)[0].split(",")
         if len(parts) < 4:
             return
 
-        constellation = self.guess_constellation(line)
-        now = time.time()
-
         try:
             sats_in_view = int(parts[3]) if parts[3] else 0
             if sats_in_view:
                 self.stats["satellites"] = max(self.stats["satellites"], sats_in_view)
-        except (ValueError, IndexError):
+        except ValueError:
             pass
 
-        for idx in range(4):
-            base = 4 + idx * 4
-            if base + 3 >= len(parts):
-                break
-            raw_prn = parts[base]
-            if not raw_prn:
-                continue
-            prn = raw_prn.split("*")[0]
-            if not prn:
+        table = self.sat_table
+        now = time.time()
+        if not table.update_gsv(parts, now):
+            return
+
+        cn0 = table.cn0
+        for k in range(table.n_updated):
+            slot = table.updated[k]
+            band = table.updated_band[k]
+            # Clase y máscara sobre el C/N0 primario (L1); las otras bandas
+            # solo clasifican satélites que no se siguen en L1
+            if band != L1 and table.band_cn0(slot, L1, now):
                 continue
+            elevation = table.elevation[slot]
+            azimuth = table.azimuth[slot]
+            snr = cn0[slot * NBANDS + band]
 
-            try:
-                elevation = float(parts[base + 1]) if parts[base + 1] else 0.0
-            except (ValueError, IndexError):
-                elevation = 0.0
-            try:
-                azimuth = float(parts[base + 2]) if parts[base + 2] else 0.0
-            except (ValueError, IndexError):
-                azimuth = 0.0
-            try:
-                snr_field = parts[base + 3] if len(parts) > base + 3 else ""
-                snr = float(snr_field.split("*")[0]) if snr_field else 0.0
-            except ValueError:
-                snr = 0.0
-
-            status = self.classify_satellite(elevation, snr)
-            self.satellites_detail[prn] = {
-                "prn": prn,
-                "constellation": constellation,
-                "elevation": elevation,
-                "azimuth": azimuth,
-                "snr": snr,
-                "status": status,
-                "timestamp": now,
-            }
+            # Primero se clasifica contra lo aprendido, luego se aprende
+            table.set_status(slot, self.classify_satellite(elevation, snr, azimuth))
+            if self.sky_mask is not None and band == L1:
+                self.sky_mask.observe(azimuth, elevation, snr)
 
-    def get_satellite_snapshot(self):
-        now = time.time()
-        los = multipath = nlos = 0
-        snapshot = []
-        stale = []
+    def classify_epoch(self, now=None):
+        """
+        Una clasificación ML por época (GGA, máx. CLASSIFY_INTERVAL): todos
+        los satélites con señal a la vez, no una vez por sentencia GSV (las
+        tendencias por satélite recibirían la misma muestra varias veces).
+        Devuelve True si se ha clasificado (para la etapa "classify").
+        """
+        if not (self.ml_enabled and self.classifier):
+            return False
+        now = now or time.time()
+        if now - self._t_classify < self.classify_interval:
+            return False
+        table = self.sat_table
+        sats = table.classifier_input(now)
+        if not sats:
+            return False
+        self._t_classify = now
+        try:
+            results = self.classifier.classify_signals(sats)
+        except Exception as e:
+            log.error("ml_error", f"⚠️  Error en clasificación ML: {e}")
+            return False
+        for sat_id, result in results.items():
+            slot = sats[sat_id]["slot"]
+            status = result["class"].lower()
+            if status != sats[sat_id]["status"]:
+                self.stats["ml_corrections"] += 1
+            table.set_status(slot, status)
+        return True
+
+    def record_history(self):
+        """Añade un punto por época (GGA) a las series del histórico."""
+        if self.history is None:
+            return
+        values = {
+            "hdop": self.stats["hdop"],
+            "quality": self.stats["quality"],
+            "satellites": self.stats["satellites"],
+            "alt": self.position["alt"],
+        }
+        if self.fix.gst_fresh(time.time()):
+            values["sigma_h"], values["sigma_v"] = self.fix.accuracy()[:2]
 
-        for prn, sat in self.satellites_detail.items():
-            if now - sat.get("timestamp", 0) > 60:
-                stale.append(prn)
+        now = time.time()
+        table = self.sat_table
+        snr_sum = snr_n = 0
+        per_const = {}
+        for slot in table.active(now, 5):
+            snr = table.primary_cn0(slot, now)
+            if snr <= 0:
                 continue
-            status = sat.get("status", "los")
-            if status == "los":
-                los += 1
-            elif status == "multipath":
-                multipath += 1
-            else:
-                nlos += 1
-            snapshot.append({k: v for k, v in sat.items() if k != "timestamp"})
+            snr_sum += snr
+            snr_n += 1
+            acc = per_const.setdefault(SYSTEMS[table.system[slot]], [0.0, 0])
+            acc[0] += snr
+            acc[1] += 1
+        if snr_n:
+            values["snr_mean"] = snr_sum / snr_n
+        for constellation, (total, n) in per_const.items():
+            values[f"snr_{constellation}"] = total / n
 
-        for prn in stale:
-            self.satellites_detail.pop(prn, None)
+        try:
+            self.history.append_many(values, now)
+        except Exception as e:
+            log.error("history_write_error", f"⚠️  Error escribiendo histórico: {e}")
+            self.history = None
+
+    def get_satellite_snapshot(self):
+        snapshot = self.sat_table.snapshot(time.time())
 
         if not self.ml_enabled:
+            los = multipath = nlos = 0
+            for sat in snapshot:
+                status = sat["status"]
+                if status == "los":
+                    los += 1
+                elif status == "multipath":
+                    multipath += 1
+                else:
+                    nlos += 1
             self.stats["ml_los"] = los
             self.stats["ml_multipath"] = multipath
             self.stats["ml_nlos"] = nlos
 
-        def sort_key(item):
+        return snapshot
+
+    # ---------------------- Arranque en caliente ---------------------- #
+    def checkpoint_sections(self):
+        fix = self.fix
+        meta = {
+            "position": self.position,
+            "stats": self.stats,
+            "fix": {name: getattr(fix, name) for name in FixModel.__slots__},
+            "tilt": self.tilt,
+            "last_gga": self.last_gga,
+        }
+        sections = {
+            "META": pack_json(meta),
+            "SATT": pack_bytes(self.sat_table.dump()),
+        }
+        if self.classifier is not None and hasattr(self.classifier, "get_state"):
+            sections["CLSF"] = pack_json(self.classifier.get_state())
+        elif self._classifier_state is not None:
+            # ML aún cargando: se conserva el estado restaurado tal cual
+            sections["CLSF"] = self._classifier_state
+        return sections
+
+    def save_checkpoint(self):
+        try:
+            sections = self.checkpoint_sections()
+        except (TypeError, ValueError) as e:
+            log.error("checkpoint_error", f"⚠️  Checkpoint no serializable: {e}")
+            return False
+        if not self.checkpoint.save(sections):
+            log.warning("checkpoint_error", f"⚠️  Error escribiendo checkpoint {self.checkpoint.path}")
+            return False
+        return True
+
+    def _restore_meta(self, blob):
+        meta = unpack_json(blob)
+        self.position.update(meta["position"])
+        for key, value in meta["stats"].items():
+            if key in self.stats:
+                self.stats[key] = value
+        for name, value in meta["fix"].items():
+            if name in FixModel.__slots__:
+                setattr(self.fix, name, value)
+        self.tilt.update(meta.get("tilt") or {})
+        # NTRIP: el caster recibe la última posición antes del primer GGA
+        self.last_gga = meta.get("last_gga")
+
+    def _restore_classifier(self, blob):
+        if self.classifier is None:
+            # Se restaura al terminar la carga diferida (_on_classifier)
+            zlib.decompress(blob)
+            self._classifier_state = blob
+        elif hasattr(self.classifier, "set_state"):
+            self.classifier.set_state(unpack_json(blob))
+
+    def restore_checkpoint(self):
+        """Restaura el último checkpoint (si es reciente). True si se usó algo."""
+        result = self.checkpoint.load()
+        if result is None:
+            return False
+        written, sections = result
+        age = time.time() - written
+        restorers = {
+            "META": self._restore_meta,
+            "SATT": lambda blob: self.sat_table.restore(unpack_bytes(blob)),
+        }
+        if age <= CLASSIFIER_MAX_AGE:
+            restorers["CLSF"] = self._restore_classifier
+
+        restored = []
+        for tag, restore in restorers.items():
+            if tag not in sections:
+                continue
             try:
-                return int(str(item.get("prn", 0)))
-            except (ValueError, TypeError):
-                return 0
+                restore(sections[tag])
+                restored.append(tag)
+            except (ValueError, KeyError, TypeError, zlib.error, struct.error) as e:
+                log.warning("checkpoint_section", f"⚠️  Sección {tag} del checkpoint descartada: {e}")
+        if not restored:
+            return False
+        self.warm_start = {"restored_from": written, "age_s": round(age, 1), "sections": restored}
+        log.info("warm_start", f"♻️  Estado restaurado de hace {age:.0f} s ({', '.join(restored)})",
+                 satellites=len(self.sat_table))
+        return True
+
+    # ---------------------- Promediado de puntos ---------------------- #
+    def feed_point_session(self):
+        """Época GGA -> sesión activa (punta del bastón si la hay)."""
+        if self.points is None or self.points.session is None:
+            return
+        pos = self.pole_tip or self.position
+        self.points.add_epoch(pos["lat"], pos["lon"], pos["alt"], self.stats["quality"])
+
+    def _require_points(self):
+        if self.points is None:
+            if self._geodesy_loader.status()["state"] in ("pending", "loading"):
+                raise RuntimeError("promediado aún cargando, reintenta en unos segundos")
+            raise RuntimeError("promediado no disponible (falta NumPy)")
+
+    def _cmd_point_start(self, msg):
+        self._require_points()
+        quality = msg.get("accept_quality") or [4]
+        result = self.points.start(
+            name=str(msg.get("name", "")),
+            accept_quality=tuple(int(q) for q in quality),
+            outlier_sigma=float(msg.get("outlier_sigma", 4.0)),
+            target_epochs=int(msg.get("target_epochs", 0)),
+        )
+        log.info("point_start", f"📍 Promediado iniciado: {result['name']}")
+        return {"session": result}
+
+    def _cmd_point_stop(self, msg):
+        self._require_points()
+        result = self.points.stop(save=msg.get("save", True))
+        if result:
+            log.info("point_stop", f"📍 Punto {result['name']}: {result['epochs']} épocas")
+        return {"session": result}
+
+    def _cmd_point_status(self, msg):
+        self._require_points()
+        return {"session": self.points.status()}
+
+    # ---------------------- Configuración del receptor ---------------------- #
+    def _cmd_receiver_apply(self, msg):
+        if self.receiver is None:
+            raise RuntimeError("UART no conectada")
+        config = msg.get("config")
+        job = self.receiver.apply(config, current_baud=self.uart_baud)
+        # Configuración manual: la poda automática se suspende hasta demand_resume
+        self.demand.paused = True
+        self.demand.applied = None
+        log.info("receiver_apply", f"🛠️  Configuración #{job['id']}: {len(job['commands'])} comandos al receptor")
+        return {"job": job}
+
+    def _cmd_receiver_status(self, msg):
+        return {
+            "status": self.receiver_status(),
+            "receiver": self.receiver.status() if self.receiver is not None else None,
+        }
 
-        snapshot.sort(key=sort_key)
-        return snapshot
+    def _cmd_consumer_register(self, msg):
+        name = str(msg.get("name", ""))
+        self.demand.set_consumer(name, True, msg.get("sentences"), float(msg.get("ttl", DEFAULT_TTL)))
+        return {"consumers": self.demand.active()}
+
+    def _cmd_consumer_release(self, msg):
+        self.demand.set_consumer(str(msg.get("name", "")), False)
+        return {"consumers": self.demand.active()}
 
-    # ---------------------- TILT (esqueleto) ---------------------- #
-    def parse_tilt_sentence(self, line: str):
+    def _cmd_demand_status(self, msg):
+        return {"demand": self.demand_report()}
+
+    def _cmd_demand_resume(self, msg):
+        self.demand.paused = False
+        return {"demand": self.demand_report()}
+
+    def _cmd_link_status(self, msg):
+        # El colector pregunta los baudios antes de probar un puerto que es nuestro
+        return {"link": self.link.snapshot(self.demux.stats)}
+
+    def demand_report(self):
+        return self.demand.report(self.output_rates.byte_rates, self.link.bytes_per_s)
+
+    def update_demand(self):
+        """Consumidores internos + reconfiguración de la salida (1 Hz)."""
+        now = time.monotonic()
+        if now - self._t_demand < 1.0:
+            return
+        self._t_demand = now
+        demand = self.demand
+        demand.set_consumer("processor", True)
+        demand.set_consumer("sky_mask", self.sky_mask is not None)
+        # El clasificador mantiene su GSV también mientras carga: si no, la
+        # primera poda lo dejaría sin datos al quedar listo
+        demand.set_consumer("classifier", self._ml_loader.error is None)
+        demand.set_consumer(
+            "tilt", self.tilt_nmea != "off" or (self.points is not None and self.points.session is not None)
+        )
+        # Lector del FIFO presente = cliente Bluetooth conectado
+        demand.set_consumer("fifo", self.fifo_fd is not None)
+
+        if not self.output_pruning or self.receiver is None or self.receiver.busy:
+            return
+        rates = self.output_rates.rates
+        if rates.get("GPGGA") and not rates.get("GNGGA"):
+            demand.talker = "GP"
+        streaming = {sentence_type(k) for k, r in rates.items() if r > 0}
+        streaming.discard(None)
+        change = demand.poll(streaming, now)
+        if change is None:
+            return
+        commands, desired = change
+        self.receiver.submit(commands, demand.expected_rates(desired), "demand", now)
+        demand.mark_applied(desired, baseline=self.link.bytes_per_s or None)
+        log.info("output_demand", f"✂️  Salida del receptor por demanda ({', '.join(demand.active())}): "
+                 f"{', '.join(f'{k}@{v:g}Hz' for k, v in sorted(desired.items()))}")
+
+    def receiver_status(self):
+        """Estado en el formato k922Status del panel (app.js)."""
+        fix = self.fix
+        has_fix = self.stats["quality"] > 0
+        has_attitude = self.attitude.samples > 0
+        return {
+            "mode": self.receiver.mode if self.receiver is not None else None,
+            "satsUsed": fix.sats_used,
+            "solution": QUALITY_LABELS.get(fix.quality, str(fix.quality)),
+            "lat": self.position["lat"] if has_fix else None,
+            "lon": self.position["lon"] if has_fix else None,
+            "hEllipsoidal": fix.ellipsoidal_height if has_fix else None,
+            "velocity": fix.speed_ms if has_fix else None,
+            "heading": self.tilt["heading"] if has_attitude else None,
+            "pitch": self.tilt["pitch"] if has_attitude else None,
+            "roll": self.tilt["roll"] if has_attitude else None,
+            "baud": self.uart_baud,
+            "output": self.output_rates.snapshot(),
+        }
+
+    # ---------------------- TILT ---------------------- #
+    def update_pole_tip(self, line: str, parts) -> str:
+        """
+        Punta del bastón para la época del GGA. Devuelve la(s) sentencia(s) a
+        reenviar: el GGA original, el GGA de la punta o GGA + $PGNAI,TIP.
         """
-        PARSEO DE TILT (ESQUELETO):
+        if geodesy is None or self.stats["quality"] == 0:
+            self.pole_tip = None
+            return line
+
+        sep = self.fix.geoid_sep
+        compensated = self.attitude.is_valid()
+        if compensated:
+            heading, pitch, roll = self.attitude.heading, self.attitude.pitch, self.attitude.roll
+        else:
+            # Sin actitud válida: bastón supuesto vertical
+            heading = pitch = roll = 0.0
+
+        lat, lon = self.position["lat"], self.position["lon"]
+        h_ell = self.position["alt"] + sep
+        tip_lat, tip_lon, tip_h, (de, dn, du) = geodesy.pole_tip(
+            lat, lon, h_ell, heading, pitch, roll, self.pole_length
+        )
+        self.pole_tip = {
+            "lat": float(tip_lat),
+            "lon": float(tip_lon),
+            "alt": round(float(tip_h) - sep, 4),
+            "offset_enu": [round(float(de), 4), round(float(dn), 4), round(float(du), 4)],
+            "pole_length": self.pole_length,
+            "compensated": compensated,
+        }
 
-        Aquí debes adaptar el formato a la sentencia REAL que emita tu K222/K922.
-        Ejemplos típicos en módulos GNSS+INS:
-          - Sentencias propietarias tipo $PSTI,030,ROLL,PITCH,HEADING,...
-          - O mensajes ASCII de INS/ATTITUDE.
+        if self.tilt_nmea == "off" or len(parts) < 15:
+            return line
+
+        lat_s, lat_h = geodesy.nmea_coordinate(tip_lat, True)
+        lon_s, lon_h = geodesy.nmea_coordinate(tip_lon, False)
+        alt_s = f"{self.pole_tip['alt']:.4f}"
+        if self.tilt_nmea == "gga":
+            out = parts[:]
+            out[2:6] = [lat_s, lat_h, lon_s, lon_h]
+            out[9] = alt_s
+            return geodesy.nmea_sentence(",".join(out)[1:]).rstrip()
+
+        tip = geodesy.nmea_sentence(
+            f"PGNAI,TIP,{parts[1]},{lat_s},{lat_h},{lon_s},{lon_h},{alt_s},M,"
+            f"{self.tilt['angle']:.2f},{self.tilt['heading']:.2f},{int(compensated)}"
+        )
+        return line + "\r\n" + tip.rstrip()
 
-        PASOS:
-        1. En el Pi:   sudo cat /dev/serial0 | grep -i 'sti'   (o 'tilt' / 'ins')
-        2. Identifica la sentencia que lleve roll/pitch/heading.
-        3. Ajusta el parsing abajo.
+    def parse_tilt_sentence(self, line: str) -> bool:
         """
-        if not line.startswith("$"):
-            return
+        Sentencia de actitud (HPR/TRA/AVR) -> filtro. Devuelve True si la
+        sentencia debe reenviarse al FIFO (decimada a GNSSAI_TILT_FIFO_HZ).
+        """
+        att = parse_attitude(line)
+        if att is None:
+            return True
 
-        # EJEMPLO FICTICIO: $PSTI,030,roll,pitch,heading,tilt_flag,...
-        if line.startswith("$PSTI,030"):
-            parts = line.split(",")
-            try:
-                roll = float(parts[2])
-                pitch = float(parts[3])
-                heading = float(parts[4])
-            except (ValueError, IndexError):
-                return
+        now = time.monotonic()
+        if self.attitude.update(att, now):
+            # Solo a la tasa del dashboard se copia al dict que va al JSON
+            self.tilt.update(self.attitude.snapshot())
 
-            self.tilt["roll"] = roll
-            self.tilt["pitch"] = pitch
-            self.tilt["heading"] = heading
-            self.tilt["angle"] = (abs(roll) ** 2 + abs(pitch) ** 2) ** 0.5
-            self.tilt["status"] = "OK"
+        if now - self._t_tilt_fifo >= self.tilt_fifo_interval:
+            self._t_tilt_fifo = now
+            return True
+        return False
 
     # ---------------------- Loop de procesado ---------------------- #
     def process_nmea_line(self, line: str):
+        metrics = self.metrics if self.metrics.enabled else None
+        if metrics is not None:
+            t_arrival = self._t_arrival or time.monotonic_ns()
+
         line = line.strip()
         if not line or not line.startswith("$"):
             return
 
+        # Respuestas a comandos de configuración: no son NMEA, no van al FIFO
+        if line.startswith("$command,"):
+            if self.receiver is not None:
+                self.receiver.on_response(line)
+            return
+
         # Chequeo checksum NMEA
         if "*" in line:
             try:
@@ -475,90 +1093,206 @@ class SmartProcessor:
                 for ch in data[1:]:
                     calc ^= ord(ch)
                 if f"{calc:02X}" != checksum.upper():
+                    self.link.checksum_errors += 1
                     return
             except Exception:
                 pass
 
-        # GGA
-        if "GGA" in line:
-            self.parse_nmea_gga(line)
-
-        # GSV => satélites + ML
-        if "GSV" in line:
+        self.output_rates.add(line[1:line.find(",")], len(line) + 2)
+        if self.archive is not None:
+            self.archive.add_nmea(line)
+
+        # Un solo split por sentencia de fix; despacho por tipo (xxGGA -> "GGA")
+        kind = line[3:6]
+        classify_ns = 0
+        if kind == "GGA":
+            parts = line.split("*", 1)[0].split(",")
+            self.parse_nmea_gga(line, parts)
+            self.warm_start = None
+            self.link.on_epoch(parts[1])
+            self.last_gga = line
+            line = self.update_pole_tip(line, parts)
+            self.feed_point_session()
+            self.record_history()
+            if metrics is not None:
+                t_ml = time.monotonic_ns()
+                if self.classify_epoch():
+                    t_ml_done = time.monotonic_ns()
+                    classify_ns = t_ml_done - t_ml
+                    metrics.record_ns("classify", t_ml, t_ml_done)
+            else:
+                self.classify_epoch()
+            if self.sky_mask is not None:
+                self.sky_mask.maybe_save()
+        elif kind == "RMC":
+            self.fix.parse_rmc(line.split("*", 1)[0].split(","))
+        elif kind == "GST":
+            self.fix.parse_gst(line.split("*", 1)[0].split(","))
+        elif kind == "GSA":
+            self.fix.parse_gsa(line.split("*", 1)[0].split(","))
+
+        # GSV => satélites
+        is_gsv = kind == "GSV"
+        if is_gsv:
             self.parse_nmea_gsv(line)
-            if self.ml_enabled and self.classifier:
+
+        # TILT (prefijo barato antes de parsear)
+        forward = True
+        if is_attitude_sentence(line):
+            forward = self.parse_tilt_sentence(line)
+
+        if metrics is not None:
+            # El ML de la época se mide en "classify", no en "parse"
+            t_parse = time.monotonic_ns()
+            metrics.record_ns("parse", t_arrival + classify_ns, t_parse)
+
+        # Enviar NMEA a FIFO (la actitud sobrante ya se filtró y decimó)
+        if not forward:
+            return
+        if metrics is not None:
+            self.write_output(line + "\r\n", (t_arrival, t_parse))
+        else:
+            self.write_output(line + "\r\n")
+
+    def process_bytes(self, data, t_arrival=None):
+        """Procesa un bloque crudo de la UART (NMEA y RTCM3 mezclados)."""
+        self._t_arrival = t_arrival
+        for kind, frame in self.demux.feed(data):
+            if kind == KIND_RTCM:
+                self.forward_rtcm(frame)
+            else:
                 try:
-                    result = self.classifier.process_gsv(line)
-                    if result:
-                        self.stats["ml_corrections"] += 1
+                    self.process_nmea_line(str(frame, "ascii", "ignore"))
                 except Exception:
                     pass
 
-        # TILT
-        self.parse_tilt_sentence(line)
-
-        # Enviar NMEA a FIFO
-        self.write_output(line + "\r\n")
-
     def run(self):
-        print("============================================================")
-        print("🛰️  GNSS.AI Smart Processor v3.3 (TILT + ML + sats)")
-        print("============================================================")
+        log.info("startup", "🛰️  GNSS.AI Smart Processor v3.3 (TILT + ML + sats)")
+
+        if self.checkpoint is not None and self.restore_checkpoint():
+            # El dashboard tiene posición y cielo antes de la primera época
+            self.update_dashboard_json()
 
         self.setup_fifo()
+        startup.mark("fifo_ready")
         self.connect_uart()
+        startup.mark("uart_open")
+        # Lo pesado después de abrir UART y FIFO: el NMEA no espera a NumPy.
+        # Reproducción: carga síncrona, el resultado no depende de quién llegue antes
+        if self.replay_path:
+            self.load_deferred()
+        else:
+            self.start_deferred()
+        self.start_corrections()
+        try:
+            self.control.start()
+            log.info("control", f"🎛️  Canal de control: {self.control.path}")
+        except OSError as e:
+            log.warning("control_disabled", f"⚠️  Canal de control deshabilitado: {e}")
 
-        print("🚀 Procesando NMEA desde UART y enviando a FIFO+JSON...")
+        log.info("startup", "🚀 Procesando NMEA+RTCM3 desde UART y enviando a FIFO+JSON...")
         last_stats = time.time()
+        first_sentence = False
 
         try:
             while self.running:
-                if self.uart.in_waiting:
-                    raw = self.uart.readline()
-                    try:
-                        line = raw.decode("ascii", errors="ignore")
-                        self.process_nmea_line(line)
-                    except Exception:
-                        pass
+                waiting = self.uart.in_waiting
+                if waiting:
+                    raw = self.uart.read(waiting)
+                    self.link.on_read(len(raw))
+                    t_arrival = time.monotonic_ns() if self.metrics.enabled else None
+                    self.process_bytes(raw, t_arrival)
+                    if not first_sentence and self.output_counter:
+                        first_sentence = True
+                        startup.mark("first_sentence")
+                        log.info("first_sentence", f"⚡ Primera sentencia reenviada a los "
+                                 f"{startup.marks['first_sentence']:.0f} ms del arranque",
+                                 **startup.snapshot())
+                elif getattr(self.uart, "eof", False):
+                    log.info("replay_end", "⏹️  Fin de la reproducción.")
+                    break
 
                 now = time.time()
                 if now - last_stats > 30:
-                    print(
+                    log.info(
+                        "stats",
                         f"📊 Sats={self.stats['satellites']} "
                         f"Q={self.stats['quality']} "
                         f"HDOP={self.stats['hdop']} "
                         f"NMEA_out={self.stats['nmea_sent']} "
+                        f"RTCM_out={self.stats['rtcm_sent']} "
                         f"TILT={self.tilt['angle']:.1f}° "
                         f"ML: LOS={self.stats['ml_los']} "
                         f"MP={self.stats['ml_multipath']} "
                         f"NLOS={self.stats['ml_nlos']}"
                     )
+                    link = self.link.snapshot()
+                    log.info(
+                        "uart_link",
+                        f"🔌 UART {link['baud']} bd: {link['bytes_per_s']:.0f} B/s "
+                        f"({link['utilization'] * 100:.0f}%) "
+                        f"checksum={link['checksum_errors']} "
+                        f"épocas perdidas={link['missing_epochs']}"
+                        + (" ⚠️  SATURADO" if link["saturated"] else "")
+                    )
+                    if self.metrics.enabled:
+                        e2e = self.metrics.histograms["end_to_end"]
+                        log.info(
+                            "latency",
+                            f"⏱️  UART->FIFO p50={e2e.percentile(0.5)}µs "
+                            f"p99={e2e.percentile(0.99)}µs max={e2e.max_us}µs (n={e2e.count})"
+                        )
                     last_stats = now
 
+                self.control.poll()
+                if self.receiver is not None:
+                    self.receiver.poll()
+                self.output_rates.tick()
+                self.link.tick()
+                self.update_demand()
+                if self.checkpoint is not None and self.checkpoint.due():
+                    self.save_checkpoint()
                 time.sleep(0.001)
         except KeyboardInterrupt:
-            print("\n🛑 CTRL+C recibido, saliendo...")
+            log.warning("interrupt", "🛑 CTRL+C recibido, saliendo...")
         finally:
             self.cleanup()
 
     def cleanup(self):
         """Limpiar recursos al detener."""
-        print("\n🧹 Limpiando recursos...")
+        log.info("cleanup", "🧹 Limpiando recursos...")
+        if self.ntrip_client is not None:
+            self.ntrip_client.stop()
+            log.info("ntrip_stop", "   ✅ NTRIP detenido")
+        if self.writer is not None:
+            self.writer.stop()
+        self.control.close()
+        if self.points is not None and self.points.session is not None:
+            self.points.stop()
+        if self.history is not None:
+            self.history.close()
+        if self.checkpoint is not None and self.save_checkpoint():
+            log.info("checkpoint_save", f"   ✅ Estado guardado en {self.checkpoint.path}")
+        if self.archive is not None:
+            self.archive.close()
+            log.info("archive_close", f"   ✅ Archivo crudo cerrado ({self.archive.stats['blocks']} bloques)")
+        if self.sky_mask is not None and self.sky_mask.maybe_save(interval=0):
+            log.info("sky_mask_save", "   ✅ Máscara de cielo guardada")
         try:
             if self.uart and self.uart.is_open:
                 self.uart.close()
-                print("   ✅ UART cerrado")
+                log.info("uart_close", "   ✅ UART cerrado")
         except Exception:
             pass
 
         if self.fifo_fd is not None:
             try:
                 os.close(self.fifo_fd)
-                print("   ✅ FIFO cerrado")
+                log.info("fifo_close", "   ✅ FIFO cerrado")
             except Exception:
                 pass
 
-        print("👋 SmartProcessor detenido.")
+        log.info("cleanup", "👋 SmartProcessor detenido.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI State Checkpoint
+- Checkpoint binario compacto del estado en caliente de SmartProcessor
+  (posición, fix, estadísticas, tabla de satélites, último GGA) y de
+  SignalClassifier (históricos por satélite, offsets L1-L5, estadísticas)
+- Arranque en caliente: tras reiniciar el servicio el dashboard muestra la
+  última posición y el cielo desde la primera época, el caster NTRIP
+  recibe un GGA desde el primer segundo y el clasificador conserva las
+  tendencias en vez de esperar 50 muestras por satélite
+- Escritura atómica (tmp + rename) como la máscara de cielo: un corte de
+  luz deja el checkpoint anterior, nunca uno a medias
+- Secciones independientes: una sección dañada o de versión distinta se
+  ignora sin perder las demás
+
+Formato (.ckpt, little endian):
+    cabecera: b"GNCK" <H versión> <H nº secciones> <d epoch de escritura>
+    sección:  <4s etiqueta> <I longitud> + datos
+        META  zlib(JSON)  estado escalar de SmartProcessor
+        SATT  zlib(columnas de SatelliteTable)
+        CLSF  zlib(JSON)  estado de SignalClassifier
+
+Variables de entorno (SmartProcessor):
+    GNSSAI_CHECKPOINT            ruta (/var/tmp/gnssai_state.ckpt; vacío = off)
+    GNSSAI_CHECKPOINT_INTERVAL   segundos entre checkpoints (30)
+"""
+
+import json
+import os
+import struct
+import time
+import zlib
+
+CHECKPOINT_PATH = "/var/tmp/gnssai_state.ckpt"
+
+MAGIC = b"GNCK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHd")
+SECTION = struct.Struct("<4sI")
+
+MAX_AGE = 3600.0            # checkpoints más viejos no se restauran
+CLASSIFIER_MAX_AGE = 300.0  # las tendencias caducan antes (el cielo se mueve)
+
+
+def pack_json(obj):
+    return zlib.compress(json.dumps(obj, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def unpack_json(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def pack_bytes(data):
+    return zlib.compress(data, 6)
+
+
+def unpack_bytes(blob):
+    return zlib.decompress(blob)
+
+
+def save(path, sections, now=None):
+    """{etiqueta: bytes} -> fichero, con escritura atómica. True si se escribió."""
+    tmp = f"{path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(sections), now or time.time()))
+            for tag, data in sections.items():
+                f.write(SECTION.pack(tag.encode("ascii"), len(data)))
+                f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        return False
+    return True
+
+
+def load(path, max_age=MAX_AGE, now=None):
+    """
+    Devuelve (epoch de escritura, {etiqueta: bytes}) o None si no existe,
+    no es un checkpoint de esta versión o es más viejo que max_age.
+    """
+    try:
+        with open(path, "rb") as f:
+            blob = f.read()
+    except OSError:
+        return None
+    try:
+        magic, version, n, written = HEADER.unpack_from(blob, 0)
+    except struct.error:
+        return None
+    if magic != MAGIC or version != VERSION:
+        return None
+    if max_age is not None and (now or time.time()) - written > max_age:
+        return None
+    sections = {}
+    offset = HEADER.size
+    for _ in range(n):
+        try:
+            tag, length = SECTION.unpack_from(blob, offset)
+        except struct.error:
+            break
+        offset += SECTION.size
+        data = blob[offset : offset + length]
+        if len(data) < length:
+            break
+        sections[tag.decode("ascii", "ignore")] = data
+        offset += length
+    return written, sections
+
+
+class Checkpointer:
+    """Checkpoint periódico: decide cuándo toca y cuenta éxitos/fallos."""
+
+    def __init__(self, path, interval=30.0):
+        self.path = path
+        self.interval = interval
+        self.saves = 0
+        self.failures = 0
+        self.last_save = None
+        self.last_bytes = 0
+        self.restored_from = None   # epoch del checkpoint restaurado
+        self._t_last = time.monotonic()
+
+    @classmethod
+    def from_env(cls):
+        path = os.environ.get("GNSSAI_CHECKPOINT", CHECKPOINT_PATH)
+        if not path:
+            return None
+        return cls(path, float(os.environ.get("GNSSAI_CHECKPOINT_INTERVAL", "30")))
+
+    def due(self, now=None):
+        return (now or time.monotonic()) - self._t_last >= self.interval
+
+    def save(self, sections):
+        self._t_last = time.monotonic()
+        if save(self.path, sections):
+            self.saves += 1
+            self.last_save = time.time()
+            self.last_bytes = HEADER.size + sum(SECTION.size + len(d) for d in sections.values())
+            return True
+        self.failures += 1
+        return False
+
+    def load(self, max_age=MAX_AGE):
+        result = load(self.path, max_age)
+        if result is not None:
+            self.restored_from = result[0]
+        return result
+
+    def snapshot(self):
+        return {
+            "path": self.path,
+            "saves": self.saves,
+            "failures": self.failures,
+            "last_save": self.last_save,
+            "bytes": self.last_bytes,
+            "restored_from": self.restored_from,
+        }
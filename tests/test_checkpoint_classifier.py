@@ -0,0 +1,65 @@
+"""La sección CLSF del checkpoint sobrevive a un reinicio de SmartProcessor."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import state_checkpoint
+from gnssai_benchmark import synthetic_epochs
+from smart_processor import SmartProcessor
+
+
+def _processor(tmp_path):
+    proc = SmartProcessor(state_dir=str(tmp_path))
+    # state_dir no lleva checkpoint: aquí es justo lo que se prueba
+    proc.checkpoint = state_checkpoint.Checkpointer(str(tmp_path / "state.ckpt"))
+    proc.fifo_fd = os.open(os.devnull, os.O_WRONLY)
+    return proc
+
+
+def test_classifier_state_round_trip(tmp_path):
+    proc = _processor(tmp_path)
+    proc.load_deferred()
+    assert proc._ml_loader.status()["state"] == "ready"
+    proc.classify_interval = 0.0
+    for epoch in synthetic_epochs(20):
+        for line in epoch:
+            proc.process_nmea_line(line)
+        proc.classify_epoch()
+    state = proc.classifier.get_state()
+    assert state["signal_history"], "el clasificador no recibió satélites"
+    assert proc.save_checkpoint()
+
+    _, sections = state_checkpoint.load(proc.checkpoint.path)
+    assert "CLSF" in sections
+    os.close(proc.fifo_fd)
+
+    # Reinicio: el checkpoint se restaura antes de que cargue el clasificador
+    restarted = _processor(tmp_path)
+    assert restarted.restore_checkpoint()
+    assert "CLSF" in restarted.warm_start["sections"]
+    assert restarted.classifier is None
+    # Mientras carga, un checkpoint nuevo conserva la sección tal cual
+    assert restarted.checkpoint_sections()["CLSF"] == sections["CLSF"]
+
+    restarted.load_deferred()
+    assert restarted.classifier.get_state()["signal_history"] == state["signal_history"]
+    assert restarted.classifier.get_state()["stats"] == state["stats"]
+    os.close(restarted.fifo_fd)
+
+
+def test_classify_stage_measures_ml(tmp_path):
+    proc = _processor(tmp_path)
+    proc.load_deferred()
+    proc.classify_interval = 0.0
+    proc.metrics.enabled = True
+    epochs = synthetic_epochs(10)
+    for epoch in epochs:
+        for line in epoch:
+            proc.process_nmea_line(line)
+    histograms = proc.metrics.histograms
+    # Una muestra por época clasificada, no una vacía por sentencia
+    assert 0 < histograms["classify"].count <= len(epochs)
+    assert histograms["parse"].count == sum(len(epoch) for epoch in epochs)
+    os.close(proc.fifo_fd)
@@ -0,0 +1,31 @@
+"""El colector usa los baudios de SmartProcessor en lugar de probar el puerto."""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gnssai_collector
+
+
+def _status(tmp_path, age, baud=460800):
+    path = tmp_path / "dashboard.json"
+    path.write_text(json.dumps({"last_update": time.time() - age, "uart_link": {"baud": baud}}))
+    return str(path)
+
+
+def test_control_channel_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(gnssai_collector, "send_command",
+                        lambda cmd, **kw: {"ok": True, "link": {"baud": 921600}})
+    assert gnssai_collector.processor_baud(_status(tmp_path, 0)) == 921600
+
+
+def test_status_json_fallback(tmp_path, monkeypatch):
+    monkeypatch.setattr(gnssai_collector, "send_command",
+                        lambda cmd, **kw: {"ok": False, "error": "SmartProcessor no está escuchando"})
+    assert gnssai_collector.processor_baud(_status(tmp_path, 1)) == 460800
+    # JSON viejo: no hay procesador con el puerto, se puede probar
+    assert gnssai_collector.processor_baud(_status(tmp_path, 60)) is None
+    assert gnssai_collector.processor_baud(str(tmp_path / "missing.json")) is None
@@ -0,0 +1,47 @@
+"""StreamDemuxer: resincronización NMEA -> RTCM3 con entrada troceada."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rtcm3 import KIND_NMEA, KIND_RTCM, StreamDemuxer, build_rtcm3_frame
+
+GGA = b"$GNGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47\r\n"
+
+
+def _frame_with_newline():
+    # Mensaje 1005 con un 0x0A en el payload: un '\n' dentro de la trama
+    payload = bytes([0x3E, 0xD0, 0x00, 0x0A]) + bytes(range(16))
+    frame = build_rtcm3_frame(payload)
+    assert b"\n" in frame
+    return frame
+
+
+def _demux(stream, chunk):
+    demux = StreamDemuxer()
+    out = []
+    for i in range(0, len(stream), chunk):
+        for kind, frame in demux.feed(stream[i:i + chunk]):
+            out.append((kind, bytes(frame)))
+    return demux, out
+
+
+def test_truncated_sentence_followed_by_rtcm_frame():
+    frame = _frame_with_newline()
+    truncated = b"$GNGSV,3,1,12,05,40,083,4"   # corte a media sentencia
+    stream = truncated + frame + GGA
+    for chunk in (1, 2, 3, 7, 16, len(stream)):
+        demux, out = _demux(stream, chunk)
+        assert out == [(KIND_RTCM, frame), (KIND_NMEA, GGA[:-2])], chunk
+        assert demux.stats["discarded_bytes"] == len(truncated)
+        assert demux.stats["rtcm_crc_errors"] == 0
+
+
+def test_interleaved_stream_unchanged():
+    frame = _frame_with_newline()
+    stream = GGA + frame + GGA + frame
+    for chunk in (1, 5, 64):
+        demux, out = _demux(stream, chunk)
+        assert [k for k, _ in out] == [KIND_NMEA, KIND_RTCM, KIND_NMEA, KIND_RTCM]
+        assert demux.stats["discarded_bytes"] == 0
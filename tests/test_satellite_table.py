@@ -0,0 +1,35 @@
+"""Tabla de satélites: numeración extendida y GSV con ID de señal."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from satellite_table import GLONASS, GPS, L1, L5, NBANDS, SatelliteTable
+
+
+def _gsv(sentence):
+    return sentence.split("*", 1)[0].split(",")
+
+
+def test_gngsv_extended_prn_is_gps_with_signal_band():
+    table = SatelliteTable()
+    now = 1000.0
+    # GN + ID de señal 8 (GPS L5Q): PRN 5 es GPS y su C/N0 va a L5
+    assert table.update_gsv(_gsv("$GNGSV,1,1,02,05,45,120,40,70,30,200,35,8"), now) == 2
+    gps = table.index[(GPS << 16) | 5]
+    assert table.system[gps] == GPS
+    assert table.updated_band[0] == L5
+    assert table.cn0[gps * NBANDS + L5] == 40
+    assert table.cn0[gps * NBANDS + L1] == 0
+    # PRN 70 es GLONASS 6 (sin banda L5 en GLONASS: L1)
+    glo = table.index[(GLONASS << 16) | 6]
+    assert table.system[glo] == GLONASS
+    assert table.cn0[glo * NBANDS + L1] == 35
+
+
+def test_gsv_with_more_than_four_groups():
+    table = SatelliteTable()
+    groups = ",".join(f"{prn:02d},30,100,40" for prn in range(1, 7))
+    assert table.update_gsv(_gsv(f"$GPGSV,2,1,06,{groups},1"), 1000.0) == 4
+    assert len(table.index) == 4
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI UART Link
+- Autodetección de baudios: se prueba cada velocidad candidata y se acepta
+  la primera con varias sentencias NMEA de checksum válido (o tramas RTCM3
+  con CRC válido) y casi ninguna inválida
+- Negociación al arranque: COM COM1 <objetivo> a la velocidad detectada,
+  cambio local y verificación; si no hay datos válidos se vuelve atrás
+- Monitor del enlace: bytes/s, ocupación respecto a la capacidad (10 bits
+  por byte en 8N1), errores de checksum, bytes descartados por el demux y
+  épocas GGA perdidas (huecos en la hora UTC): lo que el receptor tira en
+  silencio cuando el enlace está saturado
+
+Variables de entorno (SmartProcessor):
+    GNSSAI_UART_BAUD         velocidad inicial a probar (115200)
+    GNSSAI_UART_AUTOBAUD     1 = autodetectar al arrancar (por defecto)
+    GNSSAI_UART_TARGET_BAUD  velocidad a negociar (460800; 0 = no cambiar)
+"""
+
+import time
+
+from rtcm3 import StreamDemuxer, KIND_RTCM
+from gnssai_log import get_logger
+
+CANDIDATE_BAUDS = (115200, 460800, 921600, 230400, 57600, 38400, 19200, 9600)
+
+PROBE_SECONDS = 1.5
+MIN_VALID = 3
+MAX_INVALID_RATIO = 0.2
+SWITCH_SETTLE = 0.3
+SATURATION = 0.85
+
+log = get_logger("uart_link")
+MAX_EPOCH_GAP = 60.0     # huecos mayores: receptor reiniciado, no mensajes perdidos
+
+
+def nmea_checksum_ok(frame) -> bool:
+    """Sentencia NMEA (bytes, sin CRLF) con checksum correcto."""
+    star = frame.rfind(b"*")
+    if star < 1 or len(frame) < star + 3:
+        return False
+    calc = 0
+    for b in frame[1:star]:
+        calc ^= b
+    try:
+        return calc == int(frame[star + 1 : star + 3], 16)
+    except ValueError:
+        return False
+
+
+def probe_baud(uart, baud, duration=PROBE_SECONDS):
+    """
+    Escucha `duration` segundos a `baud`. Devuelve (válidas, inválidas):
+    sentencias NMEA con checksum correcto + tramas RTCM3, y sentencias rotas.
+    """
+    uart.baudrate = baud
+    try:
+        uart.reset_input_buffer()
+    except (AttributeError, OSError):
+        pass
+    demux = StreamDemuxer()
+    valid = invalid = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        data = uart.read(max(1, uart.in_waiting or 1))
+        if not data:
+            continue
+        for kind, frame in demux.feed(data):
+            if kind == KIND_RTCM or nmea_checksum_ok(bytes(frame)):
+                valid += 1
+            else:
+                invalid += 1
+        if valid >= MIN_VALID * 3 and invalid == 0:
+            break
+    # A la velocidad equivocada casi todo es basura que el demux descarta
+    invalid += demux.stats["discarded_bytes"] // 64
+    return valid, invalid
+
+
+def _looks_valid(valid, invalid):
+    return valid >= MIN_VALID and invalid <= valid * MAX_INVALID_RATIO
+
+
+def autodetect_baud(uart, candidates=CANDIDATE_BAUDS, first=None, duration=PROBE_SECONDS):
+    """Primera velocidad candidata con tráfico válido, o None."""
+    order = list(candidates)
+    if first in order:
+        order.remove(first)
+    if first:
+        order.insert(0, first)
+    for baud in order:
+        valid, invalid = probe_baud(uart, baud, duration)
+        log.info("baud_probe", f"   🔎 {baud}: {valid} válidas / {invalid} inválidas",
+                 baud=baud, valid=valid, invalid=invalid)
+        if _looks_valid(valid, invalid):
+            return baud
+    return None
+
+
+def negotiate_baud(uart, current, target, port="COM1", duration=PROBE_SECONDS):
+    """
+    Pide al receptor pasar de `current` a `target` y lo verifica.
+    Devuelve la velocidad a la que queda el enlace.
+    """
+    if target == current:
+        return current
+    uart.baudrate = current
+    uart.write(f"COM {port} {target}\r\n".encode("ascii"))
+    uart.flush()
+    time.sleep(SWITCH_SETTLE)   # la respuesta sale a la velocidad antigua
+
+    valid, invalid = probe_baud(uart, target, duration)
+    if _looks_valid(valid, invalid):
+        return target
+
+    # ¿Rechazó el cambio? Entonces sigue a la velocidad anterior
+    valid, invalid = probe_baud(uart, current, duration)
+    if _looks_valid(valid, invalid):
+        return current
+
+    # Ni una ni otra: se intenta devolverlo a la velocidad conocida
+    uart.baudrate = target
+    uart.write(f"COM {port} {current}\r\n".encode("ascii"))
+    uart.flush()
+    time.sleep(SWITCH_SETTLE)
+    uart.baudrate = current
+    return current
+
+
+def _utc_seconds(utc):
+    """hhmmss.ss -> segundos del día."""
+    if len(utc) < 6:
+        return None
+    try:
+        return int(utc[0:2]) * 3600 + int(utc[2:4]) * 60 + float(utc[4:])
+    except ValueError:
+        return None
+
+
+class LinkMonitor:
+    """Throughput y mensajes perdidos del enlace UART."""
+
+    def __init__(self, baud, window=5.0):
+        self.baud = baud
+        self.window = window
+        self.bytes_in = 0
+        self.reads = 0
+        self.checksum_errors = 0
+        self.epochs = 0
+        self.missing_epochs = 0
+        self.epoch_interval = None
+        self._last_utc = None
+        self._bytes_t0 = 0
+        self._t0 = time.monotonic()
+        self.bytes_per_s = 0.0
+        self.peak_bytes_per_s = 0.0
+
+    def set_baud(self, baud):
+        self.baud = baud
+
+    @property
+    def capacity(self):
+        """Bytes/s máximos en 8N1 (start + 8 datos + stop)."""
+        return self.baud / 10.0 if self.baud else 0.0
+
+    def on_read(self, nbytes):
+        self.bytes_in += nbytes
+        self.reads += 1
+
+    def on_epoch(self, utc):
+        """UTC del GGA: un salto mayor que el intervalo son épocas perdidas."""
+        t = _utc_seconds(utc)
+        if t is None:
+            return
+        last, self._last_utc = self._last_utc, t
+        self.epochs += 1
+        if last is None:
+            return
+        dt = t - last
+        if dt < -43200:
+            dt += 86400.0    # medianoche
+        if dt <= 0 or dt > MAX_EPOCH_GAP:
+            return
+        interval = self.epoch_interval
+        if interval is None or dt < interval * 0.9:
+            # El intervalo configurado es el menor que se ve
+            self.epoch_interval = interval = dt
+        if dt > interval * 1.5:
+            self.missing_epochs += int(round(dt / interval)) - 1
+
+    def tick(self, now=None):
+        now = now or time.monotonic()
+        dt = now - self._t0
+        if dt < self.window:
+            return False
+        self.bytes_per_s = (self.bytes_in - self._bytes_t0) / dt
+        self.peak_bytes_per_s = max(self.peak_bytes_per_s, self.bytes_per_s)
+        self._bytes_t0 = self.bytes_in
+        self._t0 = now
+        return True
+
+    def snapshot(self, demux_stats=None):
+        capacity = self.capacity
+        utilization = self.bytes_per_s / capacity if capacity else 0.0
+        out = {
+            "baud": self.baud,
+            "bytes_in": self.bytes_in,
+            "bytes_per_s": round(self.bytes_per_s, 1),
+            "peak_bytes_per_s": round(self.peak_bytes_per_s, 1),
+            "utilization": round(utilization, 3),
+            "saturated": utilization >= SATURATION,
+            "checksum_errors": self.checksum_errors,
+            "epochs": self.epochs,
+            "missing_epochs": self.missing_epochs,
+            "epoch_interval_s": round(self.epoch_interval, 3) if self.epoch_interval else None,
+        }
+        if demux_stats is not None:
+            out["discarded_bytes"] = demux_stats.get("discarded_bytes", 0)
+            out["rtcm_crc_errors"] = demux_stats.get("rtcm_crc_errors", 0)
+        return out
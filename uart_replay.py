@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI UART Record & Replay
+- Graba los bytes crudos de la UART con marca de tiempo monotónica
+  en un log binario compacto (.gnraw)
+- Reproduce el log como si fuera el puerto serie (ReplaySerial) o a través
+  de un pseudo-terminal (pty) para procesos externos
+- Velocidad: tiempo real, N× o lo más rápido posible (speed=0)
+- Modo bench: throughput máximo sostenible de SmartProcessor
+
+Formato .gnraw:
+    cabecera: b"GNSSRAW1" + <d epoch_inicio> + <I baudios>
+    registro: <I delta_us desde el registro anterior> <H longitud> + bytes
+"""
+
+import os
+import sys
+import time
+import struct
+import threading
+
+RAW_MAGIC = b"GNSSRAW1"
+HEADER_STRUCT = struct.Struct("<dI")
+RECORD_STRUCT = struct.Struct("<IH")
+MAX_DELTA_US = 0xFFFFFFFF
+MAX_CHUNK = 0xFFFF
+
+
+# =============================================================================
+# GRABACIÓN
+# =============================================================================
+
+class RawLogWriter:
+    """Escritor del log binario .gnraw."""
+
+    def __init__(self, path, baudrate=0):
+        self.path = path
+        self.f = open(path, "wb")
+        self.f.write(RAW_MAGIC + HEADER_STRUCT.pack(time.time(), int(baudrate)))
+        self._last = time.monotonic()
+        self.records = 0
+        self.bytes = 0
+
+    def write(self, data, t=None):
+        if not data:
+            return
+        if t is None:
+            t = time.monotonic()
+        delta_us = int((t - self._last) * 1e6)
+        self._last = t
+
+        # Huecos muy largos: registros vacíos de relleno
+        while delta_us > MAX_DELTA_US:
+            self.f.write(RECORD_STRUCT.pack(MAX_DELTA_US, 0))
+            delta_us -= MAX_DELTA_US
+
+        view = memoryview(data)
+        for start in range(0, len(view), MAX_CHUNK):
+            piece = view[start : start + MAX_CHUNK]
+            self.f.write(RECORD_STRUCT.pack(max(delta_us, 0), len(piece)))
+            self.f.write(piece)
+            delta_us = 0
+            self.records += 1
+        self.bytes += len(view)
+
+    def close(self):
+        if not self.f.closed:
+            self.f.close()
+
+
+class UARTRecorder:
+    """
+    Envoltorio de un serial.Serial que graba todo lo leído.
+
+    Se comporta como el puerto original (in_waiting, read, readline, write...),
+    así que se puede insertar en SmartProcessor o SimpleGNSSCollector sin cambios.
+    """
+
+    def __init__(self, uart, path):
+        self._uart = uart
+        self.log = RawLogWriter(path, getattr(uart, "baudrate", 0))
+
+    def read(self, size=1):
+        data = self._uart.read(size)
+        self.log.write(data)
+        return data
+
+    def readline(self, *args, **kwargs):
+        data = self._uart.readline(*args, **kwargs)
+        self.log.write(data)
+        return data
+
+    def close(self):
+        self.log.close()
+        self._uart.close()
+
+    @property
+    def baudrate(self):
+        return self._uart.baudrate
+
+    @baudrate.setter
+    def baudrate(self, baud):
+        # Cambio de baudios en caliente: al puerto real, no al envoltorio
+        self._uart.baudrate = baud
+
+    def __getattr__(self, name):
+        return getattr(self._uart, name)
+
+
+def read_header(path):
+    """Devuelve (epoch_inicio, baudios) de un log .gnraw."""
+    with open(path, "rb") as f:
+        magic = f.read(len(RAW_MAGIC))
+        if magic != RAW_MAGIC:
+            raise ValueError(f"{path} no es un log GNSSRAW1")
+        return HEADER_STRUCT.unpack(f.read(HEADER_STRUCT.size))
+
+
+def iter_records(path):
+    """Genera (t_offset_segundos, bytes) de un log .gnraw."""
+    read_header(path)
+    with open(path, "rb") as f:
+        f.seek(len(RAW_MAGIC) + HEADER_STRUCT.size)
+        t_us = 0
+        while True:
+            head = f.read(RECORD_STRUCT.size)
+            if len(head) < RECORD_STRUCT.size:
+                return
+            delta_us, length = RECORD_STRUCT.unpack(head)
+            t_us += delta_us
+            data = f.read(length)
+            if len(data) < length:
+                return
+            if data:
+                yield t_us / 1e6, data
+
+
+# =============================================================================
+# REPRODUCCIÓN
+# =============================================================================
+
+class ReplaySerial:
+    """
+    Fuente tipo serial.Serial que reproduce un log .gnraw.
+
+    speed=1.0 tiempo real, speed=N N× más rápido, speed=0 sin esperas.
+    """
+
+    def __init__(self, path, speed=1.0, loop=False, timeout=1.0, chunk_limit=65536):
+        self.path = path
+        self.port = path
+        self.speed = float(speed)
+        self.loop = loop
+        self.timeout = timeout
+        self.chunk_limit = chunk_limit
+        self.baudrate = read_header(path)[1]
+
+        self._records = iter_records(path)
+        self._next = None
+        self._buf = bytearray()
+        self._t0 = None
+        self.eof = False
+        self.is_open = True
+
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def _due(self, t_offset):
+        return self._t0 + t_offset / self.speed
+
+    def _pull(self):
+        now = time.monotonic()
+        if self._t0 is None:
+            self._t0 = now
+        while len(self._buf) < self.chunk_limit:
+            if self._next is None:
+                self._next = next(self._records, None)
+                if self._next is None:
+                    if self.loop:
+                        self._records = iter_records(self.path)
+                        self._t0 = now
+                        continue
+                    self.eof = True
+                    return
+            t_offset, data = self._next
+            if self.speed > 0 and self._due(t_offset) > now:
+                return
+            self._buf += data
+            self._next = None
+
+    def _wait(self, ready):
+        """Espera (hasta timeout) a que ready() sea cierto o se acabe el log."""
+        deadline = time.monotonic() + (self.timeout if self.timeout is not None else 1e9)
+        self._pull()
+        while not ready() and not self.eof:
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            if self._next is not None and self.speed > 0:
+                time.sleep(min(max(self._due(self._next[0]) - now, 0.0), deadline - now, 0.05))
+            self._pull()
+
+    @property
+    def in_waiting(self) -> int:
+        self._pull()
+        return len(self._buf)
+
+    def _take(self, size):
+        data = bytes(self._buf[:size])
+        del self._buf[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def read(self, size=1):
+        self._wait(lambda: len(self._buf) >= size)
+        return self._take(size)
+
+    def readline(self, size=-1):
+        self._wait(lambda: b"\n" in self._buf)
+        nl = self._buf.find(b"\n")
+        end = nl + 1 if nl >= 0 else len(self._buf)
+        if size is not None and size >= 0:
+            end = min(end, size)
+        return self._take(end)
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self._buf.clear()
+
+    def close(self):
+        self.is_open = False
+
+
+def replay_to_pty(path, speed=1.0, loop=False):
+    """
+    Reproduce el log en un pseudo-terminal. Devuelve (ruta_esclavo, hilo).
+
+    La ruta del esclavo se puede abrir con pyserial como si fuera /dev/serial0.
+    """
+    import pty
+    import tty
+
+    master_fd, slave_fd = pty.openpty()
+    tty.setraw(slave_fd)
+    slave_name = os.ttyname(slave_fd)
+
+    def pump():
+        source = ReplaySerial(path, speed=speed, loop=loop, timeout=0.5)
+        try:
+            while not (source.eof and not source.in_waiting):
+                waiting = source.in_waiting
+                if waiting:
+                    os.write(master_fd, source.read(waiting))
+                else:
+                    time.sleep(0.001)
+        except OSError:
+            pass
+
+    thread = threading.Thread(target=pump, name="replay-pty", daemon=True)
+    thread.start()
+    # El esclavo queda abierto para que el pty no se cierre entre lectores
+    return slave_name, thread
+
+
+# =============================================================================
+# BENCH: THROUGHPUT MÁXIMO
+# =============================================================================
+
+def bench_smart_processor(path, speed=0.0):
+    """Pasa el log por SmartProcessor (+ clasificador) y mide sentencias/s."""
+    import shutil
+    import tempfile
+    from gnssai_benchmark import make_processor
+
+    # Histórico, máscara de cielo y JSON en un directorio temporal, sin
+    # checkpoint: el log puede ser de otro emplazamiento
+    tmpdir = tempfile.mkdtemp(prefix="gnssai_replay_bench_")
+    proc = make_processor(tmpdir)
+    source = ReplaySerial(path, speed=speed, timeout=0.1)
+
+    classifier = None
+    try:
+        from ml_classifier import SignalClassifier
+        classifier = SignalClassifier()
+    except Exception:
+        pass
+
+    classified_epochs = 0
+    start = time.perf_counter()
+    while not (source.eof and not source.in_waiting):
+        waiting = source.in_waiting
+        if not waiting:
+            time.sleep(0.0005)
+            continue
+        proc.process_bytes(source.read(waiting))
+        if classifier is not None and len(proc.sat_table):
+            classifier.classify_signals(proc.sat_table.classifier_input())
+            classified_epochs += 1
+    elapsed = time.perf_counter() - start
+
+    os.close(proc.fifo_fd)
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+    demux = proc.demux.stats
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "bytes": source.bytes_read,
+        "nmea_sentences": demux["nmea_frames"],
+        "rtcm_frames": demux["rtcm_frames"],
+        "sentences_per_s": round(demux["nmea_frames"] / elapsed, 1) if elapsed else 0.0,
+        "bytes_per_s": round(source.bytes_read / elapsed, 1) if elapsed else 0.0,
+        "classified_epochs": classified_epochs,
+    }
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def _usage():
+    print("Uso:")
+    print("  uart_replay.py record <salida.gnraw> [segundos] [puerto] [baudios]")
+    print("  uart_replay.py replay <log.gnraw> [speed] [--loop]   (pty)")
+    print("  uart_replay.py bench  <log.gnraw> [speed]")
+
+
+def main(argv):
+    if len(argv) < 3:
+        _usage()
+        return 1
+
+    cmd, path = argv[1], argv[2]
+
+    if cmd == "record":
+        import serial
+
+        seconds = float(argv[3]) if len(argv) > 3 else 0.0
+        port = argv[4] if len(argv) > 4 else "/dev/serial0"
+        baud = int(argv[5]) if len(argv) > 5 else 115200
+        uart = UARTRecorder(serial.Serial(port, baud, timeout=0.1), path)
+        print(f"⏺️  Grabando {port} @ {baud} -> {path} (Ctrl+C para parar)")
+        start = time.monotonic()
+        try:
+            while not seconds or time.monotonic() - start < seconds:
+                waiting = uart.in_waiting
+                if waiting:
+                    uart.read(waiting)
+                else:
+                    time.sleep(0.002)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            uart.close()
+        print(f"💾 {uart.log.records} registros, {uart.log.bytes} bytes")
+        return 0
+
+    if cmd == "replay":
+        speed = float(argv[3]) if len(argv) > 3 and not argv[3].startswith("--") else 1.0
+        slave, thread = replay_to_pty(path, speed=speed, loop="--loop" in argv)
+        print(f"▶️  Reproduciendo {path} a {speed or 'máx'}× en {slave}")
+        print(f"   Ej.: python3 gnssai_collector.py 300 urban {slave}")
+        try:
+            while thread.is_alive():
+                thread.join(0.5)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if cmd == "bench":
+        speed = float(argv[3]) if len(argv) > 3 else 0.0
+        result = bench_smart_processor(path, speed)
+        print("📈 Replay bench:")
+        for key, value in result.items():
+            print(f"   {key:18s}: {value}")
+        return 0
+
+    _usage()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
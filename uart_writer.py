@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI UART Writer
+- Escritor priorizado y no bloqueante hacia la UART del receptor
+- Correcciones RTCM3 con prioridad máxima (latencia mínima)
+- Comandos de configuración detrás de las correcciones
+- Un hilo propio: quien encola nunca se bloquea (la lectura NMEA sigue)
+"""
+
+import time
+import queue
+import itertools
+import threading
+
+PRIORITY_RTCM = 0
+PRIORITY_COMMAND = 1
+PRIORITY_BULK = 2
+
+
+class UARTWriter:
+    """Cola priorizada de escritura sobre un objeto tipo serial.Serial."""
+
+    def __init__(self, uart, max_queue=256, max_rtcm_age=2.0):
+        """
+        Args:
+            uart: objeto con write() (pyserial, pty, replay...)
+            max_queue: elementos máximos pendientes (memoria acotada)
+            max_rtcm_age: segundos tras los cuales una corrección ya no sirve
+        """
+        self.uart = uart
+        self.max_rtcm_age = max_rtcm_age
+        self._queue = queue.PriorityQueue(maxsize=max_queue)
+        self._seq = itertools.count()
+        self._thread = None
+        self.running = False
+
+        self.stats = {
+            "messages_written": 0,
+            "bytes_written": 0,
+            "rtcm_bytes_written": 0,
+            "dropped_full": 0,
+            "dropped_stale": 0,
+            "write_errors": 0,
+            "last_latency_ms": 0.0,
+            "max_latency_ms": 0.0,
+        }
+
+    # ---------------------- Ciclo de vida ---------------------- #
+    def start(self):
+        if self._thread is not None:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="uart-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ---------------------- Encolado ---------------------- #
+    def submit(self, data, priority=PRIORITY_COMMAND) -> bool:
+        """Encola bytes para la UART. Nunca bloquea; devuelve False si se descarta."""
+        if not data:
+            return False
+        if isinstance(data, str):
+            data = data.encode("ascii", errors="ignore")
+        item = (priority, next(self._seq), time.monotonic(), bytes(data))
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.stats["dropped_full"] += 1
+            return False
+
+    def send_rtcm(self, data) -> bool:
+        return self.submit(data, PRIORITY_RTCM)
+
+    def send_command(self, command: str) -> bool:
+        """Encola un comando ASCII para el receptor (añade CRLF si falta)."""
+        if not command.endswith("\r\n"):
+            command = command.rstrip("\r\n") + "\r\n"
+        return self.submit(command, PRIORITY_COMMAND)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # ---------------------- Hilo escritor ---------------------- #
+    def _run(self):
+        stats = self.stats
+        while self.running:
+            try:
+                priority, _, queued_at, data = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+            age = time.monotonic() - queued_at
+            if priority == PRIORITY_RTCM and age > self.max_rtcm_age:
+                stats["dropped_stale"] += 1
+                continue
+
+            try:
+                self.uart.write(data)
+            except Exception:
+                stats["write_errors"] += 1
+                continue
+
+            latency_ms = (time.monotonic() - queued_at) * 1000.0
+            stats["messages_written"] += 1
+            stats["bytes_written"] += len(data)
+            if priority == PRIORITY_RTCM:
+                stats["rtcm_bytes_written"] += len(data)
+            stats["last_latency_ms"] = round(latency_ms, 2)
+            if latency_ms > stats["max_latency_ms"]:
+                stats["max_latency_ms"] = round(latency_ms, 2)
+
+    def get_stats(self):
+        data = dict(self.stats)
+        data["pending"] = self.pending
+        return data
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+GNSS.AI Wire Format
+- Codificación compacta de la tabla de satélites para clientes del dashboard
+- "compact": JSON sin la lista de satélites + tabla binaria en columnas
+  (adjunto binario de Socket.IO, se lee en JS con TypedArrays)
+- "msgpack": el mismo payload compacto serializado con MessagePack
+- Constelación y estado codificados con diccionario (índices uint8)
+
+Tabla binaria (little endian, columnas alineadas para TypedArray):
+    0   uint16  versión
+    2   uint16  N satélites
+    4   uint16[N] prn
+        uint16[N] azimut (grados)
+        uint16[N] snr × 10 (dB-Hz)
+        int8[N]   elevación (grados)
+        uint8[N]  índice de constelación (sat_dict.constellation)
+        uint8[N]  índice de estado (sat_dict.status)
+        uint8[N]  C/N0 por banda (dB-Hz, 0 = sin señal), una columna por
+                  banda de sat_dict.bands (versión 2)
+"""
+
+import json
+import struct
+from array import array
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+WIRE_VERSION = 2
+FORMATS = ("json", "compact", "msgpack")
+
+CONSTELLATIONS = ["GPS", "GLONASS", "Galileo", "BeiDou", "QZSS", "SBAS", "NavIC", "Multi GNSS", "GNSS"]
+STATUSES = ["los", "multipath", "nlos"]
+BANDS = ["L1", "L2", "L5", "L6"]
+
+_HEADER = struct.Struct("<HH")
+_LITTLE = array("H", [1]).tobytes() == b"\x01\x00"
+
+
+def _prn_int(prn) -> int:
+    try:
+        return int(str(prn).split("-")[-1]) & 0xFFFF
+    except (TypeError, ValueError):
+        return 0
+
+
+def _index(table, value) -> int:
+    try:
+        return table.index(value)
+    except ValueError:
+        if len(table) < 255:
+            table.append(value)
+            return len(table) - 1
+        return 255
+
+
+def encode_satellites(satellites, constellations=None):
+    """Lista de dicts de satélites -> (bytes, sat_dict)."""
+    constellations = list(constellations or CONSTELLATIONS)
+    n = len(satellites)
+    prn = array("H", bytes(2 * n))
+    az = array("H", bytes(2 * n))
+    snr = array("H", bytes(2 * n))
+    elev = array("b", bytes(n))
+    const = array("B", bytes(n))
+    status = array("B", bytes(n))
+    bands = [array("B", bytes(n)) for _ in BANDS]
+
+    for i, sat in enumerate(satellites):
+        prn[i] = _prn_int(sat.get("prn", 0))
+        az[i] = int(sat.get("azimuth", 0) or 0) % 360
+        snr[i] = max(0, min(int(round((sat.get("snr", 0) or 0) * 10)), 0xFFFF))
+        elev[i] = max(-90, min(int(sat.get("elevation", 0) or 0), 90))
+        const[i] = _index(constellations, sat.get("constellation", "GNSS"))
+        st = sat.get("status", "los")
+        status[i] = STATUSES.index(st) if st in STATUSES else 255
+        cn0 = sat.get("cn0")
+        if cn0:
+            for b, band in enumerate(BANDS):
+                bands[b][i] = max(0, min(int(cn0.get(band, 0) or 0), 255))
+
+    if not _LITTLE:
+        for col in (prn, az, snr):
+            col.byteswap()
+
+    blob = b"".join((
+        _HEADER.pack(WIRE_VERSION, n),
+        prn.tobytes(), az.tobytes(), snr.tobytes(),
+        elev.tobytes(), const.tobytes(), status.tobytes(),
+        *(col.tobytes() for col in bands),
+    ))
+    return blob, {"constellation": constellations, "status": STATUSES, "bands": BANDS}
+
+
+def decode_satellites(blob, sat_dict):
+    """Inverso de encode_satellites (para pruebas y clientes Python)."""
+    version, n = _HEADER.unpack_from(blob, 0)
+    if version not in (1, WIRE_VERSION):
+        raise ValueError(f"Versión de tabla no soportada: {version}")
+    band_names = sat_dict.get("bands", []) if version >= 2 else []
+    offset = _HEADER.size
+    cols = []
+    layout = [("H", 2), ("H", 2), ("H", 2), ("b", 1), ("B", 1), ("B", 1)]
+    layout += [("B", 1)] * len(band_names)
+    for code, size in layout:
+        col = array(code)
+        col.frombytes(blob[offset : offset + size * n])
+        if size == 2 and not _LITTLE:
+            col.byteswap()
+        cols.append(col)
+        offset += size * n
+    prn, az, snr, elev, const, status = cols[:6]
+    bands = cols[6:]
+    constellations = sat_dict["constellation"]
+    statuses = sat_dict["status"]
+    out = []
+    for i in range(n):
+        sat = {
+            "prn": str(prn[i]),
+            "constellation": constellations[const[i]] if const[i] < len(constellations) else "GNSS",
+            "elevation": float(elev[i]),
+            "azimuth": float(az[i]),
+            "snr": snr[i] / 10.0,
+            "status": statuses[status[i]] if status[i] < len(statuses) else "unknown",
+        }
+        if bands:
+            sat["cn0"] = {name: col[i] for name, col in zip(band_names, bands) if col[i]}
+        out.append(sat)
+    return out
+
+
+def strip_satellites(data):
+    """Copia superficial del snapshot sin las listas de satélites."""
+    return {k: v for k, v in data.items() if k not in ("satellites_detail", "satellites_view")}
+
+
+def compact_payload(data):
+    """Snapshot -> payload compacto (tabla binaria + diccionario)."""
+    payload = strip_satellites(data)
+    blob, sat_dict = encode_satellites(data.get("satellites_detail") or [])
+    payload["sat_table"] = blob
+    payload["sat_dict"] = sat_dict
+    return payload
+
+
+def encode_for(fmt, data):
+    """Payload listo para socketio.emit según el formato negociado."""
+    if fmt == "msgpack" and MSGPACK_AVAILABLE:
+        return msgpack.packb(compact_payload(data), use_bin_type=True)
+    if fmt in ("compact", "msgpack"):
+        return compact_payload(data)
+    return data
+
+
+def payload_size(payload) -> int:
+    """Bytes aproximados en el cable (JSON + adjuntos binarios)."""
+    if isinstance(payload, (bytes, bytearray)):
+        return len(payload)
+    binary = 0
+    rest = {}
+    for key, value in payload.items():
+        if isinstance(value, (bytes, bytearray)):
+            binary += len(value)
+            rest[key] = {"_placeholder": True, "num": 0}
+        else:
+            rest[key] = value
+    return len(json.dumps(rest, separators=(",", ":"))) + binary